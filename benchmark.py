@@ -0,0 +1,1019 @@
+"""Benchmarks for the restaurant database module
+
+Run these against a scratch copy of the database configured in main.py,
+because the benchmarks insert users and orders:
+
+    python benchmark.py place_order
+
+or against an embedded SQLite file when no MySQL server is available:
+
+    python benchmark.py --sqlite bench.db place_order
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import tracemalloc
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+try:
+    import resource  # Peak RSS is only available on Unix
+except ImportError:
+    resource = None
+
+from main import (ORDER_STATUSES, AsyncRestaurantDatabase, BillingEngine, MenuSearchIndex, OrderIntakeService,
+                  PopularItemsTracker, RestaurantDatabase, SQLiteBackend)
+
+
+class CountingCursor:
+    """Cursor wrapper that counts statements sent to the server"""
+
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        self._counter['round_trips'] += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self._counter['round_trips'] += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """Connection wrapper that counts statements, commits and rollbacks"""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.counter = {'round_trips': 0}
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs), self.counter)
+
+    def commit(self):
+        self.counter['round_trips'] += 1
+        return self._connection.commit()
+
+    def rollback(self):
+        self.counter['round_trips'] += 1
+        return self._connection.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def create_bench_user(db):
+    """Register a throwaway user for benchmark orders"""
+    email = f"bench_{time.time_ns()}@example.com"
+    result = db.register_user("Benchmark User", email, "bench", "0000000000")
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    return result['user_id']
+
+
+def bench_place_order(db, cart_sizes=(1, 5, 10, 20, 50), repeats=20):
+    """Measure round trips and latency of place_order for each cart size"""
+    menu = db.get_menu()
+    if not menu:
+        raise RuntimeError("Menu is empty - load database_setup.sql first")
+
+    user_id = create_bench_user(db)
+    counting = CountingConnection(db.connection)
+    db.connection = counting
+
+    results = []
+    try:
+        for size in cart_sizes:
+            cart = [{"item_id": menu[i % len(menu)]['item_id'], "quantity": 1 + i % 3}
+                    for i in range(size)]
+            latencies = []
+            counting.counter['round_trips'] = 0
+
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = db.place_order(user_id, cart)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not result['success']:
+                    raise RuntimeError(result['message'])
+
+            results.append({
+                'cart_size': size,
+                'round_trips': counting.counter['round_trips'] / repeats,
+                'mean_ms': sum(latencies) / len(latencies),
+                'p95_ms': percentile(latencies, 95),
+            })
+    finally:
+        db.connection = counting._connection
+
+    return results
+
+
+def print_place_order_results(results):
+    """Print place_order benchmark results as a table"""
+    print(f"{'Cart size':<12} {'Round trips':<14} {'Mean (ms)':<12} {'p95 (ms)':<12}")
+    print("-" * 50)
+    for row in results:
+        print(f"{row['cart_size']:<12} {row['round_trips']:<14.1f} "
+              f"{row['mean_ms']:<12.2f} {row['p95_ms']:<12.2f}")
+
+
+def make_database(sqlite_path=None, pool_size=None):
+    """Create a RestaurantDatabase for MySQL, or SQLite when a path is given"""
+    backend = SQLiteBackend(sqlite_path) if sqlite_path else None
+    return RestaurantDatabase(pool_size=pool_size, backend=backend)
+
+
+def bench_startup(instances=20, sqlite_path=None):
+    """Measure connect + initialize_database time for many fresh instances"""
+    timings = []
+    ddl_runs = 0
+    for _ in range(instances):
+        start = time.perf_counter()
+        db = make_database(sqlite_path)
+        if not db.connect():
+            raise RuntimeError("Failed to connect to database")
+        if db.initialize_database():
+            ddl_runs += 1
+        timings.append((time.perf_counter() - start) * 1000)
+        db.disconnect()
+
+    return {
+        'instances': instances,
+        'ddl_runs': ddl_runs,
+        'mean_ms': sum(timings) / len(timings),
+        'p95_ms': percentile(timings, 95),
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def bench_export(db, chunk_size=1000, compress=False):
+    """Measure rows/sec and peak RSS of the streaming order export"""
+    suffix = '.csv.gz' if compress else '.csv'
+    fd, filename = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+
+    progress = {'rows': 0}
+
+    def on_progress(rows):
+        progress['rows'] = rows
+
+    rss_before = peak_rss_mb()
+    try:
+        start = time.perf_counter()
+        db.export_orders_to_csv(filename, chunk_size=chunk_size, compress=compress, progress=on_progress)
+        elapsed = time.perf_counter() - start
+        file_mb = os.path.getsize(filename) / (1024 * 1024)
+    finally:
+        os.remove(filename)
+
+    rows = progress['rows']
+    return {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        'file_mb': file_mb,
+        'peak_rss_before_mb': rss_before,
+        'peak_rss_after_mb': peak_rss_mb(),
+    }
+
+
+# SYNTHETIC DATA AND MIXED WORKLOAD
+
+CATEGORIES = ['Starters', 'Main Course', 'Rice', 'Breads', 'Desserts', 'Beverages']
+
+# Relative frequency of cart sizes 1..10 (most orders are small)
+CART_SIZE_WEIGHTS = [30, 25, 15, 10, 7, 5, 3, 2, 2, 1]
+
+# Relative frequency of each operation in the mixed workload
+OPERATION_MIX = {
+    'get_menu': 30,
+    'get_categories': 10,
+    'login_user': 5,
+    'register_user': 2,
+    'place_order': 20,
+    'get_orders_page': 20,
+    'get_total_revenue': 5,
+    'get_popular_items': 4,
+    'get_category_sales': 4,
+}
+
+BENCH_PASSWORD = 'bench'
+
+
+def random_cart(rng, item_ids):
+    """Build a cart with a realistic number of lines"""
+    size = rng.choices(range(1, len(CART_SIZE_WEIGHTS) + 1), CART_SIZE_WEIGHTS)[0]
+    return [{"item_id": item_id, "quantity": rng.randint(1, 3)}
+            for item_id in rng.sample(item_ids, min(size, len(item_ids)))]
+
+
+def next_id(cursor, table, column):
+    """First unused ID in a table, so generated rows can carry explicit IDs"""
+    cursor.execute(f"SELECT MAX({column}) FROM {table}")
+    return (cursor.fetchone()[0] or 0) + 1
+
+
+def generate_data(db, users=1000, items=200, orders=10000, days=90, seed=42, chunk_size=1000):
+    """Load N users, M menu items and K historical orders spread over the last days
+
+    Rows are written directly with executemany in chunks rather than through
+    register_user/place_order, then the analytics rollups are rebuilt.
+    """
+    rng = random.Random(seed)
+    password = db.hash_password(BENCH_PASSWORD)
+    now = datetime.now().replace(microsecond=0)
+
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+
+        first_user = next_id(cursor, 'users', 'user_id')
+        user_rows = [(first_user + i, f"Bench User {first_user + i}", f"user{first_user + i}@bench.example",
+                      password, f"{9000000000 + first_user + i}")
+                     for i in range(users)]
+        for start in range(0, len(user_rows), chunk_size):
+            cursor.executemany(
+                "INSERT INTO users (user_id, name, email, password, phone) VALUES (%s, %s, %s, %s, %s)",
+                user_rows[start:start + chunk_size]
+            )
+            conn.commit()
+
+        first_item = next_id(cursor, 'menu', 'item_id')
+        menu_rows = [(first_item + i, f"Bench Item {first_item + i}", rng.choice(CATEGORIES),
+                      rng.randrange(40, 400, 10), True)
+                     for i in range(items)]
+        cursor.executemany(
+            "INSERT INTO menu (item_id, name, category, price, availability) VALUES (%s, %s, %s, %s, %s)",
+            menu_rows
+        )
+        db.bump_menu_version(cursor)
+        conn.commit()
+
+        prices = {row[0]: row[3] for row in menu_rows}
+        categories = {row[0]: row[2] for row in menu_rows}
+        item_ids = list(prices)
+        user_ids = [row[0] for row in user_rows]
+        order_id = next_id(cursor, 'orders', 'order_id')
+
+        for start in range(0, orders, chunk_size):
+            order_rows = []
+            detail_rows = []
+            carts = []
+            for _ in range(min(chunk_size, orders - start)):
+                carts.append([{'item_id': line['item_id'], 'quantity': line['quantity'],
+                               'price': prices[line['item_id']], 'category': categories[line['item_id']]}
+                              for line in random_cart(rng, item_ids)])
+            # Price the whole chunk in one pass, exactly as place_order would
+            for bill in db.billing.price_carts(carts):
+                order_date = now - timedelta(seconds=rng.randrange(days * 86400))
+                for line in bill['lines']:
+                    detail_rows.append((order_id, line['item_id'], line['quantity'],
+                                        line['price'], line['subtotal']))
+                order_rows.append((order_id, rng.choice(user_ids), order_date, order_date,
+                                   bill['total'], bill['tax'], bill['final_amount']))
+                order_id += 1
+
+            cursor.executemany(
+                "INSERT INTO orders (order_id, user_id, order_date, updated_at, total_amount, tax_amount, final_amount) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                order_rows
+            )
+            cursor.executemany(
+                "INSERT INTO order_details (order_id, item_id, quantity, price, subtotal) VALUES (%s, %s, %s, %s, %s)",
+                detail_rows
+            )
+            conn.commit()
+
+        cursor.close()
+
+    db.rebuild_rollups()
+    if db.menu_cache:
+        db.menu_cache.invalidate()
+    return {"users": user_ids, "items": item_ids}
+
+
+def load_dataset(db):
+    """Find the generated users and menu items to drive the workload with"""
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT user_id FROM users WHERE email LIKE %s", ('%@bench.example',))
+        user_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT item_id FROM menu WHERE availability = TRUE")
+        item_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    if not user_ids or not item_ids:
+        raise RuntimeError("No benchmark data - run the generate benchmark first")
+    return {"users": user_ids, "items": item_ids}
+
+
+def make_operations(db, dataset, rng):
+    """Map each workload operation name to a zero-argument callable"""
+    categories = CATEGORIES + [None]
+
+    def register():
+        email = f"new_{time.time_ns()}_{rng.random()}@load.example"
+        return db.register_user("Load User", email, BENCH_PASSWORD, "0000000000")
+
+    return {
+        'get_menu': lambda: db.get_menu(rng.choice(categories)),
+        'get_categories': db.get_categories,
+        'login_user': lambda: db.login_user(f"user{rng.choice(dataset['users'])}@bench.example", BENCH_PASSWORD),
+        'register_user': register,
+        'place_order': lambda: db.place_order(rng.choice(dataset['users']), random_cart(rng, dataset['items'])),
+        'get_orders_page': lambda: db.get_orders_page(user_id=rng.choice(dataset['users'])),
+        'get_total_revenue': db.get_total_revenue,
+        'get_popular_items': db.get_popular_items,
+        'get_category_sales': db.get_category_sales,
+    }
+
+
+def run_workload(db, dataset, concurrency=4, duration=10.0, mix=None, seed=42):
+    """Run the mixed browse/order/history workload from concurrent threads
+
+    Returns per-operation latency percentiles and throughput.
+    """
+    mix = mix or OPERATION_MIX
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        operations = make_operations(db, dataset, rng)
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                result = operations[name]()
+                if isinstance(result, dict) and result.get('success') is False:
+                    local_errors[name] += 1
+            except Exception:
+                local_errors[name] += 1
+            local[name].append((time.perf_counter() - start) * 1000)
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                errors[name] += local_errors[name]
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    operations = {}
+    for name in names:
+        values = latencies[name]
+        if not values:
+            continue
+        operations[name] = {
+            'count': len(values),
+            'errors': errors[name],
+            'throughput_per_sec': len(values) / elapsed,
+            'mean_ms': sum(values) / len(values),
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+        }
+
+    total = sum(op['count'] for op in operations.values())
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'backend': db.backend.name,
+            'concurrency': concurrency,
+            'duration_sec': elapsed,
+            'mix': mix,
+            'seed': seed,
+            'python': platform.python_version(),
+        },
+        'total': {'count': total, 'throughput_per_sec': total / elapsed},
+        'operations': operations,
+    }
+
+
+def print_workload_results(results):
+    """Print workload results as a table"""
+    meta = results['meta']
+    print(f"Backend: {meta['backend']}, concurrency: {meta['concurrency']}, "
+          f"duration: {meta['duration_sec']:.1f} s")
+    print(f"{'Operation':<22} {'Count':<8} {'Errors':<8} {'Ops/s':<10} "
+          f"{'p50 (ms)':<10} {'p95 (ms)':<10} {'p99 (ms)':<10}")
+    print("-" * 80)
+    for name, op in results['operations'].items():
+        print(f"{name:<22} {op['count']:<8} {op['errors']:<8} {op['throughput_per_sec']:<10.1f} "
+              f"{op['p50_ms']:<10.2f} {op['p95_ms']:<10.2f} {op['p99_ms']:<10.2f}")
+    print("-" * 80)
+    print(f"{'Total':<22} {results['total']['count']:<8} {'':<8} "
+          f"{results['total']['throughput_per_sec']:<10.1f}")
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """List operations whose p95 latency or throughput regressed by more than threshold"""
+    regressions = []
+    for name, old in baseline['operations'].items():
+        new = current['operations'].get(name)
+        if not new:
+            continue
+        if new['p95_ms'] > old['p95_ms'] * (1 + threshold):
+            regressions.append((name, 'p95_ms', old['p95_ms'], new['p95_ms']))
+        if new['throughput_per_sec'] < old['throughput_per_sec'] * (1 - threshold):
+            regressions.append((name, 'throughput_per_sec', old['throughput_per_sec'], new['throughput_per_sec']))
+    return regressions
+
+
+def bench_intake(db, dataset, worker_counts=(1, 2, 4, 8), orders=500, seed=42):
+    """Measure order throughput of OrderIntakeService for each worker count"""
+    rng = random.Random(seed)
+    results = []
+    for workers in worker_counts:
+        carts = [(rng.choice(dataset['users']), random_cart(rng, dataset['items'])) for _ in range(orders)]
+        service = OrderIntakeService(db.backend, workers=workers, queue_size=workers * 4)
+        start = time.perf_counter()
+        futures = [service.submit(user_id, items) for user_id, items in carts]
+        outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+        service.stop()
+        results.append({
+            'workers': workers,
+            'orders': orders,
+            'failed': sum(1 for outcome in outcomes if not outcome['success']),
+            'orders_per_sec': orders / elapsed,
+        })
+    return results
+
+
+def make_requests(dataset, count, seed=42):
+    """Build a reproducible list of (method name, args) calls for the async benchmark"""
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.5:
+            calls.append(('get_menu', (rng.choice(CATEGORIES + [None]),)))
+        elif roll < 0.8:
+            calls.append(('get_orders_page', (rng.choice(dataset['users']),)))
+        else:
+            calls.append(('place_order', (rng.choice(dataset['users']), random_cart(rng, dataset['items']))))
+    return calls
+
+
+def bench_async(backend, dataset, concurrency=200, requests=2000, pool_size=10, seed=42):
+    """Serve the same calls thread-per-request with the sync API and as tasks with the async API
+
+    Both sides share a pool of pool_size connections and keep at most
+    concurrency requests in flight.
+    """
+    calls = make_requests(dataset, requests, seed)
+
+    def summarize(mode, latencies, elapsed, peak_threads):
+        return {
+            'mode': mode,
+            'requests': len(latencies),
+            'requests_per_sec': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'peak_threads': peak_threads,
+        }
+
+    db = RestaurantDatabase(pool_size=pool_size, backend=backend)
+    db.connect()
+    latencies = []
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency)
+    peak_threads = threading.active_count()
+
+    def handle(name, args, queued):
+        try:
+            getattr(db, name)(*args)
+        finally:
+            with lock:
+                latencies.append((time.perf_counter() - queued) * 1000)
+            slots.release()
+
+    started = time.perf_counter()
+    threads = []
+    for name, args in calls:
+        slots.acquire()
+        thread = threading.Thread(target=handle, args=(name, args, time.perf_counter()))
+        thread.start()
+        threads.append(thread)
+        peak_threads = max(peak_threads, threading.active_count())
+    for thread in threads:
+        thread.join()
+    sync_result = summarize('sync', latencies, time.perf_counter() - started, peak_threads)
+    db.disconnect()
+
+    async def run_async():
+        adb = AsyncRestaurantDatabase(pool_size=pool_size, backend=backend)
+        await adb.connect()
+        latencies = []
+        slots = asyncio.Semaphore(concurrency)
+        peak = threading.active_count()
+
+        async def handle(name, args):
+            nonlocal peak
+            async with slots:
+                queued = time.perf_counter()
+                await getattr(adb, name)(*args)
+                latencies.append((time.perf_counter() - queued) * 1000)
+                peak = max(peak, threading.active_count())
+
+        started = time.perf_counter()
+        await asyncio.gather(*(handle(name, args) for name, args in calls))
+        elapsed = time.perf_counter() - started
+        await adb.disconnect()
+        return summarize('async', latencies, elapsed, peak)
+
+    return [sync_result, asyncio.run(run_async())]
+
+
+def bench_group_commit(backend, dataset, threads=16, orders=1000, max_batch=20, max_wait_ms=5, seed=42):
+    """Place the same orders from many threads with one commit per order, then with group commit"""
+    rng = random.Random(seed)
+    carts = [(rng.choice(dataset['users']), random_cart(rng, dataset['items'])) for _ in range(orders)]
+    results = []
+    for mode in ('per-order', 'group'):
+        db = RestaurantDatabase(pool_size=threads, backend=backend)
+        db.connect()
+        if mode == 'group':
+            db.enable_group_commit(max_batch, max_wait_ms)
+        latencies = []
+        failed = []
+        lock = threading.Lock()
+
+        def worker(offset):
+            for user_id, items in carts[offset::threads]:
+                start = time.perf_counter()
+                result = db.place_order(user_id, items)
+                with lock:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if not result['success']:
+                        failed.append(result)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        batch_size = db.group_commit.stats()['avg_batch_size'] if db.group_commit else 1
+        db.disconnect()
+        results.append({
+            'mode': mode,
+            'orders': orders,
+            'failed': len(failed),
+            'orders_per_sec': orders / elapsed,
+            'p95_ms': percentile(latencies, 95),
+            'avg_batch_size': batch_size,
+        })
+    return results
+
+
+def bench_kitchen(backend, dataset, claimer_counts=(1, 2, 4, 8, 16), orders=1000, batch=5, seed=42):
+    """Drain a queue of Pending orders with concurrent claim_orders workers, per worker count
+
+    Every claimed batch is moved on to Ready and then Delivered. An order
+    claimed twice would show up as a duplicate.
+    """
+    rng = random.Random(seed)
+    results = []
+    for claimers in claimer_counts:
+        db = RestaurantDatabase(backend=backend)
+        db.connect()
+        # Clear the queue, then fill it with fresh Pending orders
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE orders SET status = %s WHERE status <> %s", (ORDER_STATUSES[-1], ORDER_STATUSES[-1]))
+            conn.commit()
+            cursor.close()
+        carts = [(rng.choice(dataset['users']), random_cart(rng, dataset['items'])) for _ in range(orders)]
+        for offset in range(0, orders, 100):
+            db.place_orders_batch(carts[offset:offset + 100])
+        db.disconnect()
+
+        claimed = []
+        retries = [0]
+        latencies = []
+        lock = threading.Lock()
+
+        def worker():
+            kitchen = RestaurantDatabase(backend=backend)
+            kitchen.connect()
+            while True:
+                start = time.perf_counter()
+                result = kitchen.claim_orders(batch)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if not result['success']:
+                    with lock:
+                        retries[0] += 1
+                    continue
+                if not result['orders']:
+                    break
+                order_ids = [order['order_id'] for order in result['orders']]
+                kitchen.update_orders_status(order_ids, 'Ready')
+                kitchen.update_orders_status(order_ids, 'Delivered')
+                with lock:
+                    claimed.extend(order_ids)
+                    latencies.append(elapsed_ms)
+            kitchen.disconnect()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(claimers)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        results.append({
+            'claimers': claimers,
+            'orders': len(claimed),
+            'duplicates': len(claimed) - len(set(claimed)),
+            'retries': retries[0],
+            'orders_per_sec': len(claimed) / elapsed,
+            'p95_claim_ms': percentile(latencies, 95) if latencies else 0,
+        })
+    return results
+
+
+def bench_rows(backend, repeats=3):
+    """Time and measure materializing every order as dicts and as Order objects"""
+    results = []
+    for row_format in ('dict', 'objects'):
+        db = RestaurantDatabase(backend=backend, row_format=row_format)
+        db.connect()
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rows = list(db.iter_orders())
+            timings.append((time.perf_counter() - start) * 1000)
+            del rows
+        tracemalloc.start()
+        rows = list(db.iter_orders())
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        db.disconnect()
+        results.append({
+            'row_format': row_format,
+            'rows': len(rows),
+            'best_ms': min(timings),
+            'bytes_per_row': allocated / len(rows) if rows else 0,
+        })
+    return results
+
+
+def bench_timeseries(db, repeats=5):
+    """Time get_sales_timeseries per bucket size, for all sales and for one category"""
+    categories = [None] + [row['category'] for row in db.get_category_sales()[:1]]
+    results = []
+    for bucket in ('hour', 'day', 'week'):
+        for category in categories:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                series = db.get_sales_timeseries(bucket=bucket, category=category)
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append({
+                'bucket': bucket,
+                'category': category or 'all',
+                'buckets': len(series['start']),
+                'best_ms': min(timings),
+            })
+    return results
+
+
+def bench_trending(orders=100000, items=200, seed=42):
+    """Feed a PopularItemsTracker a simulated day of orders and time record() and top()"""
+    rng = random.Random(seed)
+    now = [datetime.combine(date.today(), datetime.min.time()).timestamp()]
+    tracker = PopularItemsTracker(clock=lambda: now[0])
+    carts = [[{'item_id': rng.randint(1, items), 'quantity': rng.randint(1, 3)}
+              for _ in range(rng.randint(1, 5))]
+             for _ in range(orders)]
+    gap = 24 * 60 * 60 / orders
+    start = time.perf_counter()
+    for cart in carts:
+        now[0] += gap
+        tracker.record(cart)
+    record_ms = (time.perf_counter() - start) * 1000
+
+    top_us = {}
+    for window in ('15m', '1h', 'today'):
+        tracker.record(carts[0])  # invalidate the cached ranking
+        start = time.perf_counter()
+        tracker.top(window)
+        cold = (time.perf_counter() - start) * 1e6
+        start = time.perf_counter()
+        for _ in range(1000):
+            tracker.top(window)
+        top_us[window] = (cold, (time.perf_counter() - start) * 1000)
+    return {'orders': orders, 'record_us': record_ms * 1000 / orders, 'top_us': top_us}
+
+
+SEARCH_NAME_WORDS = (
+    ['Butter', 'Spicy', 'Tandoori', 'Garlic', 'Crispy', 'Smoked', 'Royal', 'Kerala', 'Punjabi', 'Malai',
+     'Achari', 'Kadai', 'Lemon', 'Mint', 'Honey', 'Chilli', 'Pepper', 'Hyderabadi', 'Classic', 'Masala'],
+    ['Chicken', 'Paneer', 'Mutton', 'Fish', 'Prawn', 'Mushroom', 'Aloo', 'Gobi', 'Dal', 'Rajma',
+     'Chole', 'Egg', 'Veg', 'Corn', 'Soya'],
+    ['Tikka', 'Curry', 'Biryani', 'Kebab', 'Roll', 'Naan', 'Paratha', 'Fry', 'Korma', 'Soup',
+     'Salad', 'Rice', 'Wrap', 'Pizza', 'Masala'],
+)
+
+SEARCH_QUERIES = ['butter chicken', 'paneer tik', 'chiken', 'biryni', 'pan', 'kerala fish curry',
+                  'masala', 'rice', 'mint', 'nan']
+
+
+def bench_search(items=50000, repeats=100, seed=42):
+    """Build a search index over synthetic menu items and time lookups"""
+    rng = random.Random(seed)
+    menu = [{'item_id': item_id,
+             'name': ' '.join(rng.choice(words) for words in SEARCH_NAME_WORDS) + f" {item_id % 997}",
+             'category': rng.choice(CATEGORIES),
+             'price': 100,
+             'availability': True}
+            for item_id in range(1, items + 1)]
+    start = time.perf_counter()
+    index = MenuSearchIndex(menu)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    latencies = {}
+    for query in SEARCH_QUERIES:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        latencies[query] = timings
+    return {'items': items, 'build_ms': build_ms, 'latencies': latencies}
+
+
+def float_bill(lines):
+    """The per-line float loop place_order used before BillingEngine"""
+    total = 0
+    for line in lines:
+        total += float(line['price']) * line['quantity']
+    tax = math.ceil(total * 0.05 * 100) / 100
+    return total, tax, total + tax
+
+
+def bench_billing(carts=10000, seed=42):
+    """Price the same random carts with the float loop and with BillingEngine.price_carts"""
+    rng = random.Random(seed)
+    menu = {item_id: (Decimal(rng.randrange(1000, 50000)) / 100, rng.choice(CATEGORIES))
+            for item_id in range(1, 501)}
+    item_ids = list(menu)
+    cart_lines = [[{'item_id': line['item_id'], 'quantity': line['quantity'],
+                    'price': menu[line['item_id']][0], 'category': menu[line['item_id']][1]}
+                   for line in random_cart(rng, item_ids)]
+                  for _ in range(carts)]
+
+    start = time.perf_counter()
+    float_bills = [float_bill(lines) for lines in cart_lines]
+    float_ms = (time.perf_counter() - start) * 1000
+
+    engine = BillingEngine()
+    start = time.perf_counter()
+    bills = engine.price_carts(cart_lines, with_lines=False)
+    engine_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    engine.price_carts(cart_lines, with_lines=False, as_cents=True)
+    cents_ms = (time.perf_counter() - start) * 1000
+
+    # Carts where the float loop's total or tax is not the exact amount in cents
+    to_cents = BillingEngine.to_cents
+    drift = sum(1 for (total, tax, _), bill in zip(float_bills, bills)
+                if to_cents(total) != to_cents(bill['total']) or to_cents(tax) != to_cents(bill['tax']))
+    return {'carts': carts, 'float_ms': float_ms, 'engine_ms': engine_ms, 'cents_ms': cents_ms,
+            'drifted_carts': drift}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restaurant database benchmarks")
+    parser.add_argument('--sqlite', metavar='PATH', help="use an SQLite database file instead of MySQL")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    order_parser = subparsers.add_parser('place_order', help="round trips and latency per cart size")
+    order_parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 10, 20, 50])
+    order_parser.add_argument('--repeats', type=int, default=20)
+
+    startup_parser = subparsers.add_parser('startup', help="client startup time with the schema fast path")
+    startup_parser.add_argument('--instances', type=int, default=20)
+
+    export_parser = subparsers.add_parser('export', help="streaming order export throughput and memory")
+    export_parser.add_argument('--chunk-size', type=int, default=1000)
+    export_parser.add_argument('--gzip', action='store_true')
+
+    generate_parser = subparsers.add_parser('generate', help="load synthetic users, menu items and orders")
+    generate_parser.add_argument('--users', type=int, default=1000)
+    generate_parser.add_argument('--items', type=int, default=200)
+    generate_parser.add_argument('--orders', type=int, default=10000)
+    generate_parser.add_argument('--days', type=int, default=90)
+    generate_parser.add_argument('--seed', type=int, default=42)
+
+    workload_parser = subparsers.add_parser('workload', help="mixed browse/order/history load test")
+    workload_parser.add_argument('--concurrency', type=int, default=4)
+    workload_parser.add_argument('--duration', type=float, default=10.0)
+    workload_parser.add_argument('--seed', type=int, default=42)
+    workload_parser.add_argument('--output', help="save results as JSON")
+
+    intake_parser = subparsers.add_parser('intake', help="order intake service throughput per worker count")
+    intake_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    intake_parser.add_argument('--orders', type=int, default=500)
+
+    async_parser = subparsers.add_parser('async', help="async API versus thread-per-request sync API")
+    async_parser.add_argument('--concurrency', type=int, default=200)
+    async_parser.add_argument('--requests', type=int, default=2000)
+    async_parser.add_argument('--pool-size', type=int, default=10)
+
+    group_parser = subparsers.add_parser('group_commit', help="order throughput with and without group commit")
+    group_parser.add_argument('--threads', type=int, default=16)
+    group_parser.add_argument('--orders', type=int, default=1000)
+    group_parser.add_argument('--max-batch', type=int, default=20)
+    group_parser.add_argument('--max-wait-ms', type=float, default=5)
+
+    kitchen_parser = subparsers.add_parser('kitchen', help="order claiming throughput per number of kitchen workers")
+    kitchen_parser.add_argument('--claimers', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    kitchen_parser.add_argument('--orders', type=int, default=1000)
+    kitchen_parser.add_argument('--batch', type=int, default=5)
+
+    rows_parser = subparsers.add_parser('rows', help="memory and time per order row, dicts versus row objects")
+    rows_parser.add_argument('--repeats', type=int, default=3)
+
+    trending_parser = subparsers.add_parser('trending', help="sliding-window top items tracker latency")
+    trending_parser.add_argument('--orders', type=int, default=100000)
+
+    timeseries_parser = subparsers.add_parser('timeseries', help="sales time-series latency per bucket size")
+    timeseries_parser.add_argument('--repeats', type=int, default=5)
+
+    search_parser = subparsers.add_parser('search', help="menu search index lookup latency")
+    search_parser.add_argument('--items', type=int, default=50000)
+    search_parser.add_argument('--repeats', type=int, default=100)
+
+    billing_parser = subparsers.add_parser('billing', help="float billing loop versus BillingEngine batch pricing")
+    billing_parser.add_argument('--carts', type=int, default=10000)
+
+    compare_parser = subparsers.add_parser('compare', help="compare two saved workload results")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'compare':
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        regressions = compare_results(baseline, current, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name} {metric}: {old:.2f} -> {new:.2f}")
+        if not regressions:
+            print("No regressions.")
+        sys.exit(1 if regressions else 0)
+
+    if args.benchmark == 'search':
+        result = bench_search(args.items, args.repeats)
+        print(f"Indexed {result['items']} items in {result['build_ms']:.0f} ms")
+        print(f"{'Query':<20} {'p50 ms':<10} {'p99 ms':<10}")
+        print("-" * 40)
+        for query, timings in result['latencies'].items():
+            print(f"{query:<20} {percentile(timings, 50):<10.3f} {percentile(timings, 99):<10.3f}")
+        return
+
+    if args.benchmark == 'trending':
+        result = bench_trending(args.orders)
+        print(f"Recorded {result['orders']} orders, {result['record_us']:.2f} us per order")
+        print(f"{'Window':<10} {'Cold us':<10} {'Cached us':<10}")
+        print("-" * 30)
+        for window, (cold, cached) in result['top_us'].items():
+            print(f"{window:<10} {cold:<10.1f} {cached:<10.2f}")
+        return
+
+    if args.benchmark == 'billing':
+        result = bench_billing(args.carts)
+        print(f"Priced {result['carts']} carts")
+        print(f"Float loop:          {result['float_ms']:.1f} ms")
+        print(f"BillingEngine batch: {result['engine_ms']:.1f} ms (Decimal results), "
+              f"{result['cents_ms']:.1f} ms (integer cents)")
+        print(f"Carts where the float result is off by a cent or more: {result['drifted_carts']}")
+        return
+
+    if args.benchmark == 'workload':
+        db = make_database(args.sqlite, pool_size=args.concurrency)
+        if not db.connect():
+            print("Failed to connect to database.")
+            sys.exit(1)
+        try:
+            results = run_workload(db, load_dataset(db), args.concurrency, args.duration, seed=args.seed)
+        finally:
+            db.disconnect()
+        print_workload_results(results)
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(results, file, indent=2)
+            print(f"Results saved to {args.output}")
+        return
+
+    if args.benchmark == 'startup':
+        result = bench_startup(args.instances, args.sqlite)
+        print(f"{result['instances']} instances, DDL ran {result['ddl_runs']} times")
+        print(f"Mean startup: {result['mean_ms']:.2f} ms, p95: {result['p95_ms']:.2f} ms")
+        return
+
+    db = make_database(args.sqlite)
+    if not db.connect():
+        print("Failed to connect to database.")
+        sys.exit(1)
+    db.initialize_database()
+
+    try:
+        if args.benchmark == 'place_order':
+            print_place_order_results(bench_place_order(db, args.sizes, args.repeats))
+        elif args.benchmark == 'generate':
+            dataset = generate_data(db, args.users, args.items, args.orders, args.days, args.seed)
+            print(f"Generated {len(dataset['users'])} users, {len(dataset['items'])} menu items "
+                  f"and {args.orders} orders")
+        elif args.benchmark == 'intake':
+            print(f"{'Workers':<10} {'Orders':<10} {'Failed':<10} {'Orders/s':<10}")
+            print("-" * 40)
+            for row in bench_intake(db, load_dataset(db), args.workers, args.orders):
+                print(f"{row['workers']:<10} {row['orders']:<10} {row['failed']:<10} {row['orders_per_sec']:<10.1f}")
+        elif args.benchmark == 'async':
+            print(f"{'Mode':<8} {'Requests':<10} {'Req/s':<10} {'p50 ms':<10} {'p95 ms':<10} {'Threads':<8}")
+            print("-" * 58)
+            for row in bench_async(db.backend, load_dataset(db), args.concurrency, args.requests, args.pool_size):
+                print(f"{row['mode']:<8} {row['requests']:<10} {row['requests_per_sec']:<10.1f} "
+                      f"{row['p50_ms']:<10.2f} {row['p95_ms']:<10.2f} {row['peak_threads']:<8}")
+        elif args.benchmark == 'group_commit':
+            print(f"{'Mode':<10} {'Orders':<8} {'Failed':<8} {'Orders/s':<10} {'p95 ms':<10} {'Batch':<6}")
+            print("-" * 56)
+            for row in bench_group_commit(db.backend, load_dataset(db), args.threads, args.orders,
+                                          args.max_batch, args.max_wait_ms):
+                print(f"{row['mode']:<10} {row['orders']:<8} {row['failed']:<8} {row['orders_per_sec']:<10.1f} "
+                      f"{row['p95_ms']:<10.2f} {row['avg_batch_size']:<6.1f}")
+        elif args.benchmark == 'kitchen':
+            print(f"{'Claimers':<10} {'Orders':<8} {'Dupes':<7} {'Retries':<9} {'Orders/s':<10} {'p95 claim ms':<12}")
+            print("-" * 58)
+            for row in bench_kitchen(db.backend, load_dataset(db), args.claimers, args.orders, args.batch):
+                print(f"{row['claimers']:<10} {row['orders']:<8} {row['duplicates']:<7} {row['retries']:<9} "
+                      f"{row['orders_per_sec']:<10.1f} {row['p95_claim_ms']:<12.2f}")
+        elif args.benchmark == 'rows':
+            print(f"{'Format':<10} {'Rows':<10} {'Best ms':<10} {'Bytes/row':<10}")
+            print("-" * 40)
+            for row in bench_rows(db.backend, args.repeats):
+                print(f"{row['row_format']:<10} {row['rows']:<10} {row['best_ms']:<10.1f} {row['bytes_per_row']:<10.0f}")
+        elif args.benchmark == 'timeseries':
+            print(f"{'Bucket':<8} {'Category':<16} {'Buckets':<10} {'Best ms':<10}")
+            print("-" * 44)
+            for row in bench_timeseries(db, args.repeats):
+                print(f"{row['bucket']:<8} {row['category']:<16} {row['buckets']:<10} {row['best_ms']:<10.1f}")
+        elif args.benchmark == 'export':
+            result = bench_export(db, args.chunk_size, args.gzip)
+            print(f"Exported {result['rows']} rows in {result['seconds']:.2f} s "
+                  f"({result['rows_per_sec']:.0f} rows/sec, {result['file_mb']:.1f} MB)")
+            if result['peak_rss_after_mb'] is not None:
+                print(f"Peak RSS: {result['peak_rss_before_mb']:.1f} MB before, "
+                      f"{result['peak_rss_after_mb']:.1f} MB after")
+    finally:
+        db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
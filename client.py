@@ -1,29 +1,47 @@
-import math
 from datetime import datetime
 import os
 import sys
+import time
 
 # Import the database module
 try:
-    from main import RestaurantDatabase
+    from main import ORDER_STATUSES, RestaurantDatabase
 except ImportError:
     print("Error: main.py not found. Please ensure main.py is in the same directory.")
     sys.exit(1)
 
 
 class RestaurantClient:
+    ORDERS_PAGE_SIZE = 10
+    TREND_BUCKETS = 12
+    
     def __init__(self):
-        self.db = RestaurantDatabase()
+        start = time.perf_counter()
+        # A small pool lets saved carts be written from a background timer
+        self.db = RestaurantDatabase(pool_size=2, row_format='objects')
         self.current_user = None
-        self.cart = []
+        self.cart = None  # Cart of the logged-in user
         
         # Connect to database
         if not self.db.connect():
             print("Failed to connect to database. Exiting...")
             sys.exit(1)
         
-        # Initialize database tables
-        self.db.initialize_database()
+        # Initialize database tables (skips all DDL when the schema is current)
+        ran_ddl = self.db.initialize_database()
+        
+        self.startup_ms = (time.perf_counter() - start) * 1000
+        print(f"Startup took {self.startup_ms:.1f} ms ({'schema updated' if ran_ddl else 'schema current'})")
+        
+        # Set RESTAURANT_INSTRUMENT=1 to collect query timings (Admin Panel > Query Statistics)
+        if os.environ.get('RESTAURANT_INSTRUMENT'):
+            self.db.enable_instrumentation()
+        
+        # Serve menu screens from an in-process cache
+        self.db.enable_menu_cache()
+        self.db.enable_analytics_cache(ttl=30)
+        self.db.enable_menu_search()
+        self.db.enable_popular_items()
     
     def clear_screen(self):
         """Clear the console screen"""
@@ -71,7 +89,10 @@ class RestaurantClient:
         
         if result['success']:
             self.current_user = result['user']
+            self.cart = self.db.load_cart(self.current_user['user_id'])
             print(f"\n✓ Welcome, {self.current_user['name']}!")
+            if self.cart:
+                print(f"Your saved cart has {len(self.cart)} items.")
         else:
             print(f"\n✗ {result['message']}")
         
@@ -79,8 +100,12 @@ class RestaurantClient:
     
     def logout(self):
         """Logout current user"""
+        if self.cart is not None:
+            self.cart.flush()
+            if self.cart.last_error:
+                print(f"\n✗ Your cart could not be saved: {self.cart.last_error}")
         self.current_user = None
-        self.cart = []
+        self.cart = None
         print("\n✓ Logged out successfully!")
         input("\nPress Enter to continue...")
     
@@ -97,6 +122,7 @@ class RestaurantClient:
         for i, cat in enumerate(categories, 1):
             print(f"{i}. {cat}")
         print(f"{len(categories) + 1}. All Items")
+        print("S. Search by Name")
         print("0. Back to Main Menu")
         
         choice = input("\nEnter choice: ")
@@ -105,7 +131,9 @@ class RestaurantClient:
             return
         
         # Get menu items
-        if choice.isdigit() and 1 <= int(choice) <= len(categories):
+        if choice.lower() == 's':
+            items = self.db.search_menu(input("Search for: "), limit=20)
+        elif choice.isdigit() and 1 <= int(choice) <= len(categories):
             category = categories[int(choice) - 1]
             items = self.db.get_menu(category)
         else:
@@ -162,24 +190,11 @@ class RestaurantClient:
                 input("\nPress Enter to continue...")
                 return
             
-            # Find item
-            menu_item = self.db.get_item_by_id(item_id)
+            # Merges with an existing line for the same item
+            line = self.cart.add(item_id, quantity)
             
-            if menu_item:
-                # Check if item already in cart
-                cart_item = next((ci for ci in self.cart if ci['item_id'] == item_id), None)
-                
-                if cart_item:
-                    cart_item['quantity'] += quantity
-                else:
-                    self.cart.append({
-                        'item_id': item_id,
-                        'name': menu_item['name'],
-                        'price': float(menu_item['price']),
-                        'quantity': quantity
-                    })
-                
-                print(f"\n✓ Added {quantity} x {menu_item['name']} to cart")
+            if line:
+                print(f"\n✓ Added {quantity} x {line['name']} to cart")
             else:
                 print("\n✗ Item not found!")
                 
@@ -198,20 +213,15 @@ class RestaurantClient:
             print(f"{'Item Name':<35} {'Qty':<6} {'Price':<12} {'Subtotal':<12}")
             self.print_line()
             
-            total = 0
-            for item in self.cart:
-                subtotal = item['price'] * item['quantity']
-                total += subtotal
-                print(f"{item['name']:<35} {item['quantity']:<6} ₹{item['price']:<11.2f} ₹{subtotal:<11.2f}")
-            
-            # Calculate tax using math.ceil
-            tax = math.ceil(total * 0.05 * 100) / 100
-            final_amount = total + tax
+            # Priced by the same billing engine that will store the order
+            bill = self.cart.bill()
+            for item, line in zip(self.cart.lines(), bill['lines']):
+                print(f"{item['name']:<35} {line['quantity']:<6} ₹{line['price']:<11.2f} ₹{line['subtotal']:<11.2f}")
             
             self.print_line()
-            print(f"{'Subtotal:':<55} ₹{total:.2f}")
-            print(f"{'Tax (5%):':<55} ₹{tax:.2f}")
-            print(f"{'Grand Total:':<55} ₹{final_amount:.2f}")
+            print(f"{'Subtotal:':<55} ₹{bill['total']:.2f}")
+            print(f"{'Tax:':<55} ₹{bill['tax']:.2f}")
+            print(f"{'Grand Total:':<55} ₹{bill['final_amount']:.2f}")
             self.print_line()
         
         input("\nPress Enter to continue...")
@@ -225,8 +235,9 @@ class RestaurantClient:
         
         self.print_header("MODIFY CART")
         
+        lines = self.cart.lines()
         print("Your Cart Items:")
-        for i, item in enumerate(self.cart, 1):
+        for i, item in enumerate(lines, 1):
             print(f"{i}. {item['name']} - Qty: {item['quantity']} - ₹{item['price']:.2f}")
         
         print("\n1. Remove Item")
@@ -239,8 +250,8 @@ class RestaurantClient:
         if choice == '1':
             try:
                 idx = int(input("Enter item number to remove: ")) - 1
-                if 0 <= idx < len(self.cart):
-                    removed = self.cart.pop(idx)
+                if 0 <= idx < len(lines):
+                    removed = self.cart.remove(lines[idx]['item_id'])
                     print(f"\n✓ Removed {removed['name']} from cart")
                 else:
                     print("\n✗ Invalid item number!")
@@ -250,10 +261,10 @@ class RestaurantClient:
         elif choice == '2':
             try:
                 idx = int(input("Enter item number: ")) - 1
-                if 0 <= idx < len(self.cart):
+                if 0 <= idx < len(lines):
                     new_qty = int(input("Enter new quantity: "))
                     if new_qty > 0:
-                        self.cart[idx]['quantity'] = new_qty
+                        self.cart.set_quantity(lines[idx]['item_id'], new_qty)
                         print(f"\n✓ Updated quantity to {new_qty}")
                     else:
                         print("\n✗ Invalid quantity!")
@@ -265,7 +276,7 @@ class RestaurantClient:
         elif choice == '3':
             confirm = input("Clear entire cart? (yes/no): ").lower()
             if confirm == 'yes':
-                self.cart = []
+                self.cart.clear()
                 print("\n✓ Cart cleared!")
         
         input("\nPress Enter to continue...")
@@ -285,22 +296,17 @@ class RestaurantClient:
         self.print_header("CONFIRM ORDER")
         
         # Show cart summary
-        total = sum(item['price'] * item['quantity'] for item in self.cart)
-        tax = math.ceil(total * 0.05 * 100) / 100
-        final_amount = total + tax
+        bill = self.cart.bill()
         
         print(f"Items in cart: {len(self.cart)}")
-        print(f"Total amount: ₹{final_amount:.2f}")
+        print(f"Total amount: ₹{bill['final_amount']:.2f}")
         print(f"\nDelivery to: {self.current_user['name']}")
         
         confirm = input("\nConfirm order? (yes/no): ").lower()
         
         if confirm == 'yes':
-            # Prepare order items
-            order_items = [{"item_id": item['item_id'], "quantity": item['quantity']} 
-                          for item in self.cart]
-            
-            result = self.db.place_order(self.current_user['user_id'], order_items)
+            # Re-checks prices and availability before placing the order
+            result = self.cart.checkout()
             
             if result['success']:
                 print("\n" + "="*70)
@@ -311,15 +317,45 @@ class RestaurantClient:
                 print(f"Payment Mode: Cash on Delivery")
                 print(f"\nThank you for your order, {self.current_user['name']}!")
                 print("="*70)
-                
-                self.cart = []  # Clear cart
             else:
                 print(f"\n✗ {result['message']}")
+                for change in result.get('changes', []):
+                    print(f"  - {change}")
         else:
             print("\nOrder cancelled.")
         
         input("\nPress Enter to continue...")
     
+    def show_orders_paged(self, user_id=None, status=None, show_customer=False):
+        """Show orders one page at a time"""
+        after = None
+        page = 1
+        while True:
+            result = self.db.get_orders_page(user_id, self.ORDERS_PAGE_SIZE, after, status)
+            orders = result['orders']
+            
+            if not orders:
+                print("No orders found.")
+                return
+            
+            print(f"Page {page}")
+            for order in orders:
+                print(f"\nOrder ID: {order['order_id']}")
+                if show_customer:
+                    print(f"Customer: {order['customer_name']}")
+                print(f"Date: {order['order_date']}")
+                print(f"Items: {order['items']}")
+                print(f"Total: ₹{order['final_amount']:.2f}")
+                print(f"Status: {order['status']}")
+                self.print_line()
+            
+            after = result['next_cursor']
+            if not after:
+                return
+            if input("\nPress N for next page, Enter to stop: ").lower() != 'n':
+                return
+            page += 1
+    
     def view_order_history(self):
         """View order history"""
         if not self.current_user:
@@ -329,18 +365,7 @@ class RestaurantClient:
         
         self.print_header("ORDER HISTORY")
         
-        orders = self.db.get_user_orders(self.current_user['user_id'])
-        
-        if not orders:
-            print("No orders found.")
-        else:
-            for order in orders:
-                print(f"\nOrder ID: {order['order_id']}")
-                print(f"Date: {order['order_date']}")
-                print(f"Items: {order['items']}")
-                print(f"Total: ₹{order['final_amount']:.2f}")
-                print(f"Status: {order['status']}")
-                self.print_line()
+        self.show_orders_paged(user_id=self.current_user['user_id'])
         
         input("\nPress Enter to continue...")
     
@@ -350,11 +375,18 @@ class RestaurantClient:
         """Admin panel"""
         self.print_header("ADMIN PANEL")
         
+        print(f"Client startup time: {self.startup_ms:.1f} ms\n")
+        
         print("1. Add Menu Item")
         print("2. View All Orders")
         print("3. Export Menu to CSV")
         print("4. Export Orders to CSV")
         print("5. View Analytics")
+        print("6. Export New Orders to CSV (incremental)")
+        print("7. Query Statistics")
+        print("8. Import Menu from CSV")
+        print("9. Archive Old Orders")
+        print("10. Kitchen Queue")
         print("0. Back to Main Menu")
         
         choice = input("\nEnter choice: ")
@@ -369,6 +401,16 @@ class RestaurantClient:
             self.export_orders()
         elif choice == '5':
             self.view_analytics()
+        elif choice == '6':
+            self.export_new_orders()
+        elif choice == '7':
+            self.view_query_stats()
+        elif choice == '8':
+            self.import_menu()
+        elif choice == '9':
+            self.archive_orders()
+        elif choice == '10':
+            self.kitchen_queue()
     
     def add_menu_item(self):
         """Add new menu item"""
@@ -396,9 +438,9 @@ class RestaurantClient:
         """View all orders (admin)"""
         self.print_header("ALL ORDERS")
         
-        # This is simplified - in real app you'd want pagination
-        print("Feature: View all orders in database")
-        print("(This would show all orders from all users)")
+        status = input("Filter by status (Enter for all): ").strip()
+        print()
+        self.show_orders_paged(status=status or None, show_customer=True)
         
         input("\nPress Enter to continue...")
     
@@ -411,6 +453,92 @@ class RestaurantClient:
         
         input("\nPress Enter to continue...")
     
+    def import_menu(self):
+        """Import menu items from CSV, updating existing items with the same name and category"""
+        self.print_header("IMPORT MENU")
+        
+        filename = input("CSV file (Enter for menu_export.csv): ").strip() or 'menu_export.csv'
+        dry_run = input("Dry run? (y/n): ").strip().lower() == 'y'
+        
+        result = self.db.import_menu_from_csv(filename, dry_run=dry_run)
+        if result['success']:
+            print(f"\n✓ {result['message']}")
+        else:
+            print(f"\n✗ {result['message']}")
+        for error in result.get('errors', [])[:10]:
+            print(f"  {error}")
+        
+        input("\nPress Enter to continue...")
+    
+    def kitchen_queue(self):
+        """Claim pending orders and move orders through the kitchen workflow"""
+        self.print_header("KITCHEN QUEUE")
+        
+        for status in ORDER_STATUSES[:-1]:
+            orders = self.db.get_order_queue(status, 5)
+            print(f"{status}: " + (", ".join(f"#{order['order_id']}" for order in orders) or "none"))
+        
+        print("\n1. Claim Next Orders")
+        print("2. Mark Orders Ready")
+        print("3. Mark Orders Delivered")
+        print("0. Back")
+        choice = input("\nEnter choice: ")
+        
+        if choice == '1':
+            try:
+                count = int(input("How many orders? ") or 1)
+            except ValueError:
+                print("\n✗ Invalid number!")
+                input("\nPress Enter to continue...")
+                return
+            result = self.db.claim_orders(count)
+            if not result['success']:
+                print(f"\n✗ {result['message']}")
+            elif not result['orders']:
+                print("\nNo pending orders.")
+            for order in result.get('orders', []):
+                print(f"\nOrder ID: {order['order_id']}  ({order['order_date']})")
+                print(f"Items: {order['items']}")
+        elif choice in ('2', '3'):
+            status = 'Ready' if choice == '2' else 'Delivered'
+            try:
+                order_ids = [int(value) for value in input("Order IDs (comma separated): ").split(',') if value.strip()]
+            except ValueError:
+                print("\n✗ Invalid order ID!")
+                input("\nPress Enter to continue...")
+                return
+            result = self.db.update_orders_status(order_ids, status)
+            if result['success']:
+                print(f"\n✓ {result['message']}")
+                if result['skipped']:
+                    print(f"Skipped (not in the previous step): {', '.join(map(str, result['skipped']))}")
+            else:
+                print(f"\n✗ {result['message']}")
+        else:
+            return
+        
+        input("\nPress Enter to continue...")
+    
+    def archive_orders(self):
+        """Move old orders out of the hot tables in batches"""
+        self.print_header("ARCHIVE OLD ORDERS")
+        
+        days = input(f"Archive orders older than how many days? (Enter for {self.db.archive_after_days}): ").strip()
+        try:
+            days = int(days) if days else None
+        except ValueError:
+            print("\n✗ Invalid number of days!")
+            input("\nPress Enter to continue...")
+            return
+        
+        result = self.db.archive_orders(days, progress=lambda count: print(f"  {count} orders archived..."))
+        if result['success']:
+            print(f"\n✓ {result['message']}")
+        else:
+            print(f"\n✗ {result['message']} (run again to continue)")
+        
+        input("\nPress Enter to continue...")
+    
     def export_orders(self):
         """Export orders to CSV"""
         self.print_header("EXPORT ORDERS")
@@ -420,28 +548,85 @@ class RestaurantClient:
         
         input("\nPress Enter to continue...")
     
+    def export_new_orders(self):
+        """Append new and changed orders to the incremental CSV export"""
+        self.print_header("EXPORT NEW ORDERS")
+        
+        count = self.db.export_orders_incremental(include_details=True)
+        print(f"\n✓ {count} new rows appended to orders_incremental.csv")
+        
+        input("\nPress Enter to continue...")
+    
+    def read_date(self, prompt):
+        """Read an optional YYYY-MM-DD date (None if left blank)"""
+        text = input(prompt).strip()
+        if not text:
+            return None
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    
+    def view_query_stats(self):
+        """Show query timings collected by the instrumentation layer"""
+        self.print_header("QUERY STATISTICS")
+        
+        if self.db.stats:
+            print(self.db.stats.report())
+            print(f"\nSlow queries are logged to {self.db.stats.slow_log_file}")
+        else:
+            print("Instrumentation is off. Start the client with RESTAURANT_INSTRUMENT=1 to enable it.")
+        
+        input("\nPress Enter to continue...")
+    
     def view_analytics(self):
         """View analytics"""
         self.print_header("ANALYTICS")
         
+        try:
+            start_date = self.read_date("Start date (YYYY-MM-DD, Enter for all time): ")
+            end_date = self.read_date("End date (YYYY-MM-DD, Enter for today): ")
+        except ValueError:
+            print("\n✗ Invalid date!")
+            input("\nPress Enter to continue...")
+            return
+        print()
+        
         # Total Revenue
-        revenue = self.db.get_total_revenue()
+        revenue = self.db.get_total_revenue(start_date, end_date)
         print(f"Total Revenue: ₹{revenue:.2f}\n")
         
         # Popular Items
         print("Top 5 Popular Items:")
         self.print_line()
-        popular = self.db.get_popular_items()
+        popular = self.db.get_popular_items(start_date, end_date)
         for item in popular:
             print(f"{item['name']:<40} Orders: {item['total_orders']}")
         
+        # Trending items (live, not limited to the date range)
+        for window, label in (('15m', "last 15 minutes"), ('1h', "last hour"), ('today', "today")):
+            trending = self.db.get_trending_items(window, 3)
+            names = ", ".join(f"{item['name']} ({item['total_orders']})" for item in trending)
+            print(f"\nTrending {label}: {names or 'no orders'}")
+        
         # Category Sales
         print("\nCategory-wise Sales:")
         self.print_line()
-        sales = self.db.get_category_sales()
+        sales = self.db.get_category_sales(start_date, end_date)
         for cat in sales:
             print(f"{cat['category']:<40} ₹{cat['category_revenue']:.2f}")
         
+        # Recent trend, by day for short ranges and by week otherwise
+        last_day = end_date or datetime.now().date()
+        bucket = 'day' if start_date and (last_day - start_date).days <= 31 else 'week'
+        series = self.db.get_sales_timeseries(start_date, end_date, bucket)
+        print(f"\nSales by {bucket} (latest {self.TREND_BUCKETS}):")
+        self.print_line()
+        trend = zip(series['start'], series['orders'], series['revenue'])
+        for start, orders, revenue in list(trend)[-self.TREND_BUCKETS:]:
+            print(f"{start!s:<20} Orders: {orders:<10} ₹{revenue:.2f}")
+        
+        stats = self.db.analytics_cache.stats()
+        print(f"\nAnalytics cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['shared']} shared, hit rate {stats['hit_rate']:.0%}")
+        
         input("\nPress Enter to continue...")
     
     # MAIN MENU
@@ -495,6 +680,10 @@ class RestaurantClient:
             elif choice == '0':
                 print("\nThank you for using our system!")
                 print("Goodbye!")
+                if self.cart is not None:
+                    self.cart.flush()
+                    if self.cart.last_error:
+                        print(f"✗ Your cart could not be saved: {self.cart.last_error}")
                 self.db.disconnect()
                 break
             else:
@@ -46,8 +46,232 @@ CREATE TABLE IF NOT EXISTS order_details (
     FOREIGN KEY (item_id) REFERENCES menu(item_id)
 );
 
+-- Menu Version Table (bumped on every menu change for cache invalidation)
+CREATE TABLE IF NOT EXISTS menu_version (
+    id INT PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO menu_version (id, version) VALUES (1, 0);
+
+-- Helpers that keep the schema changes below safe to re-run: MySQL has no
+-- CREATE INDEX IF NOT EXISTS or ADD COLUMN IF NOT EXISTS
+DROP PROCEDURE IF EXISTS add_index_if_missing;
+DROP PROCEDURE IF EXISTS add_column_if_missing;
+
+DELIMITER //
+CREATE PROCEDURE add_index_if_missing(IN table_name_in VARCHAR(64), IN index_name_in VARCHAR(64), IN ddl TEXT)
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.statistics
+                   WHERE table_schema = DATABASE() AND table_name = table_name_in
+                     AND index_name = index_name_in) THEN
+        SET @ddl = ddl;
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+
+CREATE PROCEDURE add_column_if_missing(IN table_name_in VARCHAR(64), IN column_name_in VARCHAR(64), IN ddl TEXT)
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = DATABASE() AND table_name = table_name_in
+                     AND column_name = column_name_in) THEN
+        SET @ddl = ddl;
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END //
+DELIMITER ;
+
+-- Indexes for the hot query paths (migration 1 in main.py)
+CALL add_index_if_missing('orders', 'idx_orders_user_date', 'CREATE INDEX idx_orders_user_date ON orders (user_id, order_date)');
+CALL add_index_if_missing('menu', 'idx_menu_category_availability', 'CREATE INDEX idx_menu_category_availability ON menu (category, availability)');
+CALL add_index_if_missing('order_details', 'idx_order_details_item', 'CREATE INDEX idx_order_details_item ON order_details (item_id, quantity, subtotal)');
+
+-- Change tracking for incremental export (migration 2 in main.py)
+CALL add_column_if_missing('orders', 'updated_at',
+    'ALTER TABLE orders ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP');
+CALL add_index_if_missing('orders', 'idx_orders_updated', 'CREATE INDEX idx_orders_updated ON orders (updated_at, order_id)');
+
+-- Indexes for paginated order listings (migration 3 in main.py)
+CALL add_index_if_missing('orders', 'idx_orders_date', 'CREATE INDEX idx_orders_date ON orders (order_date, order_id)');
+CALL add_index_if_missing('orders', 'idx_orders_status_date', 'CREATE INDEX idx_orders_status_date ON orders (status, order_date, order_id)');
+
+-- Natural key for menu imports (migration 5 in main.py). Older versions of
+-- this script inserted the sample menu again on every run, so merge duplicate
+-- items into the lowest item_id first; the rollups are recomputed further down.
+UPDATE order_details SET item_id = (
+    SELECT MIN(keep.item_id) FROM menu dup
+    JOIN menu keep ON keep.name = dup.name AND keep.category = dup.category
+    WHERE dup.item_id = order_details.item_id
+)
+WHERE item_id IN (
+    SELECT m.item_id FROM menu m
+    WHERE EXISTS (SELECT 1 FROM menu other
+                  WHERE other.name = m.name AND other.category = m.category
+                    AND other.item_id <> m.item_id)
+);
+DELETE FROM menu WHERE item_id IN (
+    SELECT item_id FROM (
+        SELECT DISTINCT dup.item_id FROM menu dup
+        JOIN menu keep ON keep.name = dup.name AND keep.category = dup.category
+                      AND keep.item_id < dup.item_id
+    ) duplicates
+);
+CALL add_index_if_missing('menu', 'idx_menu_name_category', 'CREATE UNIQUE INDEX idx_menu_name_category ON menu (name, category)');
+
+-- Saved Shopping Carts (migration 6 in main.py, written behind by Cart)
+CREATE TABLE IF NOT EXISTS cart_items (
+    user_id INT NOT NULL,
+    item_id INT NOT NULL,
+    quantity INT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, item_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (item_id) REFERENCES menu(item_id)
+);
+
+-- Archived Orders (migration 7 in main.py, filled by archive_orders)
+CREATE TABLE IF NOT EXISTS orders_archive (
+    order_id INT PRIMARY KEY,
+    user_id INT,
+    order_date TIMESTAMP NULL,
+    total_amount DECIMAL(10, 2),
+    tax_amount DECIMAL(10, 2),
+    final_amount DECIMAL(10, 2),
+    status VARCHAR(20),
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS order_details_archive (
+    detail_id INT PRIMARY KEY,
+    order_id INT,
+    item_id INT,
+    quantity INT,
+    price DECIMAL(10, 2),
+    subtotal DECIMAL(10, 2)
+);
+
+CALL add_index_if_missing('orders_archive', 'idx_orders_archive_user_date', 'CREATE INDEX idx_orders_archive_user_date ON orders_archive (user_id, order_date)');
+CALL add_index_if_missing('orders_archive', 'idx_orders_archive_date', 'CREATE INDEX idx_orders_archive_date ON orders_archive (order_date, order_id)');
+CALL add_index_if_missing('order_details_archive', 'idx_order_details_archive_order', 'CREATE INDEX idx_order_details_archive_order ON order_details_archive (order_id)');
+
+-- Migration 8 in main.py only indexes order_details (order_id) on SQLite;
+-- MySQL already has that index for the foreign key
+
+-- Daily Analytics Rollups (migration 4 in main.py, maintained by place_order)
+CREATE TABLE IF NOT EXISTS daily_revenue (
+    sale_date DATE PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    items_sold INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS daily_item_sales (
+    sale_date DATE NOT NULL,
+    item_id INT NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, item_id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_category_sales (
+    sale_date DATE NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    order_count INT NOT NULL DEFAULT 0,
+    quantity INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, category)
+);
+
+-- Backfill the rollups from existing orders, archived ones included, as
+-- migration 4 and RestaurantDatabase.rebuild_rollups() do. Cleared first, so
+-- re-running the script recomputes them instead of double counting.
+DELETE FROM daily_revenue;
+DELETE FROM daily_item_sales;
+DELETE FROM daily_category_sales;
+
+INSERT INTO daily_revenue (sale_date, order_count, items_sold, revenue)
+SELECT DATE(o.order_date), COUNT(*), COALESCE(SUM(o.items), 0), SUM(o.final_amount)
+FROM (
+    SELECT o.order_id, o.order_date, o.final_amount, SUM(od.quantity) AS items
+    FROM orders o
+    LEFT JOIN order_details od ON od.order_id = o.order_id
+    GROUP BY o.order_id, o.order_date, o.final_amount
+) o
+GROUP BY DATE(o.order_date);
+
+INSERT INTO daily_revenue (sale_date, order_count, items_sold, revenue)
+SELECT DATE(o.order_date), COUNT(*), COALESCE(SUM(o.items), 0), SUM(o.final_amount)
+FROM (
+    SELECT o.order_id, o.order_date, o.final_amount, SUM(od.quantity) AS items
+    FROM orders_archive o
+    LEFT JOIN order_details_archive od ON od.order_id = o.order_id
+    GROUP BY o.order_id, o.order_date, o.final_amount
+) o
+GROUP BY DATE(o.order_date)
+ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count),
+                        items_sold = items_sold + VALUES(items_sold),
+                        revenue = revenue + VALUES(revenue);
+
+INSERT INTO daily_item_sales (sale_date, item_id, quantity, revenue)
+SELECT DATE(o.order_date), od.item_id, SUM(od.quantity), SUM(od.subtotal)
+FROM order_details od
+JOIN orders o ON o.order_id = od.order_id
+GROUP BY DATE(o.order_date), od.item_id;
+
+INSERT INTO daily_item_sales (sale_date, item_id, quantity, revenue)
+SELECT DATE(o.order_date), od.item_id, SUM(od.quantity), SUM(od.subtotal)
+FROM order_details_archive od
+JOIN orders_archive o ON o.order_id = od.order_id
+GROUP BY DATE(o.order_date), od.item_id
+ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity),
+                        revenue = revenue + VALUES(revenue);
+
+INSERT INTO daily_category_sales (sale_date, category, order_count, quantity, revenue)
+SELECT DATE(o.order_date), COALESCE(m.category, ''),
+       COUNT(DISTINCT od.order_id), SUM(od.quantity), SUM(od.subtotal)
+FROM order_details od
+JOIN orders o ON o.order_id = od.order_id
+JOIN menu m ON m.item_id = od.item_id
+GROUP BY DATE(o.order_date), COALESCE(m.category, '');
+
+INSERT INTO daily_category_sales (sale_date, category, order_count, quantity, revenue)
+SELECT DATE(o.order_date), COALESCE(m.category, ''),
+       COUNT(DISTINCT od.order_id), SUM(od.quantity), SUM(od.subtotal)
+FROM order_details_archive od
+JOIN orders_archive o ON o.order_id = od.order_id
+JOIN menu m ON m.item_id = od.item_id
+GROUP BY DATE(o.order_date), COALESCE(m.category, '')
+ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count),
+                        quantity = quantity + VALUES(quantity),
+                        revenue = revenue + VALUES(revenue);
+
+-- Schema Version Table (records applied migrations)
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    description VARCHAR(200),
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+DROP PROCEDURE add_index_if_missing;
+DROP PROCEDURE add_column_if_missing;
+
+INSERT IGNORE INTO schema_version (version, description) VALUES
+(1, 'Indexes for order history, menu browsing and analytics'),
+(2, 'Track order changes for incremental export'),
+(3, 'Indexes for paginated order listings'),
+(4, 'Daily analytics rollup tables'),
+(5, 'Natural key for menu imports'),
+(6, 'Saved shopping carts'),
+(7, 'Archive tables for old orders'),
+(8, 'Index order lines by order on SQLite');
+
 -- Insert Sample Menu Items
-INSERT INTO menu (name, category, price, availability) VALUES
+INSERT IGNORE INTO menu (name, category, price, availability) VALUES
 ('Paneer Tikka', 'Starters', 250.00, TRUE),
 ('Chicken Tikka', 'Starters', 300.00, TRUE),
 ('Veg Spring Roll', 'Starters', 180.00, TRUE),
@@ -88,6 +312,29 @@ GROUP BY o.order_id;
 -- Calculate total revenue
 SELECT SUM(final_amount) as total_revenue FROM orders;
 
+-- Revenue, orders and items sold per day (from the rollup)
+SELECT sale_date, order_count, items_sold, revenue
+FROM daily_revenue
+WHERE sale_date >= '2024-01-01' AND sale_date < '2024-02-01'
+ORDER BY sale_date;
+
+-- Revenue and orders per hour
+SELECT
+    DATE_ADD(DATE(order_date), INTERVAL HOUR(order_date) HOUR) as hour_start,
+    COUNT(*) as order_count,
+    SUM(final_amount) as revenue
+FROM orders
+WHERE order_date >= '2024-01-01' AND order_date < '2024-01-08'
+GROUP BY hour_start
+ORDER BY hour_start;
+
+-- Kitchen queue: oldest pending orders (uses idx_orders_status_date)
+SELECT order_id, order_date, final_amount
+FROM orders
+WHERE status = 'Pending'
+ORDER BY order_date, order_id
+LIMIT 10;
+
 -- Most popular items
 SELECT 
     m.name,
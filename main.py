@@ -1,359 +1,3867 @@
-import mysql.connector
-from mysql.connector import Error
-import math
+try:
+    import mysql.connector
+    from mysql.connector import Error
+except ImportError:
+    # Only the SQLite backend can be used without mysql-connector-python
+    mysql = None
+
+    class Error(Exception):
+        """Database error (stands in for mysql.connector.Error)"""
+
+        def __init__(self, msg=None, errno=None):
+            super().__init__(msg)
+            self.msg = msg
+            self.errno = errno
+import asyncio
+import bisect
 import csv
-from datetime import datetime
+import gzip
+import heapq
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 import hashlib
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
+
+# Daily analytics rollups: (table, key columns, value columns, source query)
+# Each source query aggregates the base tables for the orders matching {where}
+ROLLUPS = [
+    # Items are summed per order first, over the filtered orders only
+    ("daily_revenue", ("sale_date",), ("order_count", "items_sold", "revenue"), """
+        SELECT DATE(o.order_date), COUNT(*), COALESCE(SUM(o.items), 0), SUM(o.final_amount)
+        FROM (
+            SELECT o.order_id, o.order_date, o.final_amount, SUM(od.quantity) AS items
+            FROM orders o
+            LEFT JOIN order_details od ON od.order_id = o.order_id
+            WHERE {where}
+            GROUP BY o.order_id, o.order_date, o.final_amount
+        ) o
+        GROUP BY DATE(o.order_date)
+    """),
+    ("daily_item_sales", ("sale_date", "item_id"), ("quantity", "revenue"), """
+        SELECT DATE(o.order_date), od.item_id, SUM(od.quantity), SUM(od.subtotal)
+        FROM order_details od
+        JOIN orders o ON o.order_id = od.order_id
+        WHERE {where}
+        GROUP BY DATE(o.order_date), od.item_id
+    """),
+    ("daily_category_sales", ("sale_date", "category"), ("order_count", "quantity", "revenue"), """
+        SELECT DATE(o.order_date), COALESCE(m.category, ''),
+               COUNT(DISTINCT od.order_id), SUM(od.quantity), SUM(od.subtotal)
+        FROM order_details od
+        JOIN orders o ON o.order_id = od.order_id
+        JOIN menu m ON m.item_id = od.item_id
+        WHERE {where}
+        GROUP BY DATE(o.order_date), COALESCE(m.category, '')
+    """),
+]
+
+
+def rollup_insert_sql(table, keys, values, source, where):
+    """Build the INSERT ... SELECT that fills a rollup table from its source query"""
+    columns = ', '.join(keys + values)
+    return f"INSERT INTO {table} ({columns}) " + source.format(where=where)
+
+
+def archive_sql(query):
+    """Point a query at orders_archive and order_details_archive instead of the hot tables"""
+    return re.sub(r'\b(orders|order_details)\b', r'\1_archive', query)
+
+
+# Menu items that share their name and category with another item
+DUPLICATE_MENU_ITEMS = """
+    SELECT m.item_id FROM menu m
+    WHERE EXISTS (SELECT 1 FROM menu other
+                  WHERE other.name = m.name AND other.category = m.category
+                    AND other.item_id <> m.item_id)
+"""
+
+
+# Schema migrations applied in order by RestaurantDatabase.migrate()
+# Each entry is (version, description, list of SQL statements)
+MIGRATIONS = [
+    (1, "Indexes for order history, menu browsing and analytics", [
+        "CREATE INDEX idx_orders_user_date ON orders (user_id, order_date)",
+        "CREATE INDEX idx_menu_category_availability ON menu (category, availability)",
+        "CREATE INDEX idx_order_details_item ON order_details (item_id, quantity, subtotal)",
+    ]),
+    (2, "Track order changes for incremental export", [
+        {"mysql": "ALTER TABLE orders ADD COLUMN updated_at TIMESTAMP "
+                  "DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+         "sqlite": "ALTER TABLE orders ADD COLUMN updated_at TIMESTAMP"},
+        "UPDATE orders SET updated_at = order_date",
+        "CREATE INDEX idx_orders_updated ON orders (updated_at, order_id)",
+        # SQLite has no ON UPDATE CURRENT_TIMESTAMP, so triggers keep updated_at current
+        {"mysql": "DO 0",
+         "sqlite": """CREATE TRIGGER IF NOT EXISTS orders_set_updated_at_insert
+                      AFTER INSERT ON orders WHEN NEW.updated_at IS NULL
+                      BEGIN UPDATE orders SET updated_at = CURRENT_TIMESTAMP
+                            WHERE order_id = NEW.order_id; END"""},
+        {"mysql": "DO 0",
+         "sqlite": """CREATE TRIGGER IF NOT EXISTS orders_set_updated_at_update
+                      AFTER UPDATE ON orders WHEN NEW.updated_at IS OLD.updated_at
+                      BEGIN UPDATE orders SET updated_at = CURRENT_TIMESTAMP
+                            WHERE order_id = NEW.order_id; END"""},
+    ]),
+    (3, "Indexes for paginated order listings", [
+        "CREATE INDEX idx_orders_date ON orders (order_date, order_id)",
+        "CREATE INDEX idx_orders_status_date ON orders (status, order_date, order_id)",
+    ]),
+    (4, "Daily analytics rollup tables", [
+        """CREATE TABLE IF NOT EXISTS daily_revenue (
+            sale_date DATE PRIMARY KEY,
+            order_count INT NOT NULL DEFAULT 0,
+            items_sold INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14, 2) NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS daily_item_sales (
+            sale_date DATE NOT NULL,
+            item_id INT NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, item_id)
+        )""",
+        """CREATE TABLE IF NOT EXISTS daily_category_sales (
+            sale_date DATE NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            order_count INT NOT NULL DEFAULT 0,
+            quantity INT NOT NULL DEFAULT 0,
+            revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, category)
+        )""",
+    ] + [
+        # Backfill from existing orders (cleared first so a re-run is safe)
+        statement
+        for table, keys, values, source in ROLLUPS
+        for statement in (f"DELETE FROM {table}",
+                          rollup_insert_sql(table, keys, values, source, "TRUE"))
+    ]),
+    (5, "Natural key for menu imports", [
+        # Merge duplicate menu rows into the lowest item_id first, or the unique
+        # index cannot be built (older setup scripts inserted the sample menu
+        # again on every run)
+        f"""UPDATE order_details SET item_id = (
+                SELECT MIN(keep.item_id) FROM menu dup
+                JOIN menu keep ON keep.name = dup.name AND keep.category = dup.category
+                WHERE dup.item_id = order_details.item_id
+            )
+            WHERE item_id IN ({DUPLICATE_MENU_ITEMS})""",
+        # Recount the merged items' daily_item_sales rollup (cart_items and the
+        # archive tables come in later migrations, so they cannot hold duplicates)
+        f"DELETE FROM daily_item_sales WHERE item_id IN ({DUPLICATE_MENU_ITEMS})",
+        rollup_insert_sql(*ROLLUPS[1], f"od.item_id IN ({DUPLICATE_MENU_ITEMS})"),
+        # The derived table is materialized, so MySQL lets the DELETE read menu
+        f"""DELETE FROM menu WHERE item_id IN (
+                SELECT item_id FROM (
+                    SELECT DISTINCT dup.item_id FROM menu dup
+                    JOIN menu keep ON keep.name = dup.name AND keep.category = dup.category
+                                  AND keep.item_id < dup.item_id
+                ) duplicates
+            )""",
+        "UPDATE menu_version SET version = version + 1 WHERE id = 1",
+        "CREATE UNIQUE INDEX idx_menu_name_category ON menu (name, category)",
+    ]),
+    (6, "Saved shopping carts", [
+        """CREATE TABLE IF NOT EXISTS cart_items (
+            user_id INT NOT NULL,
+            item_id INT NOT NULL,
+            quantity INT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, item_id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (item_id) REFERENCES menu(item_id)
+        )""",
+    ]),
+    (7, "Archive tables for old orders", [
+        # Same columns as orders and order_details; filled by archive_orders()
+        """CREATE TABLE IF NOT EXISTS orders_archive (
+            order_id INT PRIMARY KEY,
+            user_id INT,
+            order_date TIMESTAMP NULL,
+            total_amount DECIMAL(10, 2),
+            tax_amount DECIMAL(10, 2),
+            final_amount DECIMAL(10, 2),
+            status VARCHAR(20),
+            updated_at TIMESTAMP NULL,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS order_details_archive (
+            detail_id INT PRIMARY KEY,
+            order_id INT,
+            item_id INT,
+            quantity INT,
+            price DECIMAL(10, 2),
+            subtotal DECIMAL(10, 2)
+        )""",
+        "CREATE INDEX idx_orders_archive_user_date ON orders_archive (user_id, order_date)",
+        "CREATE INDEX idx_orders_archive_date ON orders_archive (order_date, order_id)",
+        "CREATE INDEX idx_order_details_archive_order ON order_details_archive (order_id)",
+    ]),
+    (8, "Index order lines by order on SQLite", [
+        # MySQL already indexes order_details.order_id for its foreign key; SQLite does not
+        {"mysql": "DO 0",
+         "sqlite": "CREATE INDEX idx_order_details_order ON order_details (order_id)"},
+    ]),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# MySQL errors that mean a migration statement was already applied
+# (table exists, duplicate column, duplicate index)
+ALREADY_APPLIED_ERRORS = (1050, 1060, 1061)
+
+# Lock wait timeout and deadlock: the transaction can simply be retried
+RETRYABLE_ERRORS = (1205, 1213)
+
+# Kitchen workflow: each order moves one step at a time, in this order
+ORDER_STATUSES = ['Pending', 'Preparing', 'Ready', 'Delivered']
+
+# Hot queries checked with EXPLAIN: (name, query, sample params, expected indexes)
+# login_user is served by the UNIQUE index on users.email, which SQLite names itself
+INDEX_CHECKS = [
+    ("login_user",
+     "SELECT user_id, name, email FROM users WHERE email = %s AND password = %s",
+     ('user@example.com', ''), ("email", "sqlite_autoindex_users_1")),
+    ("get_menu",
+     "SELECT * FROM menu WHERE category = %s AND availability = TRUE",
+     ('Starters',), ("idx_menu_category_availability",)),
+    ("get_user_orders",
+     "SELECT order_id FROM orders WHERE user_id = %s ORDER BY order_date DESC",
+     (1,), ("idx_orders_user_date",)),
+    ("get_orders_page",
+     "SELECT order_id FROM orders ORDER BY order_date DESC, order_id DESC LIMIT %s",
+     (11,), ("idx_orders_date",)),
+    ("get_order_details",
+     "SELECT detail_id FROM order_details WHERE order_id = %s",
+     (1,), ("order_id", "idx_order_details_order")),
+    ("get_popular_items",
+     "SELECT item_id, SUM(quantity) FROM order_details GROUP BY item_id",
+     (), ("idx_order_details_item",)),
+    ("claim_orders",
+     "SELECT order_id FROM orders WHERE status = %s ORDER BY order_date, order_id LIMIT %s",
+     ('Pending', 5), ("idx_orders_status_date",)),
+    ("archive_orders",
+     "SELECT order_id FROM orders WHERE order_date < %s ORDER BY order_date, order_id LIMIT %s",
+     ('2000-01-01', 1000), ("idx_orders_date",)),
+]
+
+
+# STORAGE BACKENDS
+#
+# RestaurantDatabase writes its SQL in the MySQL dialect. A backend opens
+# connections, and the SQLite backend rewrites each statement into SQLite's
+# dialect, so every public method works against either database.
+
+
+class MySQLBackend:
+    """MySQL server reached through mysql.connector"""
+
+    name = 'mysql'
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        """Open a new connection"""
+        if mysql is None:
+            raise Error(msg="mysql-connector-python is not installed")
+        return mysql.connector.connect(**self.config)
+
+    def ping(self, connection):
+        """Raise Error if the server no longer answers on connection"""
+        connection.ping(reconnect=False)
+
+    def migration_sql(self, statement):
+        """Pick this backend's version of a migration statement"""
+        return statement[self.name] if isinstance(statement, dict) else statement
+
+    def explain_indexes(self, cursor, query, params):
+        """Run EXPLAIN on query and return the names of the indexes it uses"""
+        cursor.execute("EXPLAIN " + query, params)
+        key = cursor.column_names.index('key')
+        return [row[key] for row in cursor.fetchall() if row[key]]
+
+    def collation_key(self, text):
+        """Key that is equal for texts the default case-insensitive collation treats as equal"""
+        return text.casefold()
+
+    def hour_bucket_sql(self, column):
+        """SQL expression truncating a DATETIME column to the start of its hour"""
+        return f"DATE_ADD(DATE({column}), INTERVAL HOUR({column}) HOUR)"
+
+    def begin_write(self, cursor):
+        """Start a transaction that will lock the rows it reads FOR UPDATE"""
+        cursor.execute("START TRANSACTION")
+
+
+@lru_cache(maxsize=512)
+def sqlite_sql(query):
+    """Rewrite a MySQL-dialect statement for SQLite"""
+    query = query.replace('%s', '?').replace('%%', '%')
+    query = query.replace('INSERT IGNORE', 'INSERT OR IGNORE')
+    query = query.replace('INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+    # SQLite locks the whole database for writes, so row locks are not needed
+    query = re.sub(r'\s+FOR UPDATE( SKIP LOCKED)?', '', query)
+    # CONCAT(a, b) -> (a || b), then GROUP_CONCAT(x SEPARATOR s) -> GROUP_CONCAT(x, s)
+    query = re.sub(
+        r'(?<!GROUP_)CONCAT\(([^()]*)\)',
+        lambda match: '(' + ' || '.join(arg.strip() for arg in match.group(1).split(',')) + ')',
+        query
+    )
+    query = re.sub(r"GROUP_CONCAT\((.*?) SEPARATOR ('[^']*')\)", r'GROUP_CONCAT(\1, \2)', query, flags=re.S)
+    if 'ON DUPLICATE KEY UPDATE' in query:
+        head, tail = query.split('ON DUPLICATE KEY UPDATE', 1)
+        query = head + 'ON CONFLICT DO UPDATE SET' + re.sub(r'VALUES\((\w+)\)', r'excluded.\1', tail)
+    return query
+
+
+# SQLite error messages mapped to the MySQL error numbers the code checks
+SQLITE_ERRNOS = [
+    ('already exists', 1050),
+    ('duplicate column name', 1060),
+    ('UNIQUE constraint failed', 1062),
+    ('database is locked', 1205),
+]
+
+
+def sqlite_error(error):
+    """Convert a sqlite3 error into the Error type used everywhere else"""
+    message = str(error)
+    errno = next((number for text, number in SQLITE_ERRNOS if text in message), None)
+    if errno == 1050 and message.startswith('index'):
+        errno = 1061
+    return Error(msg=message, errno=errno)
+
+
+class SQLiteCursor:
+    """sqlite3 cursor that accepts MySQL-dialect SQL and can return dict rows"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self.dictionary = dictionary
+
+    def execute(self, query, params=()):
+        try:
+            self._cursor.execute(sqlite_sql(query), tuple(params))
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+
+    def executemany(self, query, seq_params):
+        try:
+            self._cursor.executemany(sqlite_sql(query), [tuple(params) for params in seq_params])
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    def _convert(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._convert(self._cursor.fetchone())
+
+    def fetchmany(self, size):
+        return [self._convert(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._convert(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection with the parts of the mysql.connector API the code uses"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, dictionary=False, buffered=None):
+        try:
+            return SQLiteCursor(self._connection.cursor(), dictionary)
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+
+    def is_connected(self):
+        """False once the connection has been closed"""
+        try:
+            self._connection.total_changes
+            return True
+        except sqlite3.Error:
+            return False
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def commit(self):
+        try:
+            self._connection.commit()
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+
+    def rollback(self):
+        try:
+            self._connection.rollback()
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+
+    def close(self):
+        self._connection.close()
+
+
+# Store dates, timestamps and decimals as text and read them back as the
+# same Python types mysql.connector returns
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+
+class SQLiteBackend:
+    """Embedded SQLite database file, for tests and offline benchmarks
+
+    Pooled mode needs a file path, since every ':memory:' connection is a
+    separate empty database.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path='restaurant.db'):
+        self.path = path
+
+    def connect(self):
+        """Open a new connection"""
+        try:
+            connection = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False,
+                detect_types=sqlite3.PARSE_DECLTYPES
+            )
+            connection.execute("PRAGMA foreign_keys = ON")
+            if self.path != ':memory:':
+                connection.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.Error as e:
+            raise sqlite_error(e) from e
+        return SQLiteConnection(connection)
+
+    def ping(self, connection):
+        """Embedded connections cannot go stale"""
+
+    def migration_sql(self, statement):
+        """Pick this backend's version of a migration statement"""
+        return statement[self.name] if isinstance(statement, dict) else statement
+
+    def explain_indexes(self, cursor, query, params):
+        """Run EXPLAIN QUERY PLAN on query and return the names of the indexes it uses"""
+        cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+        used = []
+        for row in cursor.fetchall():
+            match = re.search(r'USING (?:COVERING )?INDEX (\w+)', row[-1])
+            if match:
+                used.append(match.group(1))
+        return used
+
+    def collation_key(self, text):
+        """Key that is equal for texts SQLite's default BINARY collation treats as equal"""
+        return text
+
+    def hour_bucket_sql(self, column):
+        """SQL expression truncating a DATETIME column to the start of its hour"""
+        return f"strftime('%Y-%m-%d %H:00:00', {column})"
+
+    def begin_write(self, cursor):
+        """Start a transaction that holds the write lock from its first read
+        
+        SQLite has no row locks, so this stands in for SELECT ... FOR UPDATE.
+        """
+        cursor.execute("BEGIN IMMEDIATE")
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections with health checks and reconnects"""
+
+    def __init__(self, backend, pool_size=5, checkout_timeout=30,
+                 health_check_interval=30, max_retries=5, backoff=0.5, max_backoff=8.0):
+        self.backend = backend
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        # Idle connections are stored as (connection, last_used) pairs, newest last
+        self._idle = []
+        self._created = 0
+        # Signalled whenever a connection is returned or a slot is freed
+        self._available = threading.Condition(threading.Lock())
+        self._closed = False
+
+    def _open_connection(self):
+        """Open a new connection, retrying with exponential backoff"""
+        delay = self.backoff
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return self.backend.connect()
+            except Error:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    def _close_quietly(self, connection):
+        """Close a connection, ignoring errors from an already dead socket"""
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _release_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def discard(self, connection):
+        """Drop a broken borrowed connection and free its slot for a new one"""
+        self._close_quietly(connection)
+        self._release_slot()
+
+    def _is_healthy(self, connection):
+        """Check that the server still answers on this connection"""
+        try:
+            self.backend.ping(connection)
+            return True
+        except Error:
+            return False
+
+    def checkout(self):
+        """Borrow a connection from the pool
+        
+        Waits up to checkout_timeout for a connection to be returned or for
+        a broken one to be discarded, whichever frees one up first.
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._available:
+            while True:
+                if self._closed:
+                    raise Error(msg="Connection pool is closed")
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._created < self.pool_size:
+                    self._created += 1
+                    connection = last_used = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Error(msg="Timed out waiting for a database connection")
+                self._available.wait(remaining)
+
+        if connection is None:
+            try:
+                return self._open_connection()
+            except Error:
+                self._release_slot()
+                raise
+
+        # Only ping connections that have been idle long enough to go stale
+        if time.monotonic() - last_used >= self.health_check_interval:
+            if not self._is_healthy(connection):
+                self._close_quietly(connection)
+                try:
+                    connection = self._open_connection()
+                except Error:
+                    self._release_slot()
+                    raise
+        return connection
+
+    def checkin(self, connection):
+        """Return a borrowed connection to the pool"""
+        # Discard uncommitted work so the next borrower starts clean
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            self.discard(connection)
+            return
+
+        with self._available:
+            if not self._closed:
+                self._idle.append((connection, time.monotonic()))
+                self._available.notify()
+                return
+        self.discard(connection)
+
+    def close(self):
+        """Close every idle connection and refuse new checkouts"""
+        with self._available:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            # Wake waiting checkouts so they fail now instead of at their timeout
+            self._available.notify_all()
+        for connection, _ in idle:
+            self.discard(connection)
+
+
+class Row:
+    """Compact result row with one slot per column
+    
+    Subclasses name their columns in __slots__, so a row is a small fixed
+    object instead of a dict carrying its own copy of every key. row['col'],
+    get(), keys() and dict(row) work as they do on dictionary rows.
+    """
+
+    __slots__ = ()
+    COLUMNS = ()  # Table columns, in constructor order
+
+    @classmethod
+    def columns(cls, alias=None):
+        """SELECT list of this row's table columns, in constructor order"""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(prefix + column for column in cls.COLUMNS)
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return type(self) is type(other) and self.as_dict() == other.as_dict()
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class MenuItem(Row):
+    """One row of the menu table"""
+
+    __slots__ = ('item_id', 'name', 'category', 'price', 'availability', 'created_at')
+    COLUMNS = __slots__
+
+    def __init__(self, item_id, name, category, price, availability, created_at):
+        self.item_id = item_id
+        self.name = name
+        self.category = category
+        self.price = price
+        self.availability = availability
+        self.created_at = created_at
+
+
+class Order(Row):
+    """One row of the orders table, with optional item summary and customer name"""
+
+    __slots__ = ('order_id', 'user_id', 'order_date', 'total_amount', 'tax_amount',
+                 'final_amount', 'status', 'updated_at', 'items', 'customer_name')
+    COLUMNS = __slots__[:8]
+
+    def __init__(self, order_id, user_id, order_date, total_amount, tax_amount,
+                 final_amount, status, updated_at, items=None, customer_name=None):
+        self.order_id = order_id
+        self.user_id = user_id
+        self.order_date = order_date
+        self.total_amount = total_amount
+        self.tax_amount = tax_amount
+        self.final_amount = final_amount
+        self.status = status
+        self.updated_at = updated_at
+        self.items = items
+        self.customer_name = customer_name
+
+
+class OrderLine(Row):
+    """One row of the order_details table, with the menu item's name"""
+
+    __slots__ = ('detail_id', 'order_id', 'item_id', 'quantity', 'price', 'subtotal', 'item_name')
+    COLUMNS = __slots__[:6]
+
+    def __init__(self, detail_id, order_id, item_id, quantity, price, subtotal, item_name=None):
+        self.detail_id = detail_id
+        self.order_id = order_id
+        self.item_id = item_id
+        self.quantity = quantity
+        self.price = price
+        self.subtotal = subtotal
+        self.item_name = item_name
+
+
+class MenuCache:
+    """In-process copy of the menu with item_id and category indexes
+
+    The cache is invalidated through a version counter in the menu_version
+    table, which every menu write bumps. The counter is re-read at most once
+    per version_check_interval seconds, and ttl (if set) forces a full reload
+    after that many seconds regardless of the version.
+    Returned rows are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, db, ttl=None, version_check_interval=1.0):
+        self.db = db
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.version = None
+        self.items_by_id = {}
+        self.items_by_category = {}
+        self.categories = []
+        self._loaded_at = 0
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force the next read to reload the menu"""
+        with self._lock:
+            self.version = None
+
+    def _read_version(self, conn):
+        """Read the current menu version from the database"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM menu_version WHERE id = 1")
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else 0
+
+    def _load(self):
+        """Reload every menu item and rebuild the indexes"""
+        with self.db.get_connection() as conn:
+            # Read the version before the rows so a concurrent change can only
+            # make the cache look older than it is, never newer
+            version = self._read_version(conn)
+            cursor = self.db.row_cursor(conn)
+            cursor.execute(f"SELECT {MenuItem.columns()} FROM menu ORDER BY item_id")
+            items = self.db.fetch_rows(cursor, MenuItem)
+            cursor.close()
+
+        items_by_id = {}
+        items_by_category = {}
+        for item in items:
+            items_by_id[item['item_id']] = item
+            items_by_category.setdefault(item['category'], []).append(item)
+
+        self.items_by_id = items_by_id
+        self.items_by_category = items_by_category
+        self.categories = list(items_by_category)
+        self.version = version
+        self._loaded_at = self._checked_at = time.monotonic()
+
+    def refresh(self):
+        """Reload the menu if the TTL expired or the database version changed"""
+        with self._lock:
+            now = time.monotonic()
+            if self.version is not None:
+                expired = self.ttl is not None and now - self._loaded_at >= self.ttl
+                if not expired:
+                    if now - self._checked_at < self.version_check_interval:
+                        return
+                    with self.db.get_connection() as conn:
+                        version = self._read_version(conn)
+                    if version == self.version:
+                        self._checked_at = now
+                        return
+            self._load()
+
+    def get_menu(self, category=None):
+        """Get available menu items, optionally for one category"""
+        self.refresh()
+        if category:
+            items = self.items_by_category.get(category, [])
+        else:
+            items = self.items_by_id.values()
+        return [item for item in items if item['availability']]
+
+    def get_categories(self):
+        """Get all menu categories"""
+        self.refresh()
+        return list(self.categories)
+
+    def get_item(self, item_id):
+        """Get one menu item by ID"""
+        self.refresh()
+        return self.items_by_id.get(item_id)
+
+    def lookup_items(self, item_ids, version):
+        """Get cached rows for pricing, or None if the cache is not at version"""
+        if self.version != version:
+            self.invalidate()
+            return None
+        items_by_id = self.items_by_id
+        return {item_id: items_by_id[item_id] for item_id in item_ids if item_id in items_by_id}
+
+
+def within_one_edit(a, b):
+    """True if a and b differ by at most one insertion, deletion, substitution or adjacent swap"""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        # One substitution, or one swap of adjacent characters
+        if a[i + 1:] == b[i + 1:]:
+            return True
+        return a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+    # One insertion into the shorter string
+    return a[i:] == b[i + 1:]
+
+
+class MenuSearchIndex:
+    """In-memory search over menu item names and categories
+    
+    Names and categories are split into lowercase tokens, each mapped to the
+    sets of items that use it in their name or category. A sorted token list
+    answers prefix queries with bisect, and every token's one-character
+    deletions point back to it, so typos within one edit are found without
+    scanning the vocabulary. Every query word must match. Results rank by
+    match quality (exact > prefix > typo, name > category) and then by
+    shorter name; items are identified by a rank number that sorts that
+    way, so ranking is set algebra plus a heap over small integers.
+    Items are added, updated and removed one at a time.
+    """
+
+    EXACT, PREFIX, FUZZY = 5, 3, 2
+    NAME_WEIGHT, CATEGORY_WEIGHT = 2, 1
+    MIN_FUZZY_LENGTH = 3  # Shorter words have too many neighbours to be useful
+
+    def __init__(self, items=()):
+        self.items = {}  # rank -> item
+        self.ranks = {}  # item_id -> rank
+        self.postings = {}  # token -> (ranks with it in the name, ranks with it in the category)
+        self.tokens = []  # sorted vocabulary for prefix lookups
+        self.deletions = {}  # token with one character removed -> tokens
+        self._lock = threading.RLock()
+        for item in items:
+            self.add(item)
+
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+    def __len__(self):
+        return len(self.items)
+
+    def _variants(self, token):
+        return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+    def _add_token(self, token, rank, field):
+        postings = self.postings.get(token)
+        if postings is None:
+            postings = self.postings[token] = (set(), set())
+            bisect.insort(self.tokens, token)
+            for variant in self._variants(token):
+                self.deletions.setdefault(variant, set()).add(token)
+        postings[field].add(rank)
+
+    def _remove_token(self, token, rank):
+        postings = self.postings.get(token)
+        if postings is None:
+            return
+        postings[0].discard(rank)
+        postings[1].discard(rank)
+        if not postings[0] and not postings[1]:
+            del self.postings[token]
+            del self.tokens[bisect.bisect_left(self.tokens, token)]
+            for variant in self._variants(token):
+                tokens = self.deletions[variant]
+                tokens.discard(token)
+                if not tokens:
+                    del self.deletions[variant]
+
+    def add(self, item):
+        """Index an available menu item, replacing any older version of it"""
+        with self._lock:
+            item_id = item['item_id']
+            self.remove(item_id)
+            if not item['availability']:
+                return
+            # Shorter names sort first, then lower item_id
+            rank = (len(item['name']) << 32) | item_id
+            self.items[rank] = item
+            self.ranks[item_id] = rank
+            for token in self.tokenize(item['name']):
+                self._add_token(token, rank, 0)
+            for token in self.tokenize(item['category']):
+                self._add_token(token, rank, 1)
+
+    update = add
+
+    def remove(self, item_id):
+        """Drop an item from the index"""
+        with self._lock:
+            rank = self.ranks.pop(item_id, None)
+            if rank is None:
+                return
+            item = self.items.pop(rank)
+            for token in set(self.tokenize(item['name']) + self.tokenize(item['category'])):
+                self._remove_token(token, rank)
+
+    def _word_tiers(self, word, enough=None):
+        """Group the items matching one query word by score
+        
+        Stops early once the best tiers hold at least enough items.
+        """
+        by_quality = {self.EXACT: [], self.PREFIX: [], self.FUZZY: []}
+        matched = set()
+        start = bisect.bisect_left(self.tokens, word)
+        for token in self.tokens[start:]:
+            if not token.startswith(word):
+                break
+            by_quality[self.EXACT if token == word else self.PREFIX].append(token)
+            matched.add(token)
+        if len(word) >= self.MIN_FUZZY_LENGTH:
+            for variant in self._variants(word):
+                for token in self.deletions.get(variant, ()):
+                    if token not in matched and within_one_edit(word, token):
+                        by_quality[self.FUZZY].append(token)
+                        matched.add(token)
+        
+        groups = sorted(
+            ((quality * weight, tokens, field)
+             for quality, tokens in by_quality.items() if tokens
+             for field, weight in ((0, self.NAME_WEIGHT), (1, self.CATEGORY_WEIGHT))),
+            key=lambda group: group[0], reverse=True
+        )
+        # Every (quality, field) pair has a distinct score; an item keeps its best one.
+        # Posting sets are shared, not copied, so nothing below may modify them.
+        tiers = {}
+        seen = None
+        for score, tokens, field in groups:
+            sets = [self.postings[token][field] for token in tokens if self.postings[token][field]]
+            if not sets:
+                continue
+            ranks = sets[0] if len(sets) == 1 else set().union(*sets)
+            if seen:
+                ranks = ranks - seen
+            if ranks:
+                tiers[score] = ranks
+                seen = ranks if seen is None else seen | ranks
+                if enough and len(seen) >= enough:
+                    break
+        return tiers
+
+    def search(self, query, limit=10):
+        """Return up to limit available items matching every word of query, best first"""
+        words = self.tokenize(query)
+        if not words:
+            return []
+        
+        with self._lock:
+            tiers = None  # total score -> ranks
+            for word in words:
+                # A one-word query only needs its best limit items
+                word_tiers = self._word_tiers(word, limit if len(words) == 1 else None)
+                if tiers is None:
+                    tiers = word_tiers
+                else:
+                    combined = {}
+                    for score, ranks in tiers.items():
+                        for word_score, word_ranks in word_tiers.items():
+                            both = ranks & word_ranks
+                            if both:
+                                total = score + word_score
+                                combined[total] = combined[total] | both if total in combined else both
+                    tiers = combined
+                if not tiers:
+                    return []
+            
+            best = []
+            for score in sorted(tiers, reverse=True):
+                best.extend(heapq.nsmallest(limit - len(best), tiers[score]))
+                if len(best) >= limit:
+                    break
+            return [self.items[rank] for rank in best]
+
+
+class ResultCache:
+    """Size-bounded TTL cache where concurrent misses share one load
+    
+    When several callers miss on the same key at once, only the first runs
+    the loader; the rest wait for its result (single-flight). Entries expire
+    after ttl seconds and the least recently used entry is evicted once
+    max_entries is reached. Cached values are shared and must not be modified.
+    """
+
+    def __init__(self, ttl=30, max_entries=128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._in_flight = {}  # key -> {"done": Event, "value": ..., "error": ...}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                self.misses += 1
+                flight = {"done": threading.Event(), "value": None, "error": None}
+                self._in_flight[key] = flight
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight["done"].wait()
+            if flight["error"]:
+                raise flight["error"]
+            return flight["value"]
+
+        try:
+            value = loader()
+            flight["value"] = value
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return value
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight["done"].set()
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get hit/miss counters for tuning the TTL and size"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.shared
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared": self.shared,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": (self.hits + self.shared) / lookups if lookups else 0.0
+            }
+
+
+class PopularItemsTracker:
+    """Quantities sold per item over sliding time windows, fed by place_order
+    
+    Sales are counted in slot_seconds slots. Each window keeps a running
+    total per item that grows as orders are recorded and shrinks as slots
+    age out, so a window is exact to within one slot. The 'today' window
+    counts since local midnight. Rankings are cached per window and only
+    re-sorted after that window changed, so repeated reads cost O(limit).
+    """
+
+    WINDOWS = {'15m': 15 * 60, '1h': 60 * 60}
+    TODAY = 'today'
+
+    def __init__(self, windows=None, slot_seconds=60, clock=time.time):
+        self.slot_seconds = slot_seconds
+        self.clock = clock
+        now = clock()
+        now_slot = int(now // slot_seconds)
+        # Window length in slots, rounded up
+        self.spans = {name: max(1, -(-seconds // slot_seconds))
+                      for name, seconds in (windows or self.WINDOWS).items()}
+        self.edges = {name: now_slot - span + 1 for name, span in self.spans.items()}  # oldest counted slot
+        self.totals = {name: {} for name in [*self.spans, self.TODAY]}  # window -> {item_id: quantity}
+        self.day = date.fromtimestamp(now)
+        self.slots = {}  # slot number -> {item_id: quantity}
+        self.slot_order = []  # slot numbers, ascending
+        self.rankings = {}  # window -> [(item_id, quantity), ...] sorted, while unchanged
+        self._lock = threading.Lock()
+
+    def record(self, items, when=None):
+        """Count an order's items; items: [{"item_id": 1, "quantity": 2}, ...]
+        
+        when is the order's time.time() timestamp (now if omitted). Orders
+        older than every window are ignored.
+        """
+        now = self.clock()
+        when = now if when is None else when
+        slot = int(when // self.slot_seconds)
+        with self._lock:
+            self._advance(now)
+            windows = [name for name, edge in self.edges.items() if slot >= edge]
+            if date.fromtimestamp(when) == self.day:
+                windows.append(self.TODAY)
+            if not windows:
+                return
+            
+            counts = None
+            if len(windows) > 1 or windows[0] != self.TODAY:
+                counts = self.slots.get(slot)
+                if counts is None:
+                    counts = self.slots[slot] = {}
+                    bisect.insort(self.slot_order, slot)
+            for item in items:
+                item_id, quantity = item['item_id'], item['quantity']
+                if counts is not None:
+                    counts[item_id] = counts.get(item_id, 0) + quantity
+                for name in windows:
+                    total = self.totals[name]
+                    total[item_id] = total.get(item_id, 0) + quantity
+            for name in windows:
+                self.rankings.pop(name, None)
+
+    def top(self, window='15m', limit=5):
+        """Get the limit best-selling items in a window as [(item_id, quantity), ...]"""
+        if window not in self.totals:
+            raise ValueError(f"window must be one of {', '.join(self.totals)}")
+        with self._lock:
+            self._advance(self.clock())
+            ranking = self.rankings.get(window)
+            if ranking is None:
+                ranking = sorted(self.totals[window].items(), key=lambda entry: (-entry[1], entry[0]))
+                self.rankings[window] = ranking
+            return ranking[:limit]
+
+    def _advance(self, now):
+        """Drop slots that have left each window, and start a new day at midnight"""
+        now_slot = int(now // self.slot_seconds)
+        for name, span in self.spans.items():
+            edge = now_slot - span + 1
+            old = self.edges[name]
+            if edge <= old:
+                continue
+            start = bisect.bisect_left(self.slot_order, old)
+            stop = bisect.bisect_left(self.slot_order, edge)
+            total = self.totals[name]
+            for number in self.slot_order[start:stop]:
+                for item_id, quantity in self.slots[number].items():
+                    left = total[item_id] - quantity
+                    if left > 0:
+                        total[item_id] = left
+                    else:
+                        del total[item_id]
+            if start < stop:
+                self.rankings.pop(name, None)
+            self.edges[name] = edge
+        
+        # Slots older than the longest window are no longer needed
+        stop = bisect.bisect_left(self.slot_order, min(self.edges.values(), default=now_slot + 1))
+        for number in self.slot_order[:stop]:
+            del self.slots[number]
+        del self.slot_order[:stop]
+        
+        today = date.fromtimestamp(now)
+        if today != self.day:
+            self.day = today
+            self.totals[self.TODAY] = {}
+            self.rankings.pop(self.TODAY, None)
+
+
+# QUERY INSTRUMENTATION
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf')]
+
+# RestaurantDatabase methods that are not wrapped as logical operations
+NOT_INSTRUMENTED = {
+    'connect', 'disconnect', 'get_connection', 'hash_password',
+    'row_cursor', 'fetch_rows',
+    'enable_menu_cache', 'enable_analytics_cache', 'enable_menu_search', 'enable_popular_items',
+    'enable_group_commit', 'disable_group_commit',
+    'enable_instrumentation', 'disable_instrumentation',
+}
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile"""
+        target = self.count * pct / 100
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+
+class QueryStats:
+    """Latency, round-trip and row counters per operation and per SQL statement
+
+    Statements slower than slow_query_ms are appended to slow_log_file.
+    """
+
+    def __init__(self, slow_query_ms=100, slow_log_file='slow_queries.log'):
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_file = slow_log_file
+        self.operations = {}  # name -> {"latency", "round_trips", "rows"}
+        self.statements = {}  # normalized SQL -> {"latency", "rows"}
+        self._current = threading.local()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_sql(query):
+        """Collapse whitespace and IN lists so equivalent statements group together"""
+        query = ' '.join(query.split())
+        return re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', query)
+
+    def current_operation(self):
+        return getattr(self._current, 'operation', None)
+
+    def begin_operation(self, name):
+        """Start timing a logical operation (nested calls belong to the outer one)"""
+        if self.current_operation():
+            return False
+        self._current.operation = name
+        self._current.round_trips = 0
+        self._current.rows = 0
+        return True
+
+    def end_operation(self, name, ms):
+        with self._lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = {"latency": LatencyHistogram(), "round_trips": 0, "rows": 0}
+            stats["latency"].add(ms)
+            stats["round_trips"] += self._current.round_trips
+            stats["rows"] += self._current.rows
+        self._current.operation = None
+
+    def record_statement(self, query, ms):
+        sql = self.normalize_sql(query)
+        if self.current_operation():
+            self._current.round_trips += 1
+        with self._lock:
+            stats = self.statements.get(sql)
+            if stats is None:
+                stats = self.statements[sql] = {"latency": LatencyHistogram(), "rows": 0}
+            stats["latency"].add(ms)
+        if ms >= self.slow_query_ms and self.slow_log_file:
+            line = f"{datetime.now().isoformat(sep=' ', timespec='seconds')}\t{ms:.1f} ms\t" \
+                   f"{self.current_operation() or '-'}\t{sql}\n"
+            with self._lock, open(self.slow_log_file, 'a') as file:
+                file.write(line)
+
+    def record_rows(self, query, count):
+        if self.current_operation():
+            self._current.rows += count
+        with self._lock:
+            stats = self.statements.get(self.normalize_sql(query))
+            if stats:
+                stats["rows"] += count
+
+    def dump(self):
+        """Snapshot of every counter as plain dicts"""
+        with self._lock:
+            operations = {}
+            for name, stats in self.operations.items():
+                calls = stats["latency"].count
+                operations[name] = dict(stats["latency"].summary(),
+                                        round_trips_per_call=stats["round_trips"] / calls,
+                                        rows_per_call=stats["rows"] / calls)
+            statements = {sql: dict(stats["latency"].summary(), rows=stats["rows"])
+                          for sql, stats in self.statements.items()}
+        return {"operations": operations, "statements": statements}
+
+    def report(self, top=10):
+        """Printable summary: every operation and the slowest statements"""
+        data = self.dump()
+        lines = [f"{'Operation':<28} {'Calls':>7} {'Mean ms':>9} {'p95 ms':>8} {'Trips':>6} {'Rows':>8}"]
+        for name, op in sorted(data["operations"].items(), key=lambda item: -item[1]["mean_ms"] * item[1]["count"]):
+            lines.append(f"{name:<28} {op['count']:>7} {op['mean_ms']:>9.2f} {op['p95_ms']:>8.1f} "
+                         f"{op['round_trips_per_call']:>6.1f} {op['rows_per_call']:>8.1f}")
+        lines.append("")
+        lines.append(f"Top {top} statements by total time:")
+        ranked = sorted(data["statements"].items(), key=lambda item: -item[1]["mean_ms"] * item[1]["count"])
+        for sql, st in ranked[:top]:
+            lines.append(f"  {st['count']:>6} x {st['mean_ms']:>8.2f} ms  {sql[:90]}")
+        return "\n".join(lines)
+
+
+class InstrumentedCursor:
+    """Cursor wrapper that reports every statement and fetch to QueryStats"""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+        self._query = ''
+
+    def execute(self, query, *args, **kwargs):
+        self._query = query
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(query, *args, **kwargs)
+        finally:
+            self._stats.record_statement(query, (time.perf_counter() - start) * 1000)
+
+    def executemany(self, query, *args, **kwargs):
+        self._query = query
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, *args, **kwargs)
+        finally:
+            self._stats.record_statement(query, (time.perf_counter() - start) * 1000)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.record_rows(self._query, 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._stats.record_rows(self._query, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.record_rows(self._query, len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors are instrumented"""
+
+    def __init__(self, connection, stats):
+        self._connection = connection
+        self._stats = stats
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs), self._stats)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return self._connection.commit()
+        finally:
+            self._stats.record_statement("COMMIT", (time.perf_counter() - start) * 1000)
+
+    def rollback(self):
+        start = time.perf_counter()
+        try:
+            return self._connection.rollback()
+        finally:
+            self._stats.record_statement("ROLLBACK", (time.perf_counter() - start) * 1000)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class GroupCommitter:
+    """Collect orders from concurrent place_order calls and commit them together
+    
+    The first order to arrive opens a batch, which is written once it holds
+    max_batch orders or max_wait_ms after it opened, whichever comes first.
+    The whole batch is one transaction and one commit, so callers trade up
+    to max_wait_ms of latency for fewer commits (and fsyncs) per order.
+    """
+
+    STOP = object()
+
+    def __init__(self, db, max_batch=20, max_wait_ms=5):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.orders = queue.Queue()
+        self.batches = 0
+        self.batched_orders = 0
+        self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id, items):
+        """Queue an order and return a Future that resolves to its place_order result"""
+        future = Future()
+        self.orders.put((user_id, items, future))
+        return future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            job = self.orders.get()
+            if job is self.STOP:
+                break
+            batch = [job]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    job = self.orders.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if job is self.STOP:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            results = self.db.place_orders_batch([(user_id, items) for user_id, items, _ in batch])
+        except Exception as e:
+            results = [{"success": False, "message": str(e)} for _ in batch]
+        self.batches += 1
+        self.batched_orders += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        """Number of batches written and their average size"""
+        return {
+            "batches": self.batches,
+            "orders": self.batched_orders,
+            "avg_batch_size": self.batched_orders / self.batches if self.batches else 0,
+        }
+
+    def stop(self):
+        """Write the orders already queued and stop the batching thread"""
+        self.orders.put(self.STOP)
+        self._thread.join()
+
+
+class BillingEngine:
+    """Exact order pricing in integer cents with per-category tax rates
+    
+    Prices become whole cents once, line subtotals are exact integer
+    products, and tax is rounded up to the cent once per order, so the cart
+    screen, the stored order and any later re-pricing agree to the cent.
+    Rates are Decimal fractions (0.05 is 5%); category_rates overrides
+    default_rate for the categories it lists. price_carts prices any number
+    of carts in one pass.
+    """
+
+    RATE_SCALE = 1000000  # Rates are held as integer millionths so tax sums stay exact
+
+    def __init__(self, default_rate=Decimal('0.05'), category_rates=None):
+        self.default_rate = Decimal(default_rate)
+        self.category_rates = {category: Decimal(rate) for category, rate in (category_rates or {}).items()}
+        self._default_units = self._rate_units(self.default_rate)
+        self._category_units = {category: self._rate_units(rate)
+                                for category, rate in self.category_rates.items()}
+
+    def _rate_units(self, rate):
+        units = rate * self.RATE_SCALE
+        if units != units.to_integral_value():
+            raise ValueError(f"Tax rate {rate} has more than {len(str(self.RATE_SCALE)) - 1} decimal places")
+        return int(units)
+
+    @staticmethod
+    def to_cents(amount):
+        """Convert an amount (Decimal, str, int or float) to whole cents"""
+        if not isinstance(amount, Decimal):
+            amount = Decimal(str(amount))
+        return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+    @staticmethod
+    def from_cents(cents):
+        """Convert whole cents to a two-place Decimal"""
+        return Decimal(cents).scaleb(-2)
+
+    @staticmethod
+    def round_amount(amount):
+        """Normalize an amount of any numeric type to a two-place Decimal
+        
+        SQLite returns sums of DECIMAL columns as floats or ints.
+        """
+        return BillingEngine.from_cents(BillingEngine.to_cents(amount or 0))
+
+    def tax_rate(self, category):
+        """Tax rate that applies to a category"""
+        return self.category_rates.get(category, self.default_rate)
+
+    def price_cart(self, lines):
+        """Price one cart; see price_carts"""
+        return self.price_carts([lines])[0]
+
+    def price_carts(self, carts, with_lines=True, as_cents=False):
+        """Price many carts in one pass
+        
+        Each cart is a list of lines with 'price' and 'quantity', plus
+        'category' for category tax rates and optionally 'item_id'. Returns
+        one bill per cart: {"total", "tax", "final_amount"} as Decimal (or as
+        integer cents with as_cents, which skips building Decimals) and, with
+        with_lines, "lines" with each line's price and subtotal.
+        Everything inside the loop is integer arithmetic; Decimals are only
+        made for distinct prices on the way in and for results on the way out.
+        """
+        to_cents = self.to_cents
+        from_cents = int if as_cents else self.from_cents
+        default_units = self._default_units
+        category_units = self._category_units
+        scale = self.RATE_SCALE
+        cents_by_price = {}
+        bills = []
+        
+        for lines in carts:
+            total = 0
+            tax_units = 0
+            priced = []
+            for line in lines:
+                price = line['price']
+                cents = cents_by_price.get(price)
+                if cents is None:
+                    cents = cents_by_price[price] = to_cents(price)
+                subtotal = cents * line['quantity']
+                total += subtotal
+                if category_units:
+                    tax_units += subtotal * category_units.get(line.get('category'), default_units)
+                if with_lines:
+                    priced.append((line, cents, subtotal))
+            if not category_units:
+                tax_units = total * default_units
+            tax = -(-tax_units // scale)  # round up to the cent
+            
+            bill = {
+                "total": from_cents(total),
+                "tax": from_cents(tax),
+                "final_amount": from_cents(total + tax),
+            }
+            if with_lines:
+                bill["lines"] = [
+                    {
+                        "item_id": line.get('item_id'),
+                        "quantity": line['quantity'],
+                        "price": from_cents(cents),
+                        "subtotal": from_cents(subtotal),
+                    }
+                    for line, cents, subtotal in priced
+                ]
+            bills.append(bill)
+        return bills
+
+
+class Cart:
+    """A user's shopping cart, saved to cart_items with write-behind
+    
+    Lines are kept in a dict keyed by item_id, so adding, updating and
+    removing items are O(1) and never wait on the database. Changed lines
+    are remembered and written together flush_interval seconds after the
+    first unsaved change, so a session survives a restart without one write
+    per keystroke. The write runs on a timer thread, which needs pooled
+    mode; a single shared connection must not be used from another thread,
+    so there changes are only written by flush() and checkout(), and
+    callers should flush() at logout and before exiting.
+    """
+
+    def __init__(self, db, user_id, flush_interval=2.0):
+        self.db = db
+        self.user_id = user_id
+        self.flush_interval = flush_interval
+        self.items = {}
+        self._dirty = set()
+        self._timer = None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()  # Held across the whole write of one flush
+        self.last_error = None  # Error from the last failed flush, None once one succeeds
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.lines())
+
+    def __contains__(self, item_id):
+        return item_id in self.items
+
+    def load(self):
+        """Replace the in-memory cart with the saved one, at current menu prices"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                """SELECT c.item_id, m.name, m.category, m.price, c.quantity
+                   FROM cart_items c
+                   JOIN menu m ON c.item_id = m.item_id
+                   WHERE c.user_id = %s
+                   ORDER BY c.updated_at, c.item_id""",
+                (self.user_id,)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        with self._lock:
+            self.items = {
+                row['item_id']: {
+                    'item_id': row['item_id'],
+                    'name': row['name'],
+                    'category': row['category'],
+                    'price': row['price'],
+                    'quantity': row['quantity'],
+                }
+                for row in rows
+            }
+            self._dirty.clear()
+        return self
+
+    def lines(self):
+        """Cart lines in the order they were added"""
+        with self._lock:
+            return list(self.items.values())
+
+    def bill(self):
+        """Price the cart with the database's billing engine, exactly as place_order will"""
+        return self.db.billing.price_cart(self.lines())
+
+    def add(self, item_id, quantity):
+        """Add quantity of an item, merging with an existing line; None if the item does not exist"""
+        with self._lock:
+            line = self.items.get(item_id)
+            if line:
+                line['quantity'] += quantity
+            else:
+                # Served from the menu cache when it is enabled
+                menu_item = self.db.get_item_by_id(item_id)
+                if not menu_item:
+                    return None
+                line = self.items[item_id] = {
+                    'item_id': item_id,
+                    'name': menu_item['name'],
+                    'category': menu_item['category'],
+                    'price': menu_item['price'],
+                    'quantity': quantity,
+                }
+            self._changed(item_id)
+            return line
+
+    def set_quantity(self, item_id, quantity):
+        """Change a line's quantity, removing it when quantity is not positive"""
+        with self._lock:
+            line = self.items.get(item_id)
+            if not line:
+                return None
+            if quantity <= 0:
+                return self.remove(item_id)
+            line['quantity'] = quantity
+            self._changed(item_id)
+            return line
+
+    def remove(self, item_id):
+        """Remove a line and return it (None if it was not in the cart)"""
+        with self._lock:
+            line = self.items.pop(item_id, None)
+            if line:
+                self._changed(item_id)
+            return line
+
+    def clear(self):
+        """Empty the cart"""
+        with self._lock:
+            self._dirty.update(self.items)
+            self.items = {}
+            self._changed(None)
+
+    def _changed(self, item_id):
+        if item_id is not None:
+            self._dirty.add(item_id)
+        # A single shared connection must not be used from a timer thread
+        if self.db.pool is not None and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write all unsaved changes in one transaction and return how many lines were written
+        
+        Flushes run one at a time, so a timer flush can never commit an
+        older snapshot after a newer one. If the write fails the changes
+        stay unsaved for the next flush, last_error holds the error and 0
+        is returned.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return 0
+                dirty = self._dirty
+                self._dirty = set()
+                saved = [(self.user_id, item_id, self.items[item_id]['quantity'])
+                         for item_id in dirty if item_id in self.items]
+                removed = [item_id for item_id in dirty if item_id not in self.items]
+            
+            try:
+                self._write(saved, removed)
+            except Error as e:
+                # Keep the changes so the next flush retries them
+                with self._lock:
+                    self._dirty.update(dirty)
+                self.last_error = e
+                return 0
+            self.last_error = None
+            return len(dirty)
+
+    def _write(self, saved, removed):
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if removed:
+                    placeholders = ', '.join(['%s'] * len(removed))
+                    cursor.execute(
+                        f"DELETE FROM cart_items WHERE user_id = %s AND item_id IN ({placeholders})",
+                        [self.user_id] + removed
+                    )
+                if saved:
+                    values = ', '.join(['(%s, %s, %s)'] * len(saved))
+                    cursor.execute(
+                        f"INSERT INTO cart_items (user_id, item_id, quantity) VALUES {values} "
+                        "ON DUPLICATE KEY UPDATE quantity = VALUES(quantity), updated_at = CURRENT_TIMESTAMP",
+                        [value for line in saved for value in line]
+                    )
+                conn.commit()
+            except Error:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def revalidate(self):
+        """Re-read price and availability for every line in one query
+        
+        Lines whose item is gone or unavailable are removed and changed
+        prices are updated. Returns a message for each change.
+        """
+        with self._lock:
+            item_ids = list(self.items)
+        if not item_ids:
+            return []
+        
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            placeholders = ', '.join(['%s'] * len(item_ids))
+            cursor.execute(
+                f"SELECT item_id, price, availability FROM menu WHERE item_id IN ({placeholders})",
+                item_ids
+            )
+            current = {row['item_id']: row for row in cursor.fetchall()}
+            cursor.close()
+        
+        changes = []
+        with self._lock:
+            for item_id in item_ids:
+                line = self.items.get(item_id)
+                row = current.get(item_id)
+                if not line:
+                    continue
+                if not row or not row['availability']:
+                    self.remove(item_id)
+                    changes.append(f"{line['name']} is no longer available and was removed")
+                elif row['price'] != line['price']:
+                    changes.append(f"{line['name']} now costs ₹{row['price']:.2f} "
+                                   f"(was ₹{line['price']:.2f})")
+                    line['price'] = row['price']
+        return changes
+
+    def checkout(self):
+        """Revalidate the cart and place it as one order
+        
+        If revalidation changed anything, no order is placed and the result
+        lists the changes so the customer can review the new total.
+        """
+        changes = self.revalidate()
+        if changes:
+            return {"success": False, "message": "Your cart has changed, please review it", "changes": changes}
+        
+        result = self.db.place_order(
+            self.user_id,
+            [{"item_id": line['item_id'], "quantity": line['quantity']} for line in self.lines()]
+        )
+        if result['success']:
+            self.clear()
+            self.flush()
+        return result
+
 
 class RestaurantDatabase:
-    def __init__(self):
+    def __init__(self, pool_size=None, backend=None, row_format='dict'):
         self.connection = None
+        self.pool = None
+        self.pool_size = pool_size  # Set to use a connection pool instead of one shared connection
+        self.menu_cache = None
+        self.analytics_cache = None
+        self.menu_search = None
+        self.popular_items = None  # PopularItemsTracker while enabled
+        self.archive_after_days = 90  # archive_orders() moves older orders out of the hot tables
+        # Replace with BillingEngine(category_rates={...}) for per-category tax
+        self.billing = BillingEngine()
+        self.group_commit = None  # GroupCommitter while group commit is enabled
+        self.stats = None  # QueryStats while instrumentation is enabled
+        # 'objects' returns MenuItem/Order/OrderLine rows instead of dicts
+        self.row_format = row_format
         self.DB_CONFIG = {
             'host': 'localhost',
             'user': 'root',
             'password': 'your_password',  # Change this
             'database': 'restaurant_db'
         }
+        # Pass SQLiteBackend('restaurant.db') to run without a MySQL server
+        self.backend = backend or MySQLBackend(self.DB_CONFIG)
+    
+    def connect(self):
+        """Establish database connection"""
+        try:
+            if self.pool_size:
+                self.pool = ConnectionPool(self.backend, self.pool_size)
+                # Open one connection now so configuration errors show up here
+                self.pool.checkin(self.pool.checkout())
+                return True
+            
+            self.connection = self.backend.connect()
+            return True
+        except Error as e:
+            print(f"Error connecting to database: {e}")
+            return False
+    
+    def disconnect(self):
+        """Close database connection"""
+        self.disable_group_commit()
+        if self.pool:
+            self.pool.close()
+        if self.connection:
+            try:
+                self.connection.close()
+            except Error:
+                pass
+            self.connection = None
+    
+    def hash_password(self, password):
+        """Hash password using SHA-256"""
+        return hashlib.sha256(password.encode()).hexdigest()
+    
+    def enable_menu_cache(self, ttl=None, version_check_interval=1.0):
+        """Serve menu reads from an in-process cache"""
+        self.menu_cache = MenuCache(self, ttl, version_check_interval)
+        return self.menu_cache
+    
+    def enable_analytics_cache(self, ttl=30, max_entries=128):
+        """Cache analytics results for ttl seconds"""
+        self.analytics_cache = ResultCache(ttl, max_entries)
+        return self.analytics_cache
+    
+    def enable_menu_search(self):
+        """Build (or rebuild) the in-memory menu search index from get_menu
+        
+        The index follows menu changes made through this object; call again
+        to pick up changes made by other processes.
+        """
+        self.menu_search = MenuSearchIndex(self.get_menu())
+        return self.menu_search
+    
+    def search_menu(self, query, limit=10):
+        """Find available menu items by name or category words, with prefix and typo matching"""
+        if not self.menu_search:
+            self.enable_menu_search()
+        return self.menu_search.search(query, limit)
+    
+    def enable_popular_items(self, windows=None, slot_seconds=60):
+        """Track best-selling items over sliding windows, warm-started from recent orders
+        
+        Only orders placed through this object are counted after the warm
+        start; call again to pick up orders placed by other processes.
+        """
+        tracker = PopularItemsTracker(windows, slot_seconds)
+        now = tracker.clock()
+        midnight = datetime.combine(date.fromtimestamp(now), datetime.min.time()).timestamp()
+        horizon = max(max(tracker.spans.values(), default=0) * slot_seconds, now - midnight)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # Place orders on our clock by their age on the database clock
+            db_now = self.database_now(cursor)
+            cursor.execute("""
+                SELECT o.order_date, od.item_id, od.quantity
+                FROM orders o
+                JOIN order_details od ON o.order_id = od.order_id
+                WHERE o.order_date >= %s
+            """, (db_now - timedelta(seconds=horizon),))
+            for order_date, item_id, quantity in cursor.fetchall():
+                age = (db_now - order_date).total_seconds()
+                tracker.record([{"item_id": item_id, "quantity": quantity}], now - age)
+            cursor.close()
+        
+        self.popular_items = tracker
+        return tracker
+    
+    def database_now(self, cursor):
+        """Current time on the database clock, which order_date is stored in
+        
+        This can differ from the local clock: SQLite's CURRENT_TIMESTAMP is UTC.
+        """
+        cursor.execute("SELECT CURRENT_TIMESTAMP")
+        now = cursor.fetchone()[0]
+        return now if isinstance(now, datetime) else datetime.fromisoformat(now)
+    
+    def get_trending_items(self, window='15m', limit=5):
+        """Get the best-selling items of the last 15 minutes ('15m'), hour ('1h') or 'today'
+        
+        Returns a list of {"item_id", "name", "total_orders"}, best first.
+        """
+        if not self.popular_items:
+            self.enable_popular_items()
+        top = self.popular_items.top(window, limit)
+        if not top:
+            return []
+        
+        placeholders = ', '.join(['%s'] * len(top))
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT item_id, name FROM menu WHERE item_id IN ({placeholders})",
+                [item_id for item_id, _ in top]
+            )
+            names = dict(cursor.fetchall())
+            cursor.close()
+        return [{"item_id": item_id, "name": names.get(item_id), "total_orders": quantity}
+                for item_id, quantity in top]
+    
+    def enable_group_commit(self, max_batch=20, max_wait_ms=5):
+        """Batch concurrent place_order calls into shared transactions
+        
+        Use with a connection pool: batches are written from a background
+        thread while callers wait for their own order's result.
+        """
+        self.disable_group_commit()
+        self.group_commit = GroupCommitter(self, max_batch, max_wait_ms)
+        return self.group_commit
+    
+    def disable_group_commit(self):
+        """Write any queued orders and go back to one commit per order"""
+        if self.group_commit:
+            self.group_commit.stop()
+            self.group_commit = None
+    
+    def enable_instrumentation(self, slow_query_ms=100, slow_log_file='slow_queries.log'):
+        """Time every statement and every public method call
+        
+        Each public method is wrapped on this instance as a logical operation,
+        and connections handed out by get_connection time every execute.
+        Nothing is wrapped while instrumentation is off.
+        """
+        self.disable_instrumentation()
+        self.stats = QueryStats(slow_query_ms, slow_log_file)
+        for name in dir(type(self)):
+            if name.startswith('_') or name in NOT_INSTRUMENTED:
+                continue
+            method = getattr(self, name)
+            if callable(method):
+                setattr(self, name, self._instrumented(name, method))
+        return self.stats
+    
+    def disable_instrumentation(self):
+        """Remove the method wrappers and stop collecting stats"""
+        for name in list(vars(self)):
+            if getattr(vars(self)[name], '_instrumented', False):
+                delattr(self, name)
+        self.stats = None
+    
+    def _instrumented(self, name, method):
+        stats = self.stats
+        
+        def wrapper(*args, **kwargs):
+            if not stats.begin_operation(name):
+                return method(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats.end_operation(name, (time.perf_counter() - start) * 1000)
+        
+        wrapper._instrumented = True
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+    
+    def row_cursor(self, conn, **kwargs):
+        """Cursor that returns rows in the shape fetch_rows expects"""
+        return conn.cursor(dictionary=self.row_format != 'objects', **kwargs)
+    
+    def fetch_rows(self, cursor, row_class, size=None):
+        """Fetch the remaining rows (or the next size rows) as row_class objects or dicts"""
+        rows = cursor.fetchall() if size is None else cursor.fetchmany(size)
+        if self.row_format == 'objects':
+            return [row_class(*row) for row in rows]
+        return rows
+    
+    def iter_rows(self, query, params, row_class, chunk_size=1000):
+        """Yield the rows of a query one at a time, reading chunk_size rows per fetch
+        
+        Memory use stays flat however large the result. The connection is
+        held until the iterator is exhausted or closed, so in single-
+        connection mode finish iterating before running other queries.
+        """
+        with self.get_connection() as conn:
+            cursor = self.row_cursor(conn, buffered=False)
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = self.fetch_rows(cursor, row_class, chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def get_connection(self):
+        """Borrow a connection for one call (from the pool in pooled mode)"""
+        if self.pool:
+            connection = self.pool.checkout()
+            broken = False
+            try:
+                yield InstrumentedConnection(connection, self.stats) if self.stats else connection
+            except Error:
+                # Only pay for the liveness check when something failed; a dead
+                # socket would otherwise go straight back to the next caller
+                broken = not connection.is_connected()
+                raise
+            finally:
+                if broken:
+                    self.pool.discard(connection)
+                else:
+                    self.pool.checkin(connection)
+        else:
+            connection = self.connection
+            yield InstrumentedConnection(connection, self.stats) if self.stats else connection
+    
+    def initialize_database(self):
+        """Create tables if they don't exist
+        
+        Returns True if DDL was run, False if the schema was already current.
+        """
+        # Fast path: one round trip and no DDL (or metadata locks) when the
+        # schema is already at the latest migration
+        if self.get_schema_version() >= LATEST_SCHEMA_VERSION:
+            print("Database initialized successfully!")
+            return False
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Create Users table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INT AUTO_INCREMENT PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    email VARCHAR(100) UNIQUE NOT NULL,
+                    password VARCHAR(255) NOT NULL,
+                    phone VARCHAR(15),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Create Menu table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS menu (
+                    item_id INT AUTO_INCREMENT PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    category VARCHAR(50),
+                    price DECIMAL(10, 2) NOT NULL,
+                    availability BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Create Orders table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_id INT AUTO_INCREMENT PRIMARY KEY,
+                    user_id INT,
+                    order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    total_amount DECIMAL(10, 2),
+                    tax_amount DECIMAL(10, 2),
+                    final_amount DECIMAL(10, 2),
+                    status VARCHAR(20) DEFAULT 'Pending',
+                    FOREIGN KEY (user_id) REFERENCES users(user_id)
+                )
+            """)
+            
+            # Create Order Details table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS order_details (
+                    detail_id INT AUTO_INCREMENT PRIMARY KEY,
+                    order_id INT,
+                    item_id INT,
+                    quantity INT,
+                    price DECIMAL(10, 2),
+                    subtotal DECIMAL(10, 2),
+                    FOREIGN KEY (order_id) REFERENCES orders(order_id),
+                    FOREIGN KEY (item_id) REFERENCES menu(item_id)
+                )
+            """)
+            
+            # Create Menu Version table (bumped on every menu change for cache invalidation)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS menu_version (
+                    id INT PRIMARY KEY,
+                    version INT NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("INSERT IGNORE INTO menu_version (id, version) VALUES (1, 0)")
+            
+            conn.commit()
+            cursor.close()
+        
+        self.migrate()
+        print("Database initialized successfully!")
+        return True
+    
+    # SCHEMA MIGRATIONS
+    
+    def get_schema_version(self):
+        """Get the highest applied migration version (0 if none)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT MAX(version) FROM schema_version")
+                row = cursor.fetchone()
+            except Error:
+                # schema_version does not exist yet
+                row = None
+            cursor.close()
+        return row[0] if row and row[0] else 0
+    
+    def migrate(self):
+        """Apply pending schema migrations and return their versions"""
+        applied = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(200),
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("SELECT version FROM schema_version")
+            done = {row[0] for row in cursor.fetchall()}
+            
+            for version, description, statements in MIGRATIONS:
+                if version in done:
+                    continue
+                
+                # MySQL commits DDL implicitly, so a migration interrupted halfway
+                # is re-run and statements that already took effect are skipped
+                for statement in statements:
+                    try:
+                        cursor.execute(self.backend.migration_sql(statement))
+                    except Error as e:
+                        if e.errno not in ALREADY_APPLIED_ERRORS:
+                            conn.rollback()
+                            cursor.close()
+                            raise
+                
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                conn.commit()
+                applied.append(version)
+                print(f"Applied migration {version}: {description}")
+            
+            cursor.close()
+        return applied
+    
+    def check_query_indexes(self):
+        """Run EXPLAIN on the hot queries and report which indexes they use
+        
+        On nearly empty tables MySQL may prefer a full scan, so run this
+        against realistic data before trusting a failed check.
+        """
+        results = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for name, query, params, expected in INDEX_CHECKS:
+                used = self.backend.explain_indexes(cursor, query, params)
+                results.append({
+                    "query": name,
+                    "expected_indexes": expected,
+                    "used_indexes": used,
+                    "ok": any(index in used for index in expected)
+                })
+            cursor.close()
+        return results
+    
+    # USER OPERATIONS
+    
+    def register_user(self, name, email, password, phone):
+        """Register a new user"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                hashed_pwd = self.hash_password(password)
+                cursor.execute(
+                    "INSERT INTO users (name, email, password, phone) VALUES (%s, %s, %s, %s)",
+                    (name, email, hashed_pwd, phone)
+                )
+                conn.commit()
+                user_id = cursor.lastrowid
+                cursor.close()
+                return {"success": True, "user_id": user_id, "message": "User registered successfully"}
+            except Error as e:
+                cursor.close()
+                return {"success": False, "message": f"Registration failed: {str(e)}"}
+    
+    def login_user(self, email, password):
+        """Login user"""
+        hashed_pwd = self.hash_password(password)
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT user_id, name, email FROM users WHERE email = %s AND password = %s",
+                (email, hashed_pwd)
+            )
+            user = cursor.fetchone()
+            cursor.close()
+        
+        if user:
+            return {"success": True, "user": user, "message": "Login successful"}
+        else:
+            return {"success": False, "message": "Invalid credentials"}
+    
+    # MENU OPERATIONS
+    
+    def get_menu(self, category=None):
+        """Get menu items"""
+        if self.menu_cache:
+            return self.menu_cache.get_menu(category)
+        
+        with self.get_connection() as conn:
+            cursor = self.row_cursor(conn)
+            
+            if category:
+                cursor.execute(
+                    f"SELECT {MenuItem.columns()} FROM menu WHERE category = %s AND availability = TRUE",
+                    (category,)
+                )
+            else:
+                cursor.execute(f"SELECT {MenuItem.columns()} FROM menu WHERE availability = TRUE")
+            
+            items = self.fetch_rows(cursor, MenuItem)
+            cursor.close()
+        return items
+    
+    def bump_menu_version(self, cursor):
+        """Mark the menu as changed so every menu cache reloads"""
+        cursor.execute("UPDATE menu_version SET version = version + 1 WHERE id = 1")
+    
+    def add_menu_item(self, name, category, price, availability=True):
+        """Add new menu item"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "INSERT INTO menu (name, category, price, availability) VALUES (%s, %s, %s, %s)",
+                    (name, category, price, availability)
+                )
+                item_id = cursor.lastrowid
+                self.bump_menu_version(cursor)
+                conn.commit()
+                cursor.close()
+            except Error as e:
+                conn.rollback()
+                cursor.close()
+                if e.errno == 1062:
+                    return {"success": False, "message": f"{name} already exists in {category}"}
+                return {"success": False, "message": str(e)}
+        
+        if self.menu_cache:
+            self.menu_cache.invalidate()
+        if self.menu_search:
+            self.menu_search.update(self.get_item_by_id(item_id))
+        return {"success": True, "item_id": item_id, "message": "Menu item added"}
+    
+    def set_item_availability(self, item_id, availability):
+        """Mark a menu item as available or unavailable"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT item_id FROM menu WHERE item_id = %s FOR UPDATE", (item_id,))
+                if not cursor.fetchone():
+                    conn.rollback()
+                    cursor.close()
+                    return {"success": False, "message": "Item not found"}
+                cursor.execute(
+                    "UPDATE menu SET availability = %s WHERE item_id = %s",
+                    (availability, item_id)
+                )
+                self.bump_menu_version(cursor)
+                conn.commit()
+                cursor.close()
+            except Error as e:
+                conn.rollback()
+                cursor.close()
+                return {"success": False, "message": str(e)}
+        
+        if self.menu_cache:
+            self.menu_cache.invalidate()
+        if self.menu_search:
+            self.menu_search.update(self.get_item_by_id(item_id))
+        return {"success": True, "message": "Availability updated"}
+    
+    def get_categories(self):
+        """Get all menu categories"""
+        if self.menu_cache:
+            return self.menu_cache.get_categories()
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT category FROM menu")
+            categories = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return categories
+    
+    def get_item_by_id(self, item_id):
+        """Get menu item by ID"""
+        if self.menu_cache:
+            return self.menu_cache.get_item(item_id)
+        
+        with self.get_connection() as conn:
+            cursor = self.row_cursor(conn)
+            cursor.execute(f"SELECT {MenuItem.columns()} FROM menu WHERE item_id = %s", (item_id,))
+            items = self.fetch_rows(cursor, MenuItem)
+            cursor.close()
+        return items[0] if items else None
+    
+    def load_cart(self, user_id, flush_interval=2.0):
+        """Get a user's saved cart"""
+        return Cart(self, user_id, flush_interval).load()
+    
+    # ORDER OPERATIONS
+    
+    def place_order(self, user_id, items):
+        """Place a new order
+        items: list of dicts [{"item_id": 1, "quantity": 2}, ...]
+        """
+        if self.group_commit:
+            return self.group_commit.submit(user_id, items).result()
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            try:
+                result = self._insert_order(cursor, user_id, items)
+                if result['success']:
+                    conn.commit()
+                    if self.popular_items:
+                        self.popular_items.record(items)
+                else:
+                    conn.rollback()
+                cursor.close()
+                return result
+            except Exception as e:
+                conn.rollback()
+                cursor.close()
+                return self._order_failure(e)
+    
+    def _order_failure(self, error):
+        return {
+            "success": False,
+            "message": str(error),
+            "retryable": getattr(error, 'errno', None) in RETRYABLE_ERRORS
+        }
+    
+    def _insert_order(self, cursor, user_id, items):
+        """Write one order inside the caller's transaction, without committing"""
+        if not items:
+            return {"success": False, "message": "No items in order"}
+        
+        item_ids = list(dict.fromkeys(item['item_id'] for item in items))
+        menu_items = None
+        
+        # Cached prices are only used while the menu version is unchanged
+        if self.menu_cache:
+            cursor.execute("SELECT version FROM menu_version WHERE id = 1")
+            row = cursor.fetchone()
+            menu_items = self.menu_cache.lookup_items(item_ids, row['version'] if row else 0)
+        
+        # Fetch price, category and availability for every cart line in one query
+        if menu_items is None:
+            placeholders = ', '.join(['%s'] * len(item_ids))
+            cursor.execute(
+                f"SELECT item_id, price, category, availability FROM menu WHERE item_id IN ({placeholders})",
+                item_ids
+            )
+            menu_items = {row['item_id']: row for row in cursor.fetchall()}
+        
+        lines = []
+        for item in items:
+            menu_item = menu_items.get(item['item_id'])
+            
+            if not menu_item or not menu_item['availability']:
+                return {"success": False, "message": f"Item {item['item_id']} not available"}
+            
+            lines.append({
+                'item_id': item['item_id'],
+                'quantity': item['quantity'],
+                'price': menu_item['price'],
+                'category': menu_item['category'],
+            })
+        
+        # Totals and tax (rounded up to the cent) in exact decimal cents
+        bill = self.billing.price_cart(lines)
+        
+        # Insert order
+        cursor.execute(
+            "INSERT INTO orders (user_id, total_amount, tax_amount, final_amount) VALUES (%s, %s, %s, %s)",
+            (user_id, bill['total'], bill['tax'], bill['final_amount'])
+        )
+        order_id = cursor.lastrowid
+        
+        # Insert all order details with one multi-row insert
+        cursor.executemany(
+            "INSERT INTO order_details (order_id, item_id, quantity, price, subtotal) VALUES (%s, %s, %s, %s, %s)",
+            [(order_id, line['item_id'], line['quantity'], line['price'], line['subtotal'])
+             for line in bill['lines']]
+        )
+        
+        # Keep the daily analytics rollups in step within the same transaction
+        self.add_order_to_rollups(cursor, order_id)
+        
+        return {
+            "success": True,
+            "order_id": order_id,
+            "total": bill['total'],
+            "tax": bill['tax'],
+            "final_amount": bill['final_amount'],
+            "message": "Order placed successfully"
+        }
+    
+    def place_orders_batch(self, orders, max_retries=3):
+        """Place several independent orders in one transaction
+        
+        orders: list of (user_id, items) pairs. Returns one place_order
+        result per order, in the same order. Each order runs inside its own
+        savepoint, so a failed order is undone without affecting the rest.
+        A deadlock or lock wait timeout loses the whole transaction (MySQL
+        rolls it back, savepoints included), so the batch is then retried
+        in a fresh transaction, up to max_retries times with backoff.
+        """
+        if not orders:
+            return []
+        
+        delay = 0.01
+        with self.get_connection() as conn:
+            for attempt in range(max_retries + 1):
+                cursor = conn.cursor(dictionary=True)
+                error = None
+                try:
+                    results = self._insert_batch(conn, cursor, orders)
+                    conn.commit()
+                except Exception as e:
+                    # A failed commit loses the whole batch
+                    conn.rollback()
+                    error = e
+                    results = [self._order_failure(e) for _ in orders]
+                finally:
+                    cursor.close()
+                if error is None or getattr(error, 'errno', None) not in RETRYABLE_ERRORS:
+                    break
+                if attempt < max_retries:
+                    time.sleep(delay)
+                    delay *= 2
+        
+        if error is None and self.popular_items:
+            for (_, items), result in zip(orders, results):
+                if result['success']:
+                    self.popular_items.record(items)
+        return results
+    
+    def _insert_batch(self, conn, cursor, orders):
+        """Write each order in its own savepoint, without committing
+        
+        Raises when the transaction itself was lost to a deadlock or lock
+        wait timeout; other failures only fail their own order.
+        """
+        # Open the transaction explicitly; SQLite would otherwise commit on
+        # releasing the first savepoint
+        if not conn.in_transaction:
+            cursor.execute("BEGIN")
+        
+        results = []
+        for user_id, items in orders:
+            cursor.execute("SAVEPOINT batch_order")
+            try:
+                result = self._insert_order(cursor, user_id, items)
+            except Exception as e:
+                if getattr(e, 'errno', None) in RETRYABLE_ERRORS:
+                    raise
+                result = self._order_failure(e)
+            
+            if result['success']:
+                cursor.execute("RELEASE SAVEPOINT batch_order")
+            else:
+                cursor.execute("ROLLBACK TO SAVEPOINT batch_order")
+            results.append(result)
+        return results
+    
+    def get_user_orders(self, user_id):
+        """Get all orders for a user, including archived ones"""
+        query = f"""
+            SELECT {Order.columns('o')}, 
+                   GROUP_CONCAT(CONCAT(m.name, ' x', od.quantity) SEPARATOR ', ') as items
+            FROM orders o
+            LEFT JOIN order_details od ON o.order_id = od.order_id
+            LEFT JOIN menu m ON od.item_id = m.item_id
+            WHERE o.user_id = %s
+            GROUP BY o.order_id
+            ORDER BY o.order_date DESC
+        """
+        with self.get_connection() as conn:
+            cursor = self.row_cursor(conn)
+            
+            orders = []
+            for table_query in (query, archive_sql(query)):
+                cursor.execute(table_query, (user_id,))
+                orders.extend(self.fetch_rows(cursor, Order))
+            cursor.close()
+        # An archived order can be newer than a hot one (see get_orders_page)
+        orders.sort(key=lambda order: (order['order_date'], order['order_id']), reverse=True)
+        return orders
+    
+    def iter_orders(self, user_id=None, status=None, chunk_size=1000):
+        """Yield orders newest first without building the whole list (see iter_rows)"""
+        conditions = []
+        params = []
+        if user_id is not None:
+            conditions.append("user_id = %s")
+            params.append(user_id)
+        if status:
+            conditions.append("status = %s")
+            params.append(status)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        return self.iter_rows(
+            f"SELECT {Order.columns()} FROM orders {where} ORDER BY order_date DESC, order_id DESC",
+            params, Order, chunk_size
+        )
+    
+    def iter_order_lines(self, start_date=None, end_date=None, chunk_size=1000):
+        """Yield order lines with item names for orders placed in a date range (see iter_rows)"""
+        condition, params = self.date_range_filter("o.order_date", start_date, end_date)
+        return self.iter_rows(f"""
+            SELECT {OrderLine.columns('od')}, m.name as item_name
+            FROM order_details od
+            JOIN orders o ON od.order_id = o.order_id
+            JOIN menu m ON od.item_id = m.item_id
+            WHERE {condition}
+            ORDER BY od.detail_id
+        """, params, OrderLine, chunk_size)
+    
+    def get_orders_page(self, user_id=None, page_size=10, after=None, status=None):
+        """Get one page of orders, newest first, using keyset pagination
+        
+        user_id limits the page to one user's orders (None for all users) and
+        status to one order status. after is the next_cursor returned with the
+        previous page, an (order_date, order_id) pair, so every page is an
+        index range scan no matter how deep the user pages. Each page reads
+        the same range from orders_archive and merges the two, since an
+        archived order can be newer than a hot one.
+        Returns {"orders": [...], "next_cursor": (order_date, order_id) or None}
+        """
+        conditions = []
+        params = []
+        if user_id is not None:
+            conditions.append("o.user_id = %s")
+            params.append(user_id)
+        if status:
+            conditions.append("o.status = %s")
+            params.append(status)
+        if after:
+            conditions.append("(o.order_date < %s OR (o.order_date = %s AND o.order_id < %s))")
+            params.extend([after[0], after[0], after[1]])
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        
+        query = f"""
+            SELECT {Order.columns('o')}, NULL as items, u.name as customer_name
+            FROM orders o
+            LEFT JOIN users u ON o.user_id = u.user_id
+            {where}
+            ORDER BY o.order_date DESC, o.order_id DESC
+            LIMIT %s
+        """
+        
+        with self.get_connection() as conn:
+            cursor = self.row_cursor(conn)
+            
+            # archive_orders skips locked rows and back-dated orders can be written
+            # after a run, so the tables overlap in time. One extra row per table
+            # shows whether another page exists.
+            cursor.execute(query, params + [page_size + 1])
+            hot = self.fetch_rows(cursor, Order)
+            cursor.execute(archive_sql(query), params + [page_size + 1])
+            archived = self.fetch_rows(cursor, Order)
+            cursor.close()
+            
+            archived_ids = {order['order_id'] for order in archived}
+            orders = sorted(hot + archived, key=lambda order: (order['order_date'], order['order_id']),
+                            reverse=True)
+            has_more = len(orders) > page_size
+            orders = orders[:page_size]
+            
+            # Fetch the item summaries for the whole page, one query per table
+            items = {}
+            cursor = conn.cursor()
+            for in_archive, table_sql in ((False, str), (True, archive_sql)):
+                table_orders = [order for order in orders if (order['order_id'] in archived_ids) == in_archive]
+                if not table_orders:
+                    continue
+                placeholders = ', '.join(['%s'] * len(table_orders))
+                cursor.execute(table_sql(f"""
+                    SELECT od.order_id,
+                           GROUP_CONCAT(CONCAT(m.name, ' x', od.quantity) SEPARATOR ', ') as items
+                    FROM order_details od
+                    JOIN menu m ON od.item_id = m.item_id
+                    WHERE od.order_id IN ({placeholders})
+                    GROUP BY od.order_id
+                """), [order['order_id'] for order in table_orders])
+                items.update(cursor.fetchall())
+            cursor.close()
+            for order in orders:
+                order['items'] = items.get(order['order_id'])
+        
+        next_cursor = None
+        if has_more:
+            last = orders[-1]
+            next_cursor = (last['order_date'], last['order_id'])
+        return {"orders": orders, "next_cursor": next_cursor}
+    
+    def get_order_details(self, order_id):
+        """Get detailed information about an order, looking in the archive if it is not in orders"""
+        with self.get_connection() as conn:
+            cursor = self.row_cursor(conn)
+            
+            for table_sql in (str, archive_sql):
+                cursor.execute(table_sql(f"SELECT {Order.columns()} FROM orders WHERE order_id = %s"), (order_id,))
+                orders = self.fetch_rows(cursor, Order)
+                if orders:
+                    break
+            else:
+                cursor.close()
+                return None
+            
+            cursor.execute(table_sql(f"""
+                SELECT {OrderLine.columns('od')}, m.name as item_name
+                FROM order_details od
+                JOIN menu m ON od.item_id = m.item_id
+                WHERE od.order_id = %s
+            """), (order_id,))
+            
+            details = self.fetch_rows(cursor, OrderLine)
+            cursor.close()
+        
+        return {"order": orders[0], "items": details}
+    
+    # ORDER STATUS
+    
+    def update_orders_status(self, order_ids, status):
+        """Move orders to status, the next step of ORDER_STATUSES
+        
+        Only orders currently in the step before status are changed; the
+        rest are reported as skipped. All changes are made in one transaction.
+        Returns {"success", "message", "updated": [ids], "skipped": [ids]}
+        """
+        if status not in ORDER_STATUSES[1:]:
+            return {"success": False, "message": f"Cannot move an order to status {status!r}"}
+        previous = ORDER_STATUSES[ORDER_STATUSES.index(status) - 1]
+        order_ids = list(dict.fromkeys(order_ids))
+        if not order_ids:
+            return {"success": True, "message": "No orders to update", "updated": [], "skipped": []}
+        
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if not conn.in_transaction:
+                    self.backend.begin_write(cursor)
+                cursor.execute(
+                    f"SELECT order_id FROM orders WHERE order_id IN ({placeholders}) AND status = %s FOR UPDATE",
+                    order_ids + [previous]
+                )
+                updated = {row[0] for row in cursor.fetchall()}
+                if updated:
+                    cursor.execute(
+                        f"UPDATE orders SET status = %s WHERE order_id IN ({', '.join(['%s'] * len(updated))})",
+                        [status] + list(updated)
+                    )
+                conn.commit()
+                cursor.close()
+            except Exception as e:
+                conn.rollback()
+                cursor.close()
+                return self._order_failure(e)
+        
+        return {
+            "success": True,
+            "message": f"{len(updated)} orders moved to {status}",
+            "updated": [order_id for order_id in order_ids if order_id in updated],
+            "skipped": [order_id for order_id in order_ids if order_id not in updated]
+        }
+    
+    def update_order_status(self, order_id, status):
+        """Move one order to the next status"""
+        result = self.update_orders_status([order_id], status)
+        if result.get('skipped'):
+            return {"success": False, "message": f"Order {order_id} cannot move to {status} from its current status"}
+        return result
     
-    def connect(self):
-        """Establish database connection"""
-        try:
-            self.connection = mysql.connector.connect(**self.DB_CONFIG)
-            if self.connection.is_connected():
-                return True
-        except Error as e:
-            print(f"Error connecting to database: {e}")
-            return False
+    def claim_orders(self, limit=5):
+        """Take the oldest limit Pending orders for a kitchen worker and mark them Preparing
+        
+        Rows another worker is claiming are skipped (FOR UPDATE SKIP LOCKED),
+        so concurrent workers never wait for each other or claim the same
+        order. The queue is read through the (status, order_date, order_id)
+        index.
+        Returns {"success", "orders": [Order, ...] oldest first, with item summaries}
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if not conn.in_transaction:
+                    self.backend.begin_write(cursor)
+                cursor.execute("""
+                    SELECT order_id FROM orders
+                    WHERE status = %s
+                    ORDER BY order_date, order_id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (ORDER_STATUSES[0], limit))
+                order_ids = [row[0] for row in cursor.fetchall()]
+                orders = []
+                if order_ids:
+                    placeholders = ', '.join(['%s'] * len(order_ids))
+                    cursor.execute(f"UPDATE orders SET status = %s WHERE order_id IN ({placeholders})",
+                                   [ORDER_STATUSES[1]] + order_ids)
+                    cursor.close()
+                    cursor = self.row_cursor(conn)
+                    cursor.execute(f"""
+                        SELECT {Order.columns('o')},
+                               GROUP_CONCAT(CONCAT(m.name, ' x', od.quantity) SEPARATOR ', ') as items
+                        FROM orders o
+                        LEFT JOIN order_details od ON o.order_id = od.order_id
+                        LEFT JOIN menu m ON od.item_id = m.item_id
+                        WHERE o.order_id IN ({placeholders})
+                        GROUP BY o.order_id
+                        ORDER BY o.order_date, o.order_id
+                    """, order_ids)
+                    orders = self.fetch_rows(cursor, Order)
+                conn.commit()
+                cursor.close()
+            except Exception as e:
+                conn.rollback()
+                cursor.close()
+                return self._order_failure(e)
+        
+        return {"success": True, "message": f"Claimed {len(orders)} orders", "orders": orders}
     
-    def disconnect(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+    def get_order_queue(self, status='Pending', limit=20):
+        """Get the oldest orders waiting in a status, without claiming them"""
+        with self.get_connection() as conn:
+            cursor = self.row_cursor(conn)
+            cursor.execute(f"""
+                SELECT {Order.columns('o')}, NULL as items, u.name as customer_name
+                FROM orders o
+                LEFT JOIN users u ON o.user_id = u.user_id
+                WHERE o.status = %s
+                ORDER BY o.order_date, o.order_id
+                LIMIT %s
+            """, (status, limit))
+            orders = self.fetch_rows(cursor, Order)
+            cursor.close()
+        return orders
     
-    def hash_password(self, password):
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    # ORDER ARCHIVAL
     
-    def initialize_database(self):
-        """Create tables if they don't exist"""
-        cursor = self.connection.cursor()
+    def archive_orders(self, older_than_days=None, batch_size=1000, max_batches=None, progress=None):
+        """Move orders older than older_than_days into orders_archive and order_details_archive
         
-        # Create Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(100) NOT NULL,
-                email VARCHAR(100) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                phone VARCHAR(15),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        Orders are moved oldest first, batch_size orders per transaction, so
+        an interrupted run keeps every finished batch and the next run picks
+        up where it stopped. max_batches limits how long one run takes, and
+        progress (if given) is called with the running order count after
+        every batch. Concurrent runs skip each other's locked rows. Archived
+        orders stay in the rollups and are still found by get_order_details,
+        get_user_orders and get_orders_page.
+        """
+        if older_than_days is None:
+            older_than_days = self.archive_after_days
+        archived = 0
+        batches = 0
+        done = False
         
-        # Create Menu table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS menu (
-                item_id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(100) NOT NULL,
-                category VARCHAR(50),
-                price DECIMAL(10, 2) NOT NULL,
-                availability BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cutoff = self.database_now(cursor) - timedelta(days=older_than_days)
+                while max_batches is None or batches < max_batches:
+                    cursor.execute("""
+                        SELECT order_id FROM orders
+                        WHERE order_date < %s
+                        ORDER BY order_date, order_id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    """, (cutoff, batch_size))
+                    order_ids = [row[0] for row in cursor.fetchall()]
+                    if not order_ids:
+                        conn.commit()
+                        done = True
+                        break
+                    
+                    placeholders = ', '.join(['%s'] * len(order_ids))
+                    for table, columns in (("orders", Order.columns()), ("order_details", OrderLine.columns())):
+                        cursor.execute(f"""
+                            INSERT INTO {table}_archive ({columns})
+                            SELECT {columns} FROM {table} WHERE order_id IN ({placeholders})
+                        """, order_ids)
+                    cursor.execute(f"DELETE FROM order_details WHERE order_id IN ({placeholders})", order_ids)
+                    cursor.execute(f"DELETE FROM orders WHERE order_id IN ({placeholders})", order_ids)
+                    conn.commit()
+                    
+                    archived += len(order_ids)
+                    batches += 1
+                    if progress:
+                        progress(archived)
+                    if len(order_ids) < batch_size:
+                        done = True
+                        break
+                cursor.close()
+            except Error as e:
+                conn.rollback()
+                cursor.close()
+                # Finished batches stay archived; running the job again continues from here
+                return {"success": False, "message": str(e), "archived": archived, "batches": batches,
+                        "done": False}
         
-        # Create Orders table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                order_id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT,
-                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                total_amount DECIMAL(10, 2),
-                tax_amount DECIMAL(10, 2),
-                final_amount DECIMAL(10, 2),
-                status VARCHAR(20) DEFAULT 'Pending',
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            )
-        """)
+        return {
+            "success": True,
+            "message": f"Archived {archived} orders in {batches} batches" + ("" if done else ", more remain"),
+            "archived": archived,
+            "batches": batches,
+            "done": done
+        }
+    
+    # CSV EXPORT OPERATIONS
+    
+    def stream_query_to_csv(self, query, params, header, filename,
+                            chunk_size=1000, compress=False, progress=None):
+        """Write the rows of a query to CSV without loading them all into memory
         
-        # Create Order Details table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS order_details (
-                detail_id INT AUTO_INCREMENT PRIMARY KEY,
-                order_id INT,
-                item_id INT,
-                quantity INT,
-                price DECIMAL(10, 2),
-                subtotal DECIMAL(10, 2),
-                FOREIGN KEY (order_id) REFERENCES orders(order_id),
-                FOREIGN KEY (item_id) REFERENCES menu(item_id)
-            )
-        """)
+        Rows are read with an unbuffered cursor in chunks of chunk_size, so
+        memory use stays flat whatever the table size. The file is gzipped
+        when compress is True or the filename ends in .gz, and progress (if
+        given) is called with the running row count after every chunk.
+        Returns the number of rows written.
+        """
+        if compress or filename.endswith('.gz'):
+            file = gzip.open(filename, 'wt', newline='')
+        else:
+            file = open(filename, 'w', newline='')
         
-        self.connection.commit()
-        cursor.close()
-        print("Database initialized successfully!")
+        count = 0
+        with self.get_connection() as conn, file:
+            cursor = conn.cursor(buffered=False)
+            try:
+                cursor.execute(query, params)
+                writer = csv.writer(file)
+                writer.writerow(header)
+                
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    count += len(rows)
+                    if progress:
+                        progress(count)
+            finally:
+                cursor.close()
+        return count
     
-    # USER OPERATIONS
+    def export_menu_to_csv(self, filename='menu_export.csv', chunk_size=1000,
+                           compress=False, progress=None):
+        """Export menu to CSV file"""
+        count = self.stream_query_to_csv(
+            "SELECT item_id, name, category, price, availability, created_at FROM menu", (),
+            ['Item ID', 'Name', 'Category', 'Price', 'Availability', 'Created At'],
+            filename, chunk_size, compress, progress
+        )
+        return f"Menu exported to {filename} ({count} rows)"
     
-    def register_user(self, name, email, password, phone):
-        """Register a new user"""
-        cursor = self.connection.cursor()
+    def import_menu_from_csv(self, filename, chunk_size=500, dry_run=False, progress=None):
+        """Insert or update menu items from a CSV in the export_menu_to_csv format
+        
+        Rows are matched to existing items on name + category: new items are
+        inserted, items whose price or availability changed are updated, and
+        unchanged or invalid rows are skipped. The file is read in chunks of
+        chunk_size rows and each chunk is written with one multi-row upsert
+        and committed. With dry_run nothing is written but the counts are
+        reported as if it had been. progress (if given) is called with the
+        running row count after every chunk.
+        """
+        counts = {"inserted": 0, "updated": 0, "skipped": 0}
+        errors = []
+        # Items already imported in this run, so later duplicates and dry runs count correctly
+        imported = {}
+        rows_read = 0
+        
         try:
-            hashed_pwd = self.hash_password(password)
-            cursor.execute(
-                "INSERT INTO users (name, email, password, phone) VALUES (%s, %s, %s, %s)",
-                (name, email, hashed_pwd, phone)
-            )
-            self.connection.commit()
-            user_id = cursor.lastrowid
-            cursor.close()
-            return {"success": True, "user_id": user_id, "message": "User registered successfully"}
-        except Error as e:
-            cursor.close()
-            return {"success": False, "message": f"Registration failed: {str(e)}"}
+            file = gzip.open(filename, 'rt', newline='') if filename.endswith('.gz') else open(filename, newline='')
+        except OSError as e:
+            return {"success": False, "message": str(e)}
+        
+        with self.get_connection() as conn, file:
+            cursor = conn.cursor()
+            try:
+                reader = csv.DictReader(file)
+                missing = {'Name', 'Category', 'Price'} - set(reader.fieldnames or [])
+                if missing:
+                    cursor.close()
+                    return {"success": False, "message": f"Missing columns: {', '.join(sorted(missing))}"}
+                
+                chunk = []
+                for line_number, row in enumerate(reader, start=2):
+                    rows_read += 1
+                    try:
+                        chunk.append(self._parse_menu_csv_row(row))
+                    except ValueError as e:
+                        counts['skipped'] += 1
+                        errors.append(f"Line {line_number}: {e}")
+                    
+                    if len(chunk) >= chunk_size:
+                        self._import_menu_chunk(cursor, chunk, imported, counts, dry_run)
+                        self._finish_import_chunk(conn, dry_run)
+                        chunk = []
+                        if progress:
+                            progress(rows_read)
+                
+                if chunk:
+                    self._import_menu_chunk(cursor, chunk, imported, counts, dry_run)
+                    self._finish_import_chunk(conn, dry_run)
+                if progress:
+                    progress(rows_read)
+                cursor.close()
+            except Error as e:
+                conn.rollback()
+                cursor.close()
+                # Earlier chunks stay committed; re-running the import is safe
+                return {"success": False, "message": str(e), **counts, "errors": errors}
+        
+        if not dry_run and (counts['inserted'] or counts['updated']):
+            if self.menu_cache:
+                self.menu_cache.invalidate()
+            if self.menu_search:
+                self.enable_menu_search()
+        
+        verb = "Would import" if dry_run else "Imported"
+        return {
+            "success": True,
+            "message": f"{verb} {rows_read} rows: {counts['inserted']} inserted, "
+                       f"{counts['updated']} updated, {counts['skipped']} skipped",
+            **counts,
+            "errors": errors,
+        }
     
-    def login_user(self, email, password):
-        """Login user"""
-        cursor = self.connection.cursor(dictionary=True)
-        hashed_pwd = self.hash_password(password)
+    def _parse_menu_csv_row(self, row):
+        name = (row.get('Name') or '').strip()
+        category = (row.get('Category') or '').strip()
+        if not name or not category:
+            raise ValueError("name and category are required")
         
-        cursor.execute(
-            "SELECT user_id, name, email FROM users WHERE email = %s AND password = %s",
-            (email, hashed_pwd)
-        )
-        user = cursor.fetchone()
-        cursor.close()
+        try:
+            price = Decimal(row['Price'].strip()).quantize(Decimal('0.01'))
+        except (ArithmeticError, AttributeError):
+            raise ValueError(f"invalid price {row['Price']!r}")
+        if not price.is_finite() or price < 0:
+            raise ValueError(f"invalid price {row['Price']!r}")
         
-        if user:
-            return {"success": True, "user": user, "message": "Login successful"}
+        availability = (row.get('Availability') or '1').strip().lower()
+        if availability in ('1', 'true', 'yes', 'y'):
+            availability = True
+        elif availability in ('0', 'false', 'no', 'n'):
+            availability = False
         else:
-            return {"success": False, "message": "Invalid credentials"}
+            raise ValueError(f"invalid availability {row['Availability']!r}")
+        return (name, category, price, availability)
     
-    # MENU OPERATIONS
+    def _finish_import_chunk(self, conn, dry_run):
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
     
-    def get_menu(self, category=None):
-        """Get menu items"""
-        cursor = self.connection.cursor(dictionary=True)
+    def _import_menu_chunk(self, cursor, rows, imported, counts, dry_run):
+        """Upsert one chunk of parsed menu rows, counting what changes"""
+        names = list({row[0] for row in rows})
+        placeholders = ', '.join(['%s'] * len(names))
+        cursor.execute(
+            f"SELECT name, category, price, availability FROM menu WHERE name IN ({placeholders})",
+            names
+        )
+        # Match names the way the unique index does (case-insensitively on MySQL)
+        collate = self.backend.collation_key
+        current = {(collate(name), collate(category)): (Decimal(price), bool(availability))
+                   for name, category, price, availability in cursor.fetchall()}
+        current.update(imported)
         
-        if category:
-            cursor.execute("SELECT * FROM menu WHERE category = %s AND availability = TRUE", (category,))
-        else:
-            cursor.execute("SELECT * FROM menu WHERE availability = TRUE")
+        changes = []
+        for name, category, price, availability in rows:
+            key = (collate(name), collate(category))
+            existing = current.get(key)
+            if existing is None:
+                counts['inserted'] += 1
+            elif existing == (price, availability):
+                counts['skipped'] += 1
+                continue
+            else:
+                counts['updated'] += 1
+            current[key] = imported[key] = (price, availability)
+            changes.append((name, category, price, availability))
         
-        items = cursor.fetchall()
-        cursor.close()
-        return items
-    
-    def add_menu_item(self, name, category, price, availability=True):
-        """Add new menu item"""
-        cursor = self.connection.cursor()
-        try:
+        if changes and not dry_run:
+            values = ', '.join(['(%s, %s, %s, %s)'] * len(changes))
             cursor.execute(
-                "INSERT INTO menu (name, category, price, availability) VALUES (%s, %s, %s, %s)",
-                (name, category, price, availability)
+                f"INSERT INTO menu (name, category, price, availability) VALUES {values} "
+                "ON DUPLICATE KEY UPDATE price = VALUES(price), availability = VALUES(availability)",
+                [value for change in changes for value in change]
             )
-            self.connection.commit()
-            item_id = cursor.lastrowid
-            cursor.close()
-            return {"success": True, "item_id": item_id, "message": "Menu item added"}
-        except Error as e:
-            cursor.close()
-            return {"success": False, "message": str(e)}
+            self.bump_menu_version(cursor)
     
-    def get_categories(self):
-        """Get all menu categories"""
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT DISTINCT category FROM menu")
-        categories = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        return categories
+    def export_orders_to_csv(self, filename='orders_export.csv', chunk_size=1000,
+                             compress=False, progress=None):
+        """Export orders, including archived ones, to CSV file"""
+        query = "SELECT order_id, user_id, order_date, total_amount, tax_amount, final_amount, status FROM orders"
+        count = self.stream_query_to_csv(
+            query + " UNION ALL " + archive_sql(query),
+            (),
+            ['Order ID', 'User ID', 'Order Date', 'Total', 'Tax', 'Final Amount', 'Status'],
+            filename, chunk_size, compress, progress
+        )
+        return f"Orders exported to {filename} ({count} rows)"
     
-    def get_item_by_id(self, item_id):
-        """Get menu item by ID"""
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM menu WHERE item_id = %s", (item_id,))
-        item = cursor.fetchone()
-        cursor.close()
-        return item
+    def load_export_watermark(self, watermark_file):
+        """Read the position reached by the last incremental export"""
+        if watermark_file and os.path.exists(watermark_file):
+            with open(watermark_file) as file:
+                return json.load(file)
+        return {"updated_at": "1970-01-01 00:00:00", "order_id": 0, "file_size": 0}
     
-    # ORDER OPERATIONS
+    def save_export_watermark(self, watermark_file, watermark):
+        """Atomically replace the saved watermark"""
+        temp_file = watermark_file + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump(watermark, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, watermark_file)
     
-    def place_order(self, user_id, items):
-        """Place a new order
-        items: list of dicts [{"item_id": 1, "quantity": 2}, ...]
+    def export_orders_incremental(self, filename='orders_incremental.csv', watermark_file=None,
+                                  include_details=False, chunk_size=1000, progress=None):
+        """Append orders created or changed since the last run to a CSV file
+        
+        The position reached is kept in a watermark file as (updated_at,
+        order_id) plus the CSV size at that point. A rerun after a crash first
+        truncates anything written after the last saved watermark, so rows are
+        never duplicated. Orders changed in the current second are left for
+        the next run, since more changes may still land in that second.
+        Changed orders are appended again, so the file is a change log.
+        Returns the number of rows written.
         """
-        cursor = self.connection.cursor(dictionary=True)
+        watermark_file = watermark_file or filename + '.watermark'
+        watermark = self.load_export_watermark(watermark_file)
         
-        try:
-            # Calculate order total
-            total = 0
-            order_items = []
-            
-            for item in items:
-                cursor.execute("SELECT * FROM menu WHERE item_id = %s", (item['item_id'],))
-                menu_item = cursor.fetchone()
-                
-                if not menu_item or not menu_item['availability']:
-                    return {"success": False, "message": f"Item {item['item_id']} not available"}
+        if not os.path.exists(filename):
+            # Export file was removed - start again from the beginning
+            watermark = self.load_export_watermark(None)
+        elif os.path.getsize(filename) > watermark['file_size']:
+            # Drop rows appended by a run that crashed before saving its watermark
+            with open(filename, 'r+') as file:
+                file.truncate(watermark['file_size'])
+        
+        header = ['Order ID', 'User ID', 'Order Date', 'Updated At', 'Total', 'Tax', 'Final Amount', 'Status']
+        columns = """o.order_id, o.user_id, o.order_date, o.updated_at,
+                     o.total_amount, o.tax_amount, o.final_amount, o.status"""
+        joins = ""
+        order_by = "o.updated_at, o.order_id"
+        if include_details:
+            header += ['Item ID', 'Quantity', 'Price', 'Subtotal']
+            columns += ", od.item_id, od.quantity, od.price, od.subtotal"
+            joins = "LEFT JOIN order_details od ON o.order_id = od.order_id"
+            order_by += ", od.detail_id"
+        
+        query = f"""
+            SELECT {columns}
+            FROM orders o
+            {joins}
+            WHERE (o.updated_at > %s OR (o.updated_at = %s AND o.order_id > %s))
+              AND o.updated_at < CURRENT_TIMESTAMP
+            ORDER BY {order_by}
+        """
+        params = (watermark['updated_at'], watermark['updated_at'], watermark['order_id'])
+        
+        count = 0
+        last_row = None
+        with self.get_connection() as conn, open(filename, 'a', newline='') as file:
+            cursor = conn.cursor(buffered=False)
+            try:
+                cursor.execute(query, params)
+                writer = csv.writer(file)
+                if file.tell() == 0:
+                    writer.writerow(header)
                 
-                subtotal = float(menu_item['price']) * item['quantity']
-                total += subtotal
-                order_items.append({
-                    'item_id': item['item_id'],
-                    'quantity': item['quantity'],
-                    'price': float(menu_item['price']),
-                    'subtotal': subtotal
-                })
-            
-            # Calculate tax (GST 5%) using math.ceil for rounding up
-            tax = math.ceil(total * 0.05 * 100) / 100
-            final_amount = total + tax
-            
-            # Insert order
-            cursor.execute(
-                "INSERT INTO orders (user_id, total_amount, tax_amount, final_amount) VALUES (%s, %s, %s, %s)",
-                (user_id, total, tax, final_amount)
-            )
-            order_id = cursor.lastrowid
-            
-            # Insert order details
-            for item in order_items:
-                cursor.execute(
-                    "INSERT INTO order_details (order_id, item_id, quantity, price, subtotal) VALUES (%s, %s, %s, %s, %s)",
-                    (order_id, item['item_id'], item['quantity'], item['price'], item['subtotal'])
-                )
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    count += len(rows)
+                    last_row = rows[-1]
+                    if progress:
+                        progress(count)
+            finally:
+                cursor.close()
             
-            self.connection.commit()
-            cursor.close()
-            
-            return {
-                "success": True,
-                "order_id": order_id,
-                "total": total,
-                "tax": tax,
-                "final_amount": final_amount,
-                "message": "Order placed successfully"
+            file.flush()
+            os.fsync(file.fileno())
+            file_size = file.tell()
+        
+        if last_row:
+            watermark = {
+                "updated_at": str(last_row[3]),
+                "order_id": last_row[0],
+                "file_size": file_size
             }
-        except Exception as e:
-            self.connection.rollback()
-            cursor.close()
-            return {"success": False, "message": str(e)}
+        else:
+            watermark["file_size"] = file_size
+        self.save_export_watermark(watermark_file, watermark)
+        return count
     
-    def get_user_orders(self, user_id):
-        """Get all orders for a user"""
-        cursor = self.connection.cursor(dictionary=True)
-        
+    # ANALYTICS
+    
+    def add_order_to_rollups(self, cursor, order_id):
+        """Add one order to the daily rollup tables (caller commits)"""
         cursor.execute("""
-            SELECT o.*, 
-                   GROUP_CONCAT(CONCAT(m.name, ' x', od.quantity) SEPARATOR ', ') as items
+            INSERT INTO daily_revenue (sale_date, order_count, items_sold, revenue)
+            SELECT DATE(o.order_date), 1,
+                   (SELECT COALESCE(SUM(quantity), 0) FROM order_details WHERE order_id = o.order_id),
+                   o.final_amount
             FROM orders o
-            LEFT JOIN order_details od ON o.order_id = od.order_id
-            LEFT JOIN menu m ON od.item_id = m.item_id
-            WHERE o.user_id = %s
-            GROUP BY o.order_id
-            ORDER BY o.order_date DESC
-        """, (user_id,))
-        
-        orders = cursor.fetchall()
-        cursor.close()
-        return orders
-    
-    def get_order_details(self, order_id):
-        """Get detailed information about an order"""
-        cursor = self.connection.cursor(dictionary=True)
-        
-        cursor.execute("SELECT * FROM orders WHERE order_id = %s", (order_id,))
-        order = cursor.fetchone()
-        
-        if not order:
-            cursor.close()
-            return None
-        
+            WHERE o.order_id = %s
+            ON DUPLICATE KEY UPDATE
+                order_count = order_count + VALUES(order_count),
+                items_sold = items_sold + VALUES(items_sold),
+                revenue = revenue + VALUES(revenue)
+        """, (order_id,))
         cursor.execute("""
-            SELECT od.*, m.name as item_name
+            INSERT INTO daily_item_sales (sale_date, item_id, quantity, revenue)
+            SELECT DATE(o.order_date), od.item_id, SUM(od.quantity), SUM(od.subtotal)
             FROM order_details od
-            JOIN menu m ON od.item_id = m.item_id
+            JOIN orders o ON o.order_id = od.order_id
+            WHERE od.order_id = %s
+            GROUP BY DATE(o.order_date), od.item_id
+            ON DUPLICATE KEY UPDATE
+                quantity = quantity + VALUES(quantity),
+                revenue = revenue + VALUES(revenue)
+        """, (order_id,))
+        cursor.execute("""
+            INSERT INTO daily_category_sales (sale_date, category, order_count, quantity, revenue)
+            SELECT DATE(o.order_date), COALESCE(m.category, ''), 1, SUM(od.quantity), SUM(od.subtotal)
+            FROM order_details od
+            JOIN orders o ON o.order_id = od.order_id
+            JOIN menu m ON m.item_id = od.item_id
             WHERE od.order_id = %s
+            GROUP BY DATE(o.order_date), COALESCE(m.category, '')
+            ON DUPLICATE KEY UPDATE
+                order_count = order_count + VALUES(order_count),
+                quantity = quantity + VALUES(quantity),
+                revenue = revenue + VALUES(revenue)
         """, (order_id,))
+    
+    def date_range_filter(self, column, start_date=None, end_date=None):
+        """Build a WHERE condition for an inclusive date range on column"""
+        conditions = []
+        params = []
+        if start_date:
+            conditions.append(f"{column} >= %s")
+            params.append(start_date)
+        if end_date:
+            conditions.append(f"{column} < %s")
+            params.append(end_date + timedelta(days=1))
+        return " AND ".join(conditions) or "TRUE", params
+    
+    def rebuild_rollups(self, start_date=None, end_date=None):
+        """Recompute the rollups for a date range from the base tables
         
-        details = cursor.fetchall()
-        cursor.close()
+        This is the catch-up job for rollups that fell behind, e.g. after
+        orders were loaded or changed outside place_order. Archived orders
+        are added on top of the hot tables' totals.
+        """
+        rollup_where, rollup_params = self.date_range_filter("sale_date", start_date, end_date)
+        order_where, order_params = self.date_range_filter("o.order_date", start_date, end_date)
         
-        return {"order": order, "items": details}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for table, keys, values, source in ROLLUPS:
+                    cursor.execute(f"DELETE FROM {table} WHERE {rollup_where}", rollup_params)
+                    cursor.execute(rollup_insert_sql(table, keys, values, source, order_where), order_params)
+                    # A day can be split between the hot and archive tables
+                    cursor.execute(
+                        rollup_insert_sql(table, keys, values, archive_sql(source), order_where) +
+                        " ON DUPLICATE KEY UPDATE " +
+                        ", ".join(f"{value} = {value} + VALUES({value})" for value in values),
+                        order_params
+                    )
+                conn.commit()
+            except Error:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
     
-    # CSV EXPORT OPERATIONS
+    def rollup_rows_by_key(self, rows, key_count):
+        """Index rollup rows by key, normalized so stored and recomputed rows compare equal
+        
+        Keys are compared as strings (a DATE column and DATE() may come back as
+        different types) and amounts to the cent. Rows with the same key are
+        summed, so hot and archived orders can be combined.
+        """
+        indexed = {}
+        for row in rows:
+            key = tuple(str(value) for value in row[:key_count])
+            amounts = [float(value or 0) for value in row[key_count:]]
+            if key in indexed:
+                amounts = [amount + earlier for amount, earlier in zip(amounts, indexed[key])]
+            indexed[key] = amounts
+        return {key: tuple(round(amount, 2) for amount in amounts) for key, amounts in indexed.items()}
     
-    def export_menu_to_csv(self, filename='menu_export.csv'):
-        """Export menu to CSV file"""
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM menu")
-        rows = cursor.fetchall()
+    def check_rollups(self, start_date=None, end_date=None):
+        """Compare the rollups against a full recompute from the base tables
         
-        with open(filename, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Item ID', 'Name', 'Category', 'Price', 'Availability', 'Created At'])
-            writer.writerows(rows)
+        Returns a list of mismatches, each a dict with the table, the key and
+        the rollup and recomputed values. An empty list means consistent.
+        """
+        rollup_where, rollup_params = self.date_range_filter("sale_date", start_date, end_date)
+        order_where, order_params = self.date_range_filter("o.order_date", start_date, end_date)
         
-        cursor.close()
-        return f"Menu exported to {filename}"
+        mismatches = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for table, keys, values, source in ROLLUPS:
+                cursor.execute(
+                    f"SELECT {', '.join(keys + values)} FROM {table} WHERE {rollup_where}",
+                    rollup_params
+                )
+                stored = self.rollup_rows_by_key(cursor.fetchall(), len(keys))
+                recomputed = []
+                for table_source in (source, archive_sql(source)):
+                    cursor.execute(table_source.format(where=order_where), order_params)
+                    recomputed.extend(cursor.fetchall())
+                expected = self.rollup_rows_by_key(recomputed, len(keys))
+                
+                for key in sorted(set(stored) | set(expected)):
+                    if stored.get(key) != expected.get(key):
+                        mismatches.append({
+                            "table": table,
+                            "key": key,
+                            "rollup": stored.get(key),
+                            "recomputed": expected.get(key)
+                        })
+            cursor.close()
+        return mismatches
     
-    def export_orders_to_csv(self, filename='orders_export.csv'):
-        """Export orders to CSV file"""
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT * FROM orders")
-        rows = cursor.fetchall()
+    def reprice_orders(self, start_date=None, end_date=None, chunk_size=1000, engine=None):
+        """Re-price stored orders with the billing engine and list those that disagree
+        
+        Each order's lines are priced at the price stored on the line and
+        taxed by the engine's current category rates (self.billing unless
+        engine is given). Orders are streamed and priced chunk_size at a
+        time with one price_carts call per chunk.
+        Returns {"orders": count, "mismatches": [{"order_id", "stored", "computed"}, ...]}
+        """
+        engine = engine or self.billing
+        where, params = self.date_range_filter("o.order_date", start_date, end_date)
+        count = 0
+        mismatches = []
         
-        with open(filename, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['Order ID', 'User ID', 'Order Date', 'Total', 'Tax', 'Final Amount', 'Status'])
-            writer.writerows(rows)
+        def check(batch):
+            bills = engine.price_carts([lines for _, _, lines in batch], with_lines=False, as_cents=True)
+            for (order_id, stored, _), bill in zip(batch, bills):
+                computed = (bill['total'], bill['tax'], bill['final_amount'])
+                if tuple(engine.to_cents(value or 0) for value in stored) != computed:
+                    mismatches.append({
+                        "order_id": order_id,
+                        "stored": stored,
+                        "computed": tuple(engine.from_cents(cents) for cents in computed)
+                    })
         
-        cursor.close()
-        return f"Orders exported to {filename}"
+        with self.get_connection() as conn:
+            cursor = conn.cursor(buffered=False)
+            try:
+                cursor.execute(f"""
+                    SELECT o.order_id, o.total_amount, o.tax_amount, o.final_amount,
+                           od.quantity, od.price, m.category
+                    FROM orders o
+                    JOIN order_details od ON o.order_id = od.order_id
+                    JOIN menu m ON od.item_id = m.item_id
+                    WHERE {where}
+                    ORDER BY o.order_id
+                """, params)
+                
+                batch = []
+                current = None
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    for order_id, total, tax, final_amount, quantity, price, category in rows:
+                        if current is None or current[0] != order_id:
+                            # Only price complete orders; the last one may continue in the next fetch
+                            if len(batch) >= chunk_size:
+                                check(batch)
+                                count += len(batch)
+                                batch = []
+                            current = (order_id, (total, tax, final_amount), [])
+                            batch.append(current)
+                        current[2].append({"price": price, "quantity": quantity, "category": category})
+                if batch:
+                    check(batch)
+                    count += len(batch)
+            finally:
+                cursor.close()
+        
+        return {"orders": count, "mismatches": mismatches}
     
-    # ANALYTICS
+    def cached_analytics(self, key, loader):
+        """Run an analytics query through the result cache when it is enabled"""
+        if self.analytics_cache:
+            return self.analytics_cache.get(key, loader)
+        return loader()
     
-    def get_total_revenue(self):
+    def get_total_revenue(self, start_date=None, end_date=None):
         """Calculate total revenue"""
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT SUM(final_amount) as total_revenue FROM orders")
-        result = cursor.fetchone()
-        cursor.close()
-        return result[0] if result[0] else 0
+        return self.cached_analytics(
+            ("total_revenue", start_date, end_date),
+            lambda: self._query_total_revenue(start_date, end_date)
+        )
+    
+    def _query_total_revenue(self, start_date, end_date):
+        where, params = self.date_range_filter("sale_date", start_date, end_date)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT SUM(revenue) as total_revenue FROM daily_revenue WHERE {where}", params)
+            result = cursor.fetchone()
+            cursor.close()
+        return BillingEngine.round_amount(result[0])
     
-    def get_popular_items(self):
+    def get_popular_items(self, start_date=None, end_date=None, limit=5):
         """Get most popular menu items"""
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                m.name,
-                SUM(od.quantity) as total_orders
-            FROM order_details od
-            JOIN menu m ON od.item_id = m.item_id
-            GROUP BY m.item_id
-            ORDER BY total_orders DESC
-            LIMIT 5
-        """)
-        items = cursor.fetchall()
-        cursor.close()
+        return self.cached_analytics(
+            ("popular_items", start_date, end_date, limit),
+            lambda: self._query_popular_items(start_date, end_date, limit)
+        )
+    
+    def _query_popular_items(self, start_date, end_date, limit):
+        where, params = self.date_range_filter("d.sale_date", start_date, end_date)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT 
+                    m.name,
+                    SUM(d.quantity) as total_orders
+                FROM daily_item_sales d
+                JOIN menu m ON d.item_id = m.item_id
+                WHERE {where}
+                GROUP BY d.item_id, m.name
+                ORDER BY total_orders DESC
+                LIMIT %s
+            """, params + [limit])
+            items = cursor.fetchall()
+            cursor.close()
+        # MySQL sums integers as DECIMAL
+        for item in items:
+            item['total_orders'] = int(item['total_orders'])
         return items
     
-    def get_category_sales(self):
+    def get_category_sales(self, start_date=None, end_date=None):
         """Get sales by category"""
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT 
-                m.category,
-                SUM(od.subtotal) as category_revenue
-            FROM order_details od
-            JOIN menu m ON od.item_id = m.item_id
-            GROUP BY m.category
-            ORDER BY category_revenue DESC
-        """)
-        sales = cursor.fetchall()
-        cursor.close()
+        return self.cached_analytics(
+            ("category_sales", start_date, end_date),
+            lambda: self._query_category_sales(start_date, end_date)
+        )
+    
+    def _query_category_sales(self, start_date, end_date):
+        where, params = self.date_range_filter("sale_date", start_date, end_date)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT 
+                    category,
+                    SUM(revenue) as category_revenue
+                FROM daily_category_sales
+                WHERE {where}
+                GROUP BY category
+                ORDER BY category_revenue DESC
+            """, params)
+            sales = cursor.fetchall()
+            cursor.close()
+        for sale in sales:
+            sale['category_revenue'] = BillingEngine.round_amount(sale['category_revenue'])
         return sales
+    
+    TIMESERIES_STEPS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+    
+    def get_sales_timeseries(self, start_date=None, end_date=None, bucket='day', category=None):
+        """Get order count, items sold and revenue per hour, day or week
+        
+        Day and week buckets are summed from the daily rollups; hour buckets
+        are grouped from the orders themselves, archived ones included. Weeks start on Monday. With
+        category, only that category's lines count and revenue is their
+        subtotal before tax; otherwise revenue is final_amount. Buckets with
+        no sales are filled with zeros from start_date (or the first sale)
+        through end_date (or the last sale).
+        Returns parallel column lists:
+        {"bucket", "start": [...], "orders": [...], "items_sold": [...], "revenue": [...]}
+        """
+        if bucket not in self.TIMESERIES_STEPS:
+            raise ValueError(f"bucket must be one of {', '.join(self.TIMESERIES_STEPS)}")
+        return self.cached_analytics(
+            ("sales_timeseries", start_date, end_date, bucket, category),
+            lambda: self._query_sales_timeseries(start_date, end_date, bucket, category)
+        )
+    
+    def _query_sales_timeseries(self, start_date, end_date, bucket, category):
+        if bucket == 'hour':
+            # No hourly rollup: regroup the rollup source queries by hour
+            sources = {table: source for table, _, _, source in ROLLUPS}
+            where, params = self.date_range_filter("o.order_date", start_date, end_date)
+            if category is None:
+                source = sources["daily_revenue"]
+            else:
+                source = sources["daily_category_sales"]
+                where += " AND COALESCE(m.category, '') = %s"
+                params.append(category)
+            query = source.replace("DATE(o.order_date)", self.backend.hour_bucket_sql("o.order_date"))
+            query = query.format(where=where)
+        else:
+            where, params = self.date_range_filter("sale_date", start_date, end_date)
+            if category is None:
+                query = f"SELECT sale_date, order_count, items_sold, revenue FROM daily_revenue WHERE {where}"
+            else:
+                query = f"""
+                    SELECT sale_date, category, order_count, quantity, revenue
+                    FROM daily_category_sales
+                    WHERE {where} AND category = %s
+                """
+                params.append(category)
+        
+        def floor(value):
+            if bucket == 'hour':
+                return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+            day = value if isinstance(value, date) else date.fromisoformat(str(value))
+            return day - timedelta(days=day.weekday()) if bucket == 'week' else day
+        
+        # Hour buckets also read the archive, since a rollup keeps archived orders
+        queries = [query, archive_sql(query)] if bucket == 'hour' else [query]
+        totals = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for table_query in queries:
+                cursor.execute(table_query, params)
+                for row in cursor.fetchall():
+                    key, orders, items, revenue = row if category is None else row[:1] + row[2:]
+                    total = totals.setdefault(floor(key), [0, 0, 0])
+                    total[0] += orders or 0
+                    total[1] += int(items or 0)
+                    total[2] += BillingEngine.to_cents(revenue or 0)
+            cursor.close()
+        
+        series = {"bucket": bucket, "start": [], "orders": [], "items_sold": [], "revenue": []}
+        if start_date:
+            first = floor(datetime(start_date.year, start_date.month, start_date.day)
+                          if bucket == 'hour' else start_date)
+        elif totals:
+            first = min(totals)
+        else:
+            return series
+        if end_date:
+            last = floor(datetime(end_date.year, end_date.month, end_date.day, 23)
+                         if bucket == 'hour' else end_date)
+        elif totals:
+            last = max(totals)
+        else:
+            return series
+        
+        step = self.TIMESERIES_STEPS[bucket]
+        empty = (0, 0, 0)
+        current = first
+        while current <= last:
+            orders, items, cents = totals.get(current, empty)
+            series["start"].append(current)
+            series["orders"].append(orders)
+            series["items_sold"].append(items)
+            series["revenue"].append(BillingEngine.from_cents(cents))
+            current += step
+        return series
+
+
+class OrderIntakeService:
+    """Accept orders from many terminals at once and place them on worker threads
+    
+    Orders wait in a bounded queue; when it is full, submit() waits up to
+    timeout seconds and then rejects the order (backpressure). Each worker
+    has its own RestaurantDatabase with its own connection, so every order
+    is still placed in its own transaction by place_order. Orders that fail
+    on a deadlock or lock wait timeout are retried.
+    """
+
+    STOP = object()
+
+    def __init__(self, backend, workers=4, queue_size=100, max_retries=3, db_factory=None):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.db_factory = db_factory or (lambda: RestaurantDatabase(backend=self.backend))
+        self.orders = queue.Queue(maxsize=queue_size)
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._threads = []
+        self._alive = workers  # Workers that have not exited yet
+        self._ready = threading.Barrier(workers + 1)
+        for number in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"order-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        # Wait until every worker has connected
+        self._ready.wait()
+
+    def submit(self, user_id, items, timeout=None):
+        """Queue an order and return a Future that resolves to place_order's result
+        
+        Orders are rejected at once when the service has stopped.
+        """
+        future = Future()
+        with self._lock:
+            stopped = not self._alive
+            if stopped:
+                self.rejected += 1
+        if stopped:
+            future.set_result({"success": False, "message": "Order service has stopped"})
+            return future
+        try:
+            self.orders.put((user_id, items, future), timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            future.set_result({"success": False, "message": "Order queue is full, try again"})
+            return future
+        with self._lock:
+            self.submitted += 1
+            stopped = not self._alive
+        if stopped:
+            # The last worker exited while this order was being queued
+            self._fail_queued("Order service has stopped")
+        return future
+
+    def _fail_queued(self, message):
+        """Resolve every order still in the queue with a failure"""
+        while True:
+            try:
+                job = self.orders.get_nowait()
+            except queue.Empty:
+                return
+            if job is self.STOP:
+                continue
+            _, _, future = job
+            if future.set_running_or_notify_cancel():
+                with self._lock:
+                    self.failed += 1
+                future.set_result({"success": False, "message": message})
+
+    def _worker(self):
+        db = None
+        connected = False
+        error = "Worker could not connect to database"
+        try:
+            db = self.db_factory()
+            connected = db.connect()
+        except Exception as e:
+            # Keep serving so queued orders fail instead of waiting forever
+            error = f"{error}: {e}"
+        finally:
+            self._ready.wait()
+        try:
+            while True:
+                job = self.orders.get()
+                if job is self.STOP:
+                    break
+                user_id, items, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if not connected:
+                    result = {"success": False, "message": error}
+                else:
+                    result = self._place(db, user_id, items)
+                with self._lock:
+                    if result['success']:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                future.set_result(result)
+        finally:
+            if db:
+                db.disconnect()
+            with self._lock:
+                self._alive -= 1
+                last = not self._alive
+            if last:
+                self._fail_queued("Order service has stopped")
+
+    def _place(self, db, user_id, items):
+        """Place one order, retrying transient lock conflicts with backoff"""
+        delay = 0.01
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = db.place_order(user_id, items)
+            except Exception as e:
+                return {"success": False, "message": str(e)}
+            if result['success'] or not result.get('retryable') or attempt == self.max_retries:
+                return result
+            time.sleep(delay)
+            delay *= 2
+        return result
+
+    def stats(self):
+        """Counters and current queue depth"""
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "queued": self.orders.qsize(),
+            }
+
+    def stop(self):
+        """Finish the queued orders and shut the workers down"""
+        for thread in self._threads:
+            if thread.is_alive():
+                self.orders.put(self.STOP)
+        for thread in self._threads:
+            thread.join()
+
+
+class AsyncRestaurantDatabase:
+    """asyncio front end for RestaurantDatabase
+    
+    Calls run on a thread pool with one thread per pooled connection, so
+    the event loop never blocks and any number of coroutines share
+    pool_size threads instead of one thread each. Every call takes a
+    timeout (seconds) and raises asyncio.TimeoutError when it expires.
+    A call that is cancelled or times out before a thread picks it up is
+    never run; one that has already started finishes in the background,
+    so an order is either placed completely or not at all.
+    """
+
+    def __init__(self, pool_size=10, backend=None, default_timeout=None):
+        self.db = RestaurantDatabase(pool_size=pool_size, backend=backend)
+        self.default_timeout = default_timeout
+        self._executor = None
+
+    async def _call(self, method, *args, timeout=None, **kwargs):
+        if self._executor is None:
+            raise Error(msg="Not connected")
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(method, *args, **kwargs))
+        if timeout is None:
+            timeout = self.default_timeout
+        return await asyncio.wait_for(future, timeout)
+
+    async def connect(self, timeout=None):
+        """Open the connection pool"""
+        self._executor = ThreadPoolExecutor(max_workers=self.db.pool_size,
+                                            thread_name_prefix='async-db')
+        if not await self._call(self.db.connect, timeout=timeout):
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            return False
+        return True
+
+    async def disconnect(self):
+        """Refuse new calls, wait for queued and running ones to finish, then close the pool"""
+        executor = self._executor
+        if executor:
+            self._executor = None
+            loop = asyncio.get_running_loop()
+            # Wait on another thread so the event loop keeps running meanwhile
+            await loop.run_in_executor(None, executor.shutdown, True)
+            self.db.disconnect()
+
+    close = disconnect
+
+    async def initialize_database(self, timeout=None):
+        """Create tables if they don't exist and apply pending migrations"""
+        return await self._call(self.db.initialize_database, timeout=timeout)
+
+    def enable_menu_cache(self, ttl=None, version_check_interval=1.0):
+        """Serve menu reads from an in-process cache"""
+        return self.db.enable_menu_cache(ttl, version_check_interval)
+
+    def enable_analytics_cache(self, ttl=30, max_entries=128):
+        """Cache analytics results for ttl seconds"""
+        return self.db.enable_analytics_cache(ttl, max_entries)
+
+    async def register_user(self, name, email, password, phone, timeout=None):
+        """Register a new user"""
+        return await self._call(self.db.register_user, name, email, password, phone, timeout=timeout)
+
+    async def login_user(self, email, password, timeout=None):
+        """Authenticate user"""
+        return await self._call(self.db.login_user, email, password, timeout=timeout)
+
+    async def get_menu(self, category=None, timeout=None):
+        """Get menu items, optionally filtered by category"""
+        return await self._call(self.db.get_menu, category, timeout=timeout)
+
+    async def get_categories(self, timeout=None):
+        """Get all unique categories"""
+        return await self._call(self.db.get_categories, timeout=timeout)
+
+    async def get_item_by_id(self, item_id, timeout=None):
+        """Get menu item by ID"""
+        return await self._call(self.db.get_item_by_id, item_id, timeout=timeout)
+
+    async def place_order(self, user_id, items, timeout=None):
+        """Place a new order"""
+        return await self._call(self.db.place_order, user_id, items, timeout=timeout)
+
+    async def get_user_orders(self, user_id, timeout=None):
+        """Get all orders for a user"""
+        return await self._call(self.db.get_user_orders, user_id, timeout=timeout)
+
+    async def get_orders_page(self, user_id=None, page_size=10, after=None, status=None, timeout=None):
+        """Get one page of orders, newest first"""
+        return await self._call(self.db.get_orders_page, user_id, page_size, after, status,
+                                timeout=timeout)
+
+    async def get_order_details(self, order_id, timeout=None):
+        """Get details of a specific order"""
+        return await self._call(self.db.get_order_details, order_id, timeout=timeout)
+
+    async def update_orders_status(self, order_ids, status, timeout=None):
+        """Move orders to the next status"""
+        return await self._call(self.db.update_orders_status, order_ids, status, timeout=timeout)
+
+    async def claim_orders(self, limit=5, timeout=None):
+        """Claim the oldest Pending orders for a kitchen worker"""
+        return await self._call(self.db.claim_orders, limit, timeout=timeout)
+
+    async def archive_orders(self, older_than_days=None, batch_size=1000, max_batches=None, timeout=None):
+        """Move old orders into the archive tables"""
+        return await self._call(self.db.archive_orders, older_than_days, batch_size, max_batches,
+                                timeout=timeout)
+
+    async def get_total_revenue(self, start_date=None, end_date=None, timeout=None):
+        """Get total revenue"""
+        return await self._call(self.db.get_total_revenue, start_date, end_date, timeout=timeout)
+
+    async def get_popular_items(self, start_date=None, end_date=None, limit=5, timeout=None):
+        """Get most popular items"""
+        return await self._call(self.db.get_popular_items, start_date, end_date, limit,
+                                timeout=timeout)
+
+    async def get_trending_items(self, window='15m', limit=5, timeout=None):
+        """Get the best-selling items of a recent window"""
+        return await self._call(self.db.get_trending_items, window, limit, timeout=timeout)
+
+    async def get_category_sales(self, start_date=None, end_date=None, timeout=None):
+        """Get sales by category"""
+        return await self._call(self.db.get_category_sales, start_date, end_date, timeout=timeout)
+
+    async def get_sales_timeseries(self, start_date=None, end_date=None, bucket='day', category=None,
+                                   timeout=None):
+        """Get sales per hour, day or week"""
+        return await self._call(self.db.get_sales_timeseries, start_date, end_date, bucket, category,
+                                timeout=timeout)
 
 
 # Main execution
@@ -371,6 +3879,12 @@ if __name__ == "__main__":
         # Initialize tables
         db.initialize_database()
         
+        print("\nIndex usage of hot queries:")
+        for check in db.check_query_indexes():
+            mark = "✓" if check['ok'] else "✗"
+            used = ', '.join(check['used_indexes']) or 'full scan'
+            print(f"  {mark} {check['query']:<20} uses {used}")
+        
         print("\nDatabase is ready to use!")
         print("\nYou can now run the client application (client.py)")
         
@@ -0,0 +1,114 @@
+"""Tests for AsyncRestaurantDatabase (SQLite)"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from main import AsyncRestaurantDatabase, Error, SQLiteBackend
+
+
+class AsyncRestaurantDatabaseTests(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.adb = AsyncRestaurantDatabase(pool_size=2, backend=SQLiteBackend(os.path.join(self.temp_dir, 'a.db')))
+        self.assertTrue(await self.adb.connect())
+        await self.adb.initialize_database()
+        self.user_id = (await self.adb.register_user("Asha", "asha@example.com", "secret", "1"))['user_id']
+        self.naan = self.adb.db.add_menu_item("Naan", "Breads", 40)['item_id']
+
+    async def asyncTearDown(self):
+        await self.adb.close()
+
+    def slow_get_menu(self, seconds, started=None, finished=None):
+        """Replace get_menu with a version that holds its connection for seconds"""
+        get_menu = type(self.adb.db).get_menu
+
+        def slow(category=None):
+            with self.adb.db.get_connection():
+                if started:
+                    started.set()
+                time.sleep(seconds)
+            result = get_menu(self.adb.db, category)
+            if finished is not None:
+                finished.append(threading.current_thread().name)
+            return result
+
+        self.adb.db.get_menu = slow
+
+    def idle_connections(self):
+        return len(self.adb.db.pool._idle)
+
+    async def test_calls_return_the_same_results_as_the_sync_api(self):
+        result = await self.adb.place_order(self.user_id, [{"item_id": self.naan, "quantity": 2}])
+        self.assertTrue(result['success'])
+        details = await self.adb.get_order_details(result['order_id'])
+        self.assertEqual(details['items'][0]['quantity'], 2)
+        self.assertEqual([item['name'] for item in await self.adb.get_menu()], ["Naan"])
+
+    async def test_concurrent_calls_share_pool_size_threads(self):
+        threads = []
+        self.slow_get_menu(0.02, finished=threads)
+        results = await asyncio.gather(*(self.adb.get_menu() for _ in range(12)))
+        self.assertEqual(len(results), 12)
+        self.assertLessEqual(len(set(threads)), 2)
+        self.assertTrue(all(name.startswith('async-db') for name in threads))
+        self.assertLessEqual(self.adb.db.pool._created, 2)
+
+    async def test_timed_out_call_returns_its_connection(self):
+        finished = []
+        self.slow_get_menu(0.2, finished=finished)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.adb.get_menu(timeout=0.05)
+        # The call finishes in the background and gives its connection back
+        deadline = time.monotonic() + 5
+        while not finished and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        self.assertEqual(len(finished), 1)
+        self.assertEqual(self.idle_connections(), self.adb.db.pool._created)
+        del self.adb.db.get_menu
+        self.assertEqual(len(await self.adb.get_menu()), 1)
+
+    async def test_cancelled_call_returns_its_connection(self):
+        started = threading.Event()
+        finished = []
+        self.slow_get_menu(0.2, started=started, finished=finished)
+        task = asyncio.create_task(self.adb.get_menu())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        deadline = time.monotonic() + 5
+        while not finished and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        self.assertEqual(self.idle_connections(), self.adb.db.pool._created)
+
+    async def test_call_that_times_out_in_the_queue_never_runs(self):
+        started = threading.Event()
+        self.slow_get_menu(0.3, started=started)
+        # Both threads are busy, so a third call waits in the queue
+        busy = [asyncio.create_task(self.adb.get_menu()) for _ in range(2)]
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.adb.place_order(self.user_id, [{"item_id": self.naan, "quantity": 1}], timeout=0.05)
+        await asyncio.gather(*busy)
+        self.assertEqual(await self.adb.get_user_orders(self.user_id), [])
+
+    async def test_close_waits_for_in_flight_calls(self):
+        finished = []
+        self.slow_get_menu(0.2, finished=finished)
+        calls = [asyncio.create_task(self.adb.get_menu()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        await self.adb.close()
+        self.assertEqual(len(finished), 3)
+        self.assertEqual([len(menu) for menu in await asyncio.gather(*calls)], [1, 1, 1])
+        with self.assertRaises(Error):
+            await self.adb.get_menu()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Tests for ConnectionPool and pooled RestaurantDatabase connections (SQLite)"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from main import ConnectionPool, Error, RestaurantDatabase, SQLiteBackend
+
+
+class ConnectionPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.backend = SQLiteBackend(os.path.join(self.temp_dir, 'pool.db'))
+
+    def make_pool(self, pool_size=2, **kwargs):
+        pool = ConnectionPool(self.backend, pool_size, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool()
+        first = pool.checkout()
+        pool.checkin(first)
+        self.assertIs(pool.checkout(), first)
+
+    def test_exhausted_pool_times_out(self):
+        pool = self.make_pool(pool_size=1, checkout_timeout=0.1)
+        pool.checkout()
+        start = time.monotonic()
+        with self.assertRaises(Error):
+            pool.checkout()
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_waiting_checkout_gets_a_returned_connection(self):
+        pool = self.make_pool(pool_size=1, checkout_timeout=5)
+        connection = pool.checkout()
+        threading.Timer(0.05, pool.checkin, [connection]).start()
+        self.assertIs(pool.checkout(), connection)
+
+    def test_discard_wakes_a_waiting_checkout(self):
+        pool = self.make_pool(pool_size=1, checkout_timeout=5)
+        connection = pool.checkout()
+        threading.Timer(0.05, pool.discard, [connection]).start()
+        start = time.monotonic()
+        replacement = pool.checkout()
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIsNot(replacement, connection)
+        self.assertTrue(replacement.is_connected())
+        self.assertFalse(connection.is_connected())
+
+    def test_close_fails_waiting_checkouts(self):
+        pool = self.make_pool(pool_size=1, checkout_timeout=5)
+        pool.checkout()
+        threading.Timer(0.05, pool.close).start()
+        start = time.monotonic()
+        with self.assertRaises(Error):
+            pool.checkout()
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_checkin_rolls_back_uncommitted_work(self):
+        pool = self.make_pool(pool_size=1)
+        connection = pool.checkout()
+        cursor = connection.cursor()
+        cursor.execute("CREATE TABLE notes (note VARCHAR(20))")
+        connection.commit()
+        cursor.execute("INSERT INTO notes (note) VALUES (%s)", ("uncommitted",))
+        cursor.close()
+        self.assertTrue(connection.in_transaction)
+        pool.checkin(connection)
+
+        connection = pool.checkout()
+        self.assertFalse(connection.in_transaction)
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM notes")
+        self.assertEqual(cursor.fetchone()[0], 0)
+        cursor.close()
+
+    def test_stale_connection_is_replaced_on_checkout(self):
+        pool = self.make_pool(pool_size=1, health_check_interval=0)
+        pings = []
+
+        def ping(connection):
+            pings.append(connection)
+            raise Error(msg="Lost connection to server")
+
+        self.backend.ping = ping
+        first = pool.checkout()
+        pool.checkin(first)
+        second = pool.checkout()
+        self.assertEqual(pings, [first])
+        self.assertIsNot(second, first)
+
+
+class PooledDatabaseTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.db = RestaurantDatabase(pool_size=1, backend=SQLiteBackend(os.path.join(self.temp_dir, 'db.db')))
+        self.assertTrue(self.db.connect())
+        self.addCleanup(self.db.disconnect)
+        self.db.initialize_database()
+        self.db.add_menu_item("Naan", "Breads", 40)
+
+    def test_dead_connection_is_replaced(self):
+        connection = self.db.pool.checkout()
+        self.db.pool.checkin(connection)
+        # Simulate the server dropping the socket while the connection is idle
+        connection._connection.close()
+
+        with self.assertRaises(Error):
+            self.db.get_menu()
+        self.assertEqual([item['name'] for item in self.db.get_menu()], ["Naan"])
+        self.assertEqual([item['name'] for item in self.db.get_menu()], ["Naan"])
+        self.assertEqual(self.db.pool._created, 1)
+
+    def test_failed_query_keeps_a_live_connection(self):
+        connection = self.db.pool.checkout()
+        self.db.pool.checkin(connection)
+        with self.assertRaises(Error):
+            with self.db.get_connection() as conn:
+                conn.cursor().execute("SELECT no_such_column FROM menu")
+        self.assertIs(self.db.pool.checkout(), connection)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Tests for GroupCommitter and place_orders_batch (SQLite)"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from main import Error, RestaurantDatabase, SQLiteBackend
+
+
+class FlakyCommitBackend(SQLiteBackend):
+    """SQLite backend whose connections fail the next queued commits"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.commit_errors = []
+
+    def connect(self):
+        connection = super().connect()
+        commit = connection.commit
+
+        def flaky_commit():
+            if self.commit_errors:
+                raise self.commit_errors.pop(0)
+            commit()
+
+        connection.commit = flaky_commit
+        return connection
+
+
+class GroupCommitTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.backend = FlakyCommitBackend(os.path.join(self.temp_dir, 'group.db'))
+        self.db = RestaurantDatabase(pool_size=2, backend=self.backend)
+        self.assertTrue(self.db.connect())
+        self.addCleanup(self.db.disconnect)
+        self.db.initialize_database()
+        self.user_id = self.db.register_user("Asha", "asha@example.com", "secret", "1")['user_id']
+        self.naan = self.db.add_menu_item("Naan", "Breads", 40)['item_id']
+        self.dal = self.db.add_menu_item("Dal Makhani", "Main Course", 220)['item_id']
+        self.db.set_item_availability(self.dal, False)
+
+    def mixed_batch(self):
+        """Two good orders, one for an unavailable item and one for an unknown item"""
+        return [
+            (self.user_id, [{"item_id": self.naan, "quantity": 1}]),
+            (self.user_id, [{"item_id": self.dal, "quantity": 1}]),
+            (self.user_id, [{"item_id": self.naan, "quantity": 2}]),
+            (self.user_id, [{"item_id": 999999, "quantity": 1}]),
+        ]
+
+    def submit_batch(self, orders):
+        committer = self.db.enable_group_commit(max_batch=len(orders), max_wait_ms=1000)
+        futures = [committer.submit(user_id, items) for user_id, items in orders]
+        results = [future.result(timeout=30) for future in futures]
+        stats = committer.stats()
+        self.db.disable_group_commit()
+        return results, stats
+
+    def placed_quantities(self):
+        return sorted(line['quantity']
+                      for order in self.db.get_user_orders(self.user_id)
+                      for line in self.db.get_order_details(order['order_id'])['items'])
+
+    def test_bad_orders_fail_alone(self):
+        results, stats = self.submit_batch(self.mixed_batch())
+        self.assertEqual([result['success'] for result in results], [True, False, True, False])
+        self.assertEqual((stats['batches'], stats['orders']), (1, 4))
+        self.assertEqual(self.placed_quantities(), [1, 2])
+        self.assertEqual(self.db.check_rollups(), [])
+
+    def test_deadlocked_commit_is_retried(self):
+        self.backend.commit_errors.append(Error(msg="Deadlock found when trying to get lock", errno=1213))
+        results, stats = self.submit_batch(self.mixed_batch())
+        self.assertEqual([result['success'] for result in results], [True, False, True, False])
+        self.assertEqual(stats['batches'], 1)
+        self.assertEqual(self.placed_quantities(), [1, 2])
+        self.assertEqual(self.db.check_rollups(), [])
+
+    def test_failed_commit_fails_the_whole_batch(self):
+        self.backend.commit_errors.append(Error(msg="Disk full"))
+        results, _ = self.submit_batch(self.mixed_batch())
+        self.assertEqual([result['success'] for result in results], [False] * 4)
+        self.assertFalse(any(result['retryable'] for result in results))
+        self.assertEqual(self.placed_quantities(), [])
+        self.assertEqual(self.db.check_rollups(), [])
+
+    def test_lost_transaction_retries_the_remaining_orders(self):
+        insert_order = self.db._insert_order
+        calls = []
+
+        def deadlock_once(cursor, user_id, items):
+            calls.append(items)
+            if len(calls) == 3:
+                # MySQL rolls back the whole transaction on a deadlock
+                raise Error(msg="Deadlock found when trying to get lock", errno=1213)
+            return insert_order(cursor, user_id, items)
+
+        self.db._insert_order = deadlock_once
+        results = self.db.place_orders_batch(self.mixed_batch())
+        self.assertEqual([result['success'] for result in results], [True, False, True, False])
+        self.assertEqual(len(calls), 3 + 4)
+        self.assertEqual(self.placed_quantities(), [1, 2])
+        self.assertEqual(self.db.check_rollups(), [])
+
+    def test_repeated_deadlocks_are_reported_as_retryable(self):
+        self.backend.commit_errors.extend(
+            Error(msg="Deadlock found when trying to get lock", errno=1213) for _ in range(3))
+        results = self.db.place_orders_batch(self.mixed_batch(), max_retries=2)
+        self.assertEqual([result['success'] for result in results], [False] * 4)
+        self.assertTrue(all(result['retryable'] for result in results))
+        self.assertEqual(self.placed_quantities(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
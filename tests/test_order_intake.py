@@ -0,0 +1,83 @@
+"""Tests for OrderIntakeService (SQLite)"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from main import Error, OrderIntakeService, RestaurantDatabase, SQLiteBackend
+
+
+class OrderIntakeServiceTests(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.backend = SQLiteBackend(os.path.join(self.temp_dir, 'intake.db'))
+        self.db = RestaurantDatabase(backend=self.backend)
+        self.assertTrue(self.db.connect())
+        self.addCleanup(self.db.disconnect)
+        self.db.initialize_database()
+        self.user_id = self.db.register_user("Asha", "asha@example.com", "secret", "1")['user_id']
+        self.naan = self.db.add_menu_item("Naan", "Breads", 40)['item_id']
+
+    def make_service(self, **kwargs):
+        service = OrderIntakeService(self.backend, **kwargs)
+        self.addCleanup(service.stop)
+        return service
+
+    def test_each_future_gets_its_own_order(self):
+        service = self.make_service(workers=4)
+        futures = [service.submit(self.user_id, [{"item_id": self.naan, "quantity": quantity}])
+                   for quantity in range(1, 31)]
+        for quantity, future in enumerate(futures, start=1):
+            result = future.result(timeout=30)
+            self.assertTrue(result['success'], result['message'])
+            details = self.db.get_order_details(result['order_id'])
+            self.assertEqual([line['quantity'] for line in details['items']], [quantity])
+        self.assertEqual(len({future.result()['order_id'] for future in futures}), 30)
+
+    def test_one_worker_places_orders_in_submission_order(self):
+        service = self.make_service(workers=1)
+        futures = [service.submit(self.user_id, [{"item_id": self.naan, "quantity": 1}]) for _ in range(10)]
+        order_ids = [future.result(timeout=30)['order_id'] for future in futures]
+        self.assertEqual(order_ids, sorted(order_ids))
+
+    def test_stop_drains_the_queue(self):
+        service = self.make_service(workers=2, queue_size=50)
+        futures = [service.submit(self.user_id, [{"item_id": self.naan, "quantity": 1}]) for _ in range(20)]
+        service.stop()
+        self.assertTrue(all(future.done() and future.result()['success'] for future in futures))
+        stats = service.stats()
+        self.assertEqual((stats['submitted'], stats['completed'], stats['queued']), (20, 20, 0))
+
+        late = service.submit(self.user_id, [{"item_id": self.naan, "quantity": 1}])
+        self.assertFalse(late.result(timeout=1)['success'])
+        self.assertEqual(service.stats()['rejected'], 1)
+
+    def test_failed_orders_are_reported(self):
+        service = self.make_service(workers=2)
+        result = service.submit(self.user_id, [{"item_id": 999999, "quantity": 1}]).result(timeout=30)
+        self.assertFalse(result['success'])
+        self.assertEqual(service.stats()['failed'], 1)
+
+    def test_workers_that_cannot_start_fail_orders_instead_of_hanging(self):
+        def broken_factory():
+            raise Error(msg="Access denied")
+
+        service = self.make_service(workers=2, db_factory=broken_factory)
+        futures = [service.submit(self.user_id, [{"item_id": self.naan, "quantity": 1}]) for _ in range(5)]
+        for future in futures:
+            result = future.result(timeout=5)
+            self.assertFalse(result['success'])
+            self.assertIn("Access denied", result['message'])
+
+    def test_workers_that_cannot_connect_fail_orders(self):
+        backend = SQLiteBackend(os.path.join(self.temp_dir, 'missing', 'intake.db'))
+        service = self.make_service(workers=1, db_factory=lambda: RestaurantDatabase(backend=backend))
+        result = service.submit(self.user_id, [{"item_id": self.naan, "quantity": 1}]).result(timeout=5)
+        self.assertFalse(result['success'])
+        self.assertEqual(service.stats()['failed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,898 @@
+"""Conformance tests for RestaurantDatabase
+
+Every test runs against SQLiteBackend on a temporary file. The same tests
+run against MySQL when RESTAURANT_TEST_MYSQL_DATABASE names a scratch
+database (its tables are dropped before every test); RESTAURANT_TEST_MYSQL_HOST,
+_USER and _PASSWORD default to localhost, root and an empty password.
+
+Run from the project folder with:  python -m pytest   (or python -m unittest discover tests)
+"""
+import csv
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import main
+from main import (BillingEngine, INDEX_CHECKS, LATEST_SCHEMA_VERSION, MenuItem, Order,
+                  OrderLine, RestaurantDatabase, SQLiteBackend, MySQLBackend)
+
+
+MYSQL_CONFIG = None
+if os.environ.get('RESTAURANT_TEST_MYSQL_DATABASE'):
+    MYSQL_CONFIG = {
+        'host': os.environ.get('RESTAURANT_TEST_MYSQL_HOST', 'localhost'),
+        'user': os.environ.get('RESTAURANT_TEST_MYSQL_USER', 'root'),
+        'password': os.environ.get('RESTAURANT_TEST_MYSQL_PASSWORD', ''),
+        'database': os.environ['RESTAURANT_TEST_MYSQL_DATABASE']
+    }
+
+# Every table the schema creates, children first
+TABLES = ['cart_items', 'order_details_archive', 'orders_archive', 'order_details', 'orders',
+          'daily_category_sales', 'daily_item_sales', 'daily_revenue',
+          'menu_version', 'menu', 'users', 'schema_version']
+
+MENU = [
+    ("Paneer Tikka", "Starters", Decimal('180.00'), True),
+    ("Butter Chicken", "Main Course", Decimal('320.00'), True),
+    ("Garlic Naan", "Breads", Decimal('45.50'), True),
+    ("Mango Lassi", "Beverages", Decimal('79.99'), True),
+    ("Gulab Jamun", "Desserts", Decimal('60.00'), False),
+]
+
+
+class DatabaseTests:
+    """Tests shared by every backend; subclasses provide make_backend()"""
+
+    def make_backend(self):
+        raise NotImplementedError
+
+    def reset_database(self):
+        """Start from an empty database"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.db = self.make_db()
+        self.reset_database()
+        self.db.initialize_database()
+
+        self.user_id = self.db.register_user("Asha", "asha@example.com", "secret", "9876543210")['user_id']
+        self.other_user_id = self.db.register_user("Ravi", "ravi@example.com", "secret", "9876500000")['user_id']
+        self.items = {}
+        for name, category, price, availability in MENU:
+            self.items[name] = self.db.add_menu_item(name, category, price, availability)['item_id']
+
+    def make_db(self, **kwargs):
+        """A connected RestaurantDatabase on this test's database"""
+        db = RestaurantDatabase(backend=self.make_backend(), **kwargs)
+        self.assertTrue(db.connect())
+        self.addCleanup(db.disconnect)
+        return db
+
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def execute(self, query, params=()):
+        """Run one statement outside the API and commit it"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall() if query.lstrip().upper().startswith('SELECT') else None
+            conn.commit()
+            cursor.close()
+        return rows
+
+    def order(self, user_id=None, **quantities):
+        """Place an order from item name keywords, e.g. order(Paneer_Tikka=2)"""
+        items = [{"item_id": self.items[name.replace('_', ' ')], "quantity": quantity}
+                 for name, quantity in quantities.items()]
+        result = self.db.place_order(user_id or self.user_id, items)
+        self.assertTrue(result['success'], result['message'])
+        return result['order_id']
+
+    def place_orders(self, count):
+        return [self.order(Paneer_Tikka=1 + n % 3, Garlic_Naan=1) for n in range(count)]
+
+    def archive_everything(self):
+        # A negative age puts the cutoff in the future, so every order qualifies
+        result = self.db.archive_orders(older_than_days=-1)
+        self.assertTrue(result['success'], result['message'])
+        return result
+
+    # SCHEMA
+
+    def test_schema_is_current_and_migrations_are_idempotent(self):
+        self.assertEqual(self.db.get_schema_version(), LATEST_SCHEMA_VERSION)
+        self.assertEqual(self.db.migrate(), [])
+        self.assertFalse(self.db.initialize_database())
+
+    def test_check_query_indexes_reports_every_hot_query(self):
+        self.place_orders(3)
+        results = self.db.check_query_indexes()
+        self.assertEqual([check['query'] for check in results], [name for name, _, _, _ in INDEX_CHECKS])
+        if isinstance(self.db.backend, SQLiteBackend):
+            # MySQL may prefer a full scan on tables this small
+            self.assertEqual([check['query'] for check in results if not check['ok']], [])
+
+    # CONNECTIONS AND ROWS
+
+    def test_connect_and_disconnect(self):
+        db = self.make_db()
+        self.assertIsNotNone(db.connection)
+        db.disconnect()
+        self.assertIsNone(db.connection)
+
+        pooled = self.make_db(pool_size=2)
+        self.assertIsNotNone(pooled.pool)
+        self.assertEqual(len(pooled.get_menu()), 4)
+
+    def test_database_now_is_a_datetime(self):
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            now = self.db.database_now(cursor)
+            cursor.close()
+        self.assertIsInstance(now, datetime)
+
+    def test_row_cursor_and_fetch_rows(self):
+        db = self.make_db(row_format='objects')
+        with db.get_connection() as conn:
+            cursor = db.row_cursor(conn)
+            cursor.execute(f"SELECT {MenuItem.columns()} FROM menu ORDER BY item_id", ())
+            first = db.fetch_rows(cursor, MenuItem, 2)
+            rest = db.fetch_rows(cursor, MenuItem)
+            cursor.close()
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(rest), 3)
+        self.assertIsInstance(first[0], MenuItem)
+        self.assertEqual(first[0]['name'], "Paneer Tikka")
+        self.assertEqual(first[0].price, Decimal('180.00'))
+
+    def test_row_objects_compare_equal_to_dict_rows(self):
+        order_id = self.order(Paneer_Tikka=1)
+        objects = self.make_db(row_format='objects')
+        self.assertEqual(objects.get_menu(), self.db.get_menu())
+        details = objects.get_order_details(order_id)
+        self.assertIsInstance(details['order'], Order)
+        self.assertIsInstance(details['items'][0], OrderLine)
+        expected = self.db.get_order_details(order_id)
+        self.assertEqual(details['items'], expected['items'])
+        self.assertEqual({column: details['order'][column] for column in Order.COLUMNS}, expected['order'])
+
+    def test_iter_rows_reads_in_chunks(self):
+        order_ids = self.place_orders(5)
+        rows = list(self.db.iter_rows(f"SELECT {Order.columns()} FROM orders ORDER BY order_id", (),
+                                      Order, chunk_size=2))
+        self.assertEqual([row['order_id'] for row in rows], order_ids)
+
+    # USERS
+
+    def test_register_and_login(self):
+        self.assertEqual(self.db.hash_password("secret"), self.db.hash_password("secret"))
+        self.assertNotEqual(self.db.hash_password("secret"), "secret")
+
+        duplicate = self.db.register_user("Asha", "asha@example.com", "other", "1")
+        self.assertFalse(duplicate['success'])
+
+        login = self.db.login_user("asha@example.com", "secret")
+        self.assertTrue(login['success'])
+        self.assertEqual(login['user']['user_id'], self.user_id)
+        self.assertFalse(self.db.login_user("asha@example.com", "wrong")['success'])
+
+    # MENU
+
+    def test_menu_reads(self):
+        names = {item['name'] for item in self.db.get_menu()}
+        self.assertEqual(names, {name for name, _, _, available in MENU if available})
+        self.assertEqual([item['name'] for item in self.db.get_menu("Breads")], ["Garlic Naan"])
+        self.assertEqual(set(self.db.get_categories()), {category for _, category, _, _ in MENU})
+
+        item = self.db.get_item_by_id(self.items["Mango Lassi"])
+        self.assertEqual((item['name'], item['price']), ("Mango Lassi", Decimal('79.99')))
+        self.assertIsNone(self.db.get_item_by_id(999999))
+
+    def test_menu_writes(self):
+        self.assertFalse(self.db.add_menu_item("Garlic Naan", "Breads", 50)['success'])
+
+        self.assertTrue(self.db.set_item_availability(self.items["Gulab Jamun"], True)['success'])
+        self.assertIn("Gulab Jamun", [item['name'] for item in self.db.get_menu("Desserts")])
+        self.assertFalse(self.db.set_item_availability(999999, True)['success'])
+
+    def test_bump_menu_version(self):
+        before = self.execute("SELECT version FROM menu_version WHERE id = 1")[0][0]
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            self.db.bump_menu_version(cursor)
+            conn.commit()
+            cursor.close()
+        self.assertEqual(self.execute("SELECT version FROM menu_version WHERE id = 1")[0][0], before + 1)
+
+    def test_menu_cache_follows_menu_changes(self):
+        self.db.enable_menu_cache(version_check_interval=0)
+        self.assertEqual(len(self.db.get_menu()), 4)
+
+        item_id = self.db.add_menu_item("Veg Biryani", "Main Course", Decimal('240.00'))['item_id']
+        self.assertEqual(self.db.get_item_by_id(item_id)['name'], "Veg Biryani")
+        self.assertEqual(len(self.db.get_menu("Main Course")), 2)
+
+        # A change made by another process is picked up through menu_version
+        self.make_db().set_item_availability(item_id, False)
+        self.assertEqual(len(self.db.get_menu("Main Course")), 1)
+        self.assertEqual(set(self.db.get_categories()), {category for _, category, _, _ in MENU})
+
+        # Orders are priced from the cache while the version is unchanged
+        self.assertEqual(self.db.place_order(self.user_id, [{"item_id": item_id, "quantity": 1}])['success'],
+                         False)
+
+    def test_search_menu(self):
+        self.assertEqual([item['name'] for item in self.db.search_menu("naan")], ["Garlic Naan"])
+        self.assertEqual([item['name'] for item in self.db.search_menu("panner")], ["Paneer Tikka"])
+        self.assertEqual([item['name'] for item in self.db.search_menu("butt")], ["Butter Chicken"])
+        self.assertEqual(self.db.search_menu("gulab"), [])
+
+        # The index follows changes made through this object
+        self.db.set_item_availability(self.items["Gulab Jamun"], True)
+        self.assertEqual([item['name'] for item in self.db.search_menu("gulab")], ["Gulab Jamun"])
+
+        # and enable_menu_search rebuilds it from the database
+        self.make_db().set_item_availability(self.items["Garlic Naan"], False)
+        self.db.enable_menu_search()
+        self.assertEqual(self.db.search_menu("naan"), [])
+
+    # ORDERS
+
+    def test_place_order_prices_exactly_and_keeps_rollups_in_step(self):
+        result = self.db.place_order(self.user_id, [
+            {"item_id": self.items["Paneer Tikka"], "quantity": 2},
+            {"item_id": self.items["Garlic Naan"], "quantity": 1},
+        ])
+        self.assertTrue(result['success'])
+        # 405.50 + 5% tax (20.275, rounded up to the cent)
+        self.assertEqual((result['total'], result['tax'], result['final_amount']),
+                         (Decimal('405.50'), Decimal('20.28'), Decimal('425.78')))
+        self.order(self.other_user_id, Mango_Lassi=3, Butter_Chicken=1)
+
+        self.assertEqual(self.db.check_rollups(), [])
+        self.assertEqual(self.db.get_total_revenue(), Decimal('425.78') + Decimal('587.97'))
+        self.assertEqual(self.db.get_total_revenue(end_date=date.today() - timedelta(days=2)), Decimal('0.00'))
+
+        popular = self.db.get_popular_items()
+        self.assertEqual(popular[0], {"name": "Mango Lassi", "total_orders": 3})
+        self.assertEqual({item['name']: item['total_orders'] for item in popular},
+                         {"Mango Lassi": 3, "Paneer Tikka": 2, "Garlic Naan": 1, "Butter Chicken": 1})
+
+        sales = {sale['category']: sale['category_revenue'] for sale in self.db.get_category_sales()}
+        self.assertEqual(sales, {"Starters": Decimal('360.00'), "Breads": Decimal('45.50'),
+                                 "Beverages": Decimal('239.97'), "Main Course": Decimal('320.00')})
+
+    def test_place_order_rejects_bad_orders_without_writing(self):
+        self.assertFalse(self.db.place_order(self.user_id, [])['success'])
+        result = self.db.place_order(self.user_id, [
+            {"item_id": self.items["Paneer Tikka"], "quantity": 1},
+            {"item_id": self.items["Gulab Jamun"], "quantity": 1},
+        ])
+        self.assertFalse(result['success'])
+        self.assertEqual(self.db.get_user_orders(self.user_id), [])
+        self.assertEqual(self.db.get_total_revenue(), Decimal('0.00'))
+
+    def test_place_orders_batch_isolates_failed_orders(self):
+        results = self.db.place_orders_batch([
+            (self.user_id, [{"item_id": self.items["Paneer Tikka"], "quantity": 1}]),
+            (self.user_id, [{"item_id": self.items["Gulab Jamun"], "quantity": 1}]),
+            (self.other_user_id, [{"item_id": self.items["Garlic Naan"], "quantity": 2}]),
+        ])
+        self.assertEqual([result['success'] for result in results], [True, False, True])
+        self.assertEqual(self.db.place_orders_batch([]), [])
+
+        stored = {order['order_id'] for order in self.db.iter_orders()}
+        self.assertEqual(stored, {results[0]['order_id'], results[2]['order_id']})
+        self.assertEqual(self.db.check_rollups(), [])
+        self.assertEqual(self.db.get_total_revenue(), results[0]['final_amount'] + results[2]['final_amount'])
+
+    def test_add_order_to_rollups(self):
+        # An order written outside place_order is missing from the rollups until added
+        self.execute("INSERT INTO orders (user_id, total_amount, tax_amount, final_amount) "
+                     "VALUES (%s, %s, %s, %s)", (self.user_id, Decimal('45.50'), Decimal('2.28'), Decimal('47.78')))
+        order_id = self.execute("SELECT MAX(order_id) FROM orders")[0][0]
+        self.execute("INSERT INTO order_details (order_id, item_id, quantity, price, subtotal) "
+                     "VALUES (%s, %s, 1, %s, %s)",
+                     (order_id, self.items["Garlic Naan"], Decimal('45.50'), Decimal('45.50')))
+        self.assertNotEqual(self.db.check_rollups(), [])
+
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            self.db.add_order_to_rollups(cursor, order_id)
+            conn.commit()
+            cursor.close()
+        self.assertEqual(self.db.check_rollups(), [])
+        self.assertEqual(self.db.get_total_revenue(), Decimal('47.78'))
+
+    def test_rebuild_rollups_repairs_drift(self):
+        self.place_orders(3)
+        total = self.db.get_total_revenue()
+        self.execute("UPDATE daily_revenue SET revenue = 0, order_count = 0")
+        self.execute("DELETE FROM daily_item_sales")
+        mismatches = self.db.check_rollups()
+        self.assertEqual({mismatch['table'] for mismatch in mismatches}, {"daily_revenue", "daily_item_sales"})
+
+        self.db.rebuild_rollups()
+        self.assertEqual(self.db.check_rollups(), [])
+        self.assertEqual(self.db.get_total_revenue(), total)
+
+        today = self.execute("SELECT MAX(order_date) FROM orders")[0][0]
+        today = today if isinstance(today, datetime) else datetime.fromisoformat(today)
+        self.db.rebuild_rollups(today.date(), today.date())
+        self.assertEqual(self.db.check_rollups(today.date(), today.date()), [])
+
+    def test_rollup_rows_by_key_sums_duplicate_keys(self):
+        rows = [(date(2024, 1, 1), 1, Decimal('10.10')), ("2024-01-01", 2, 5.2), ("2024-01-02", 1, None)]
+        self.assertEqual(self.db.rollup_rows_by_key(rows, 1),
+                         {("2024-01-01",): (3.0, 15.3), ("2024-01-02",): (1.0, 0.0)})
+
+    def test_user_orders_and_order_details(self):
+        first = self.order(Paneer_Tikka=2)
+        second = self.order(Mango_Lassi=1)
+        self.order(self.other_user_id, Garlic_Naan=1)
+
+        orders = self.db.get_user_orders(self.user_id)
+        self.assertEqual({order['order_id'] for order in orders}, {first, second})
+        items = {order['order_id']: order['items'] for order in orders}
+        self.assertEqual(items[first], "Paneer Tikka x2")
+
+        details = self.db.get_order_details(first)
+        self.assertEqual(details['order']['final_amount'], Decimal('378.00'))
+        self.assertEqual([(line['item_name'], line['quantity'], line['subtotal']) for line in details['items']],
+                         [("Paneer Tikka", 2, Decimal('360.00'))])
+        self.assertIsNone(self.db.get_order_details(999999))
+
+    def test_iter_orders_and_order_lines(self):
+        order_ids = self.place_orders(4)
+        self.order(self.other_user_id, Butter_Chicken=1)
+
+        streamed = [order['order_id'] for order in self.db.iter_orders(self.user_id, chunk_size=3)]
+        self.assertEqual(streamed, sorted(order_ids, reverse=True))
+        self.assertEqual(len(list(self.db.iter_orders(status='Pending'))), 5)
+        self.assertEqual(list(self.db.iter_orders(status='Delivered')), [])
+
+        lines = list(self.db.iter_order_lines(date.today() - timedelta(days=1), date.today() + timedelta(days=1),
+                                              chunk_size=2))
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(sum(line['quantity'] for line in lines if line['item_name'] == "Garlic Naan"), 4)
+
+    def test_orders_page_cursor_walks_every_order_once(self):
+        order_ids = self.place_orders(7)
+        self.order(self.other_user_id, Mango_Lassi=1)
+
+        seen = []
+        after = None
+        pages = 0
+        while True:
+            page = self.db.get_orders_page(self.user_id, page_size=3, after=after)
+            self.assertLessEqual(len(page['orders']), 3)
+            seen.extend(order['order_id'] for order in page['orders'])
+            pages += 1
+            after = page['next_cursor']
+            if after is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, sorted(order_ids, reverse=True))
+
+        first = self.db.get_orders_page(page_size=2)['orders'][0]
+        self.assertEqual((first['customer_name'], first['items']), ("Ravi", "Mango Lassi x1"))
+        self.assertEqual(self.db.get_orders_page(status='Ready')['orders'], [])
+        self.assertIsNone(self.db.get_orders_page(page_size=len(order_ids) + 1)['next_cursor'])
+
+    # ARCHIVAL
+
+    def test_archived_orders_are_still_found(self):
+        archived_ids = self.place_orders(5)
+        revenue = self.db.get_total_revenue()
+        series = self.db.get_sales_timeseries(bucket='hour')
+        result = self.archive_everything()
+        self.assertEqual((result['archived'], result['done']), (5, True))
+        self.assertEqual(self.execute("SELECT COUNT(*) FROM orders")[0][0], 0)
+
+        # Rollups keep archived orders and still match a recompute
+        self.assertEqual(self.db.check_rollups(), [])
+        self.assertEqual(self.db.get_total_revenue(), revenue)
+        self.assertEqual(self.db.get_sales_timeseries(bucket='hour'), series)
+        self.db.rebuild_rollups()
+        self.assertEqual(self.db.get_total_revenue(), revenue)
+
+        details = self.db.get_order_details(archived_ids[0])
+        self.assertEqual(details['order']['order_id'], archived_ids[0])
+        self.assertEqual([line['item_name'] for line in details['items']], ["Paneer Tikka", "Garlic Naan"])
+
+        hot_ids = self.place_orders(2)
+        self.assertEqual([order['order_id'] for order in self.db.get_user_orders(self.user_id)],
+                         sorted(hot_ids, reverse=True) + sorted(archived_ids, reverse=True))
+        self.assertEqual(self.db.check_rollups(), [])
+
+        # Pages run from the hot table into the archive without gaps or repeats
+        seen = []
+        after = None
+        while True:
+            page = self.db.get_orders_page(self.user_id, page_size=3, after=after)
+            seen.extend(order['order_id'] for order in page['orders'])
+            self.assertTrue(all(order['items'] for order in page['orders']))
+            after = page['next_cursor']
+            if after is None:
+                break
+        self.assertEqual(seen, sorted(hot_ids, reverse=True) + sorted(archived_ids, reverse=True))
+
+    def test_archived_orders_newer_than_hot_orders_are_not_skipped(self):
+        archived_ids = self.place_orders(3)
+        self.archive_everything()
+        # e.g. a back-dated order written after the archive run
+        backdated = self.order(Mango_Lassi=1)
+        self.execute("UPDATE orders SET order_date = %s WHERE order_id = %s",
+                     (datetime(2000, 1, 1), backdated))
+        expected = sorted(archived_ids, reverse=True) + [backdated]
+
+        seen = []
+        after = None
+        while True:
+            page = self.db.get_orders_page(self.user_id, page_size=1, after=after)
+            seen.extend(order['order_id'] for order in page['orders'])
+            after = page['next_cursor']
+            if after is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual([order['order_id'] for order in self.db.get_user_orders(self.user_id)], expected)
+        self.assertEqual(self.db.get_orders_page(self.user_id, page_size=2)['orders'][0]['items'],
+                         "Paneer Tikka x3, Garlic Naan x1")
+
+    def test_archive_runs_in_resumable_batches(self):
+        self.place_orders(5)
+        first = self.db.archive_orders(older_than_days=-1, batch_size=2, max_batches=1)
+        self.assertEqual((first['archived'], first['batches'], first['done']), (2, 1, False))
+        rest = self.db.archive_orders(older_than_days=-1, batch_size=2)
+        self.assertEqual((rest['archived'], rest['batches'], rest['done']), (3, 2, True))
+        self.assertEqual(self.execute("SELECT COUNT(*) FROM orders_archive")[0][0], 5)
+
+        # Nothing is older than the default 90 days
+        self.place_orders(1)
+        self.assertEqual(self.db.archive_orders()['archived'], 0)
+
+    # ORDER STATUS
+
+    def test_status_moves_one_step_at_a_time(self):
+        first, second, third = self.place_orders(3)
+        self.assertFalse(self.db.update_order_status(first, 'Ready')['success'])
+        self.assertFalse(self.db.update_order_status(first, 'Pending')['success'])
+        self.assertFalse(self.db.update_orders_status([first], 'Cancelled')['success'])
+
+        self.assertTrue(self.db.update_order_status(first, 'Preparing')['success'])
+        result = self.db.update_orders_status([first, second, first], 'Ready')
+        self.assertEqual((result['updated'], result['skipped']), ([first], [second]))
+        self.assertEqual(self.db.update_orders_status([], 'Ready')['updated'], [])
+
+        self.assertEqual([order['order_id'] for order in self.db.get_order_queue('Pending')], [second, third])
+        self.assertEqual([order['order_id'] for order in self.db.get_order_queue('Ready')], [first])
+        self.assertEqual(self.db.get_order_details(first)['order']['status'], 'Ready')
+
+    def test_claim_orders_takes_the_oldest_pending_orders(self):
+        order_ids = self.place_orders(3)
+        claimed = self.db.claim_orders(limit=2)
+        self.assertTrue(claimed['success'])
+        self.assertEqual([order['order_id'] for order in claimed['orders']], order_ids[:2])
+        self.assertEqual([order['status'] for order in claimed['orders']], ['Preparing', 'Preparing'])
+        self.assertEqual(claimed['orders'][0]['items'], "Paneer Tikka x1, Garlic Naan x1")
+        self.assertEqual([order['order_id'] for order in self.db.claim_orders(limit=5)['orders']], order_ids[2:])
+        self.assertEqual(self.db.claim_orders()['orders'], [])
+
+    def test_concurrent_claims_never_claim_an_order_twice(self):
+        order_ids = self.place_orders(40)
+        claims = []
+        errors = []
+
+        def claimer():
+            db = self.make_db()
+            while True:
+                result = db.claim_orders(limit=3)
+                if not result['success']:
+                    if result.get('retryable'):
+                        continue
+                    errors.append(result['message'])
+                    return
+                if not result['orders']:
+                    return
+                claims.extend(order['order_id'] for order in result['orders'])
+
+        threads = [threading.Thread(target=claimer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(claims), order_ids)
+        self.assertEqual(len(list(self.db.iter_orders(status='Preparing'))), 40)
+
+    # CARTS
+
+    def test_cart_is_saved_and_checked_out(self):
+        cart = self.db.load_cart(self.user_id)
+        self.assertEqual(len(cart), 0)
+        cart.add(self.items["Paneer Tikka"], 1)
+        cart.add(self.items["Paneer Tikka"], 1)
+        cart.add(self.items["Mango Lassi"], 3)
+        cart.set_quantity(self.items["Mango Lassi"], 1)
+        self.assertIsNone(cart.add(999999, 1))
+        # Single-connection mode only writes on flush
+        self.assertIsNone(cart._timer)
+        self.assertEqual(self.db.load_cart(self.user_id).lines(), [])
+        self.assertEqual(cart.flush(), 2)
+        self.assertEqual(cart.flush(), 0)
+
+        saved = self.db.load_cart(self.user_id)
+        self.assertEqual({line['item_id']: line['quantity'] for line in saved},
+                         {self.items["Paneer Tikka"]: 2, self.items["Mango Lassi"]: 1})
+        self.assertEqual(saved.bill()['final_amount'], Decimal('461.99'))
+
+        result = saved.checkout()
+        self.assertTrue(result['success'])
+        self.assertEqual(result['final_amount'], Decimal('461.99'))
+        self.assertEqual(len(self.db.load_cart(self.user_id)), 0)
+
+    def test_checkout_stops_when_the_menu_changed(self):
+        cart = self.db.load_cart(self.user_id)
+        cart.add(self.items["Garlic Naan"], 2)
+        cart.add(self.items["Butter Chicken"], 1)
+        self.db.set_item_availability(self.items["Garlic Naan"], False)
+
+        result = cart.checkout()
+        self.assertFalse(result['success'])
+        self.assertEqual(len(result['changes']), 1)
+        self.assertNotIn(self.items["Garlic Naan"], cart)
+        self.assertTrue(cart.checkout()['success'])
+
+    def test_failed_flush_keeps_the_changes(self):
+        db = self.make_db()
+        cart = db.load_cart(self.user_id)
+        cart.add(self.items["Garlic Naan"], 2)
+        db.connection.close()
+        self.assertEqual(cart.flush(), 0)
+        self.assertIsNotNone(cart.last_error)
+
+        self.assertTrue(db.connect())
+        self.assertEqual(cart.flush(), 1)
+        self.assertIsNone(cart.last_error)
+        self.assertEqual([line['quantity'] for line in self.db.load_cart(self.user_id)], [2])
+
+    def test_overlapping_flushes_commit_in_order(self):
+        db = self.make_db(pool_size=2)
+        cart = db.load_cart(self.user_id, flush_interval=60)
+        cart.add(self.items["Garlic Naan"], 2)
+        write = cart._write
+        writing = threading.Event()
+
+        def slow_write(saved, removed):
+            if saved:
+                writing.set()
+                time.sleep(0.2)
+            write(saved, removed)
+
+        cart._write = slow_write
+        # A timer flush is writing the old line when checkout clears the cart
+        timer_flush = threading.Thread(target=cart.flush)
+        timer_flush.start()
+        writing.wait(5)
+        cart.clear()
+        self.assertEqual(cart.flush(), 1)
+        timer_flush.join()
+        self.assertEqual(len(self.db.load_cart(self.user_id)), 0)
+
+    def test_pooled_cart_writes_behind(self):
+        db = self.make_db(pool_size=2)
+        cart = db.load_cart(self.user_id, flush_interval=0.05)
+        cart.add(self.items["Garlic Naan"], 2)
+        deadline = time.time() + 5
+        while len(db.load_cart(self.user_id)) == 0 and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual([line['quantity'] for line in db.load_cart(self.user_id)], [2])
+
+    # CSV EXPORT AND IMPORT
+
+    def test_menu_export_round_trips_through_import(self):
+        filename = self.path('menu.csv')
+        self.assertIn("(5 rows)", self.db.export_menu_to_csv(filename, chunk_size=2))
+        result = self.db.import_menu_from_csv(filename)
+        self.assertTrue(result['success'])
+        self.assertEqual((result['inserted'], result['updated'], result['skipped']), (0, 0, 5))
+
+        gz_filename = self.path('menu.csv.gz')
+        self.db.export_menu_to_csv(gz_filename)
+        with gzip.open(gz_filename, 'rt', newline='') as file:
+            self.assertEqual(len(list(csv.reader(file))), 6)
+
+    def write_menu_csv(self, rows):
+        filename = self.path('import.csv')
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Name', 'Category', 'Price', 'Availability'])
+            writer.writerows(rows)
+        return filename
+
+    def test_import_counts_inserts_updates_and_skips(self):
+        filename = self.write_menu_csv([
+            ["Paneer Tikka", "Starters", "180.00", "1"],   # unchanged
+            ["Garlic Naan", "Breads", "49.00", "1"],       # new price
+            ["Gulab Jamun", "Desserts", "60.00", "yes"],   # back on the menu
+            ["Veg Biryani", "Main Course", "240", "1"],    # new
+            ["Veg Biryani", "Main Course", "240", "1"],    # repeated in the file
+            ["Masala Dosa", "South Indian", "abc", "1"],   # invalid price
+            ["", "Starters", "10", "1"],                   # no name
+        ])
+        version = self.execute("SELECT version FROM menu_version WHERE id = 1")[0][0]
+
+        dry_run = self.db.import_menu_from_csv(filename, chunk_size=2, dry_run=True)
+        self.assertEqual((dry_run['inserted'], dry_run['updated'], dry_run['skipped']), (1, 2, 4))
+        self.assertEqual(len(self.db.get_menu()), 4)
+        self.assertEqual(self.execute("SELECT version FROM menu_version WHERE id = 1")[0][0], version)
+
+        progress = []
+        result = self.db.import_menu_from_csv(filename, chunk_size=2, progress=progress.append)
+        self.assertTrue(result['success'])
+        self.assertEqual((result['inserted'], result['updated'], result['skipped']), (1, 2, 4))
+        self.assertEqual(progress[-1], 7)
+
+        menu = {item['name']: item['price'] for item in self.db.get_menu()}
+        self.assertEqual(menu["Garlic Naan"], Decimal('49.00'))
+        self.assertEqual(menu["Veg Biryani"], Decimal('240.00'))
+        self.assertIn("Gulab Jamun", menu)
+        self.assertNotIn("Masala Dosa", menu)
+        self.assertEqual(self.execute("SELECT COUNT(*) FROM menu WHERE name = %s", ("Veg Biryani",))[0][0], 1)
+
+        again = self.db.import_menu_from_csv(filename)
+        self.assertEqual((again['inserted'], again['updated'], again['skipped']), (0, 0, 7))
+
+    def test_import_counts_follow_the_database_collation(self):
+        filename = self.write_menu_csv([["garlic naan", "Breads", "49.00", "1"]])
+        result = self.db.import_menu_from_csv(filename)
+        rows = self.execute("SELECT name, price FROM menu WHERE LOWER(name) = %s", ("garlic naan",))
+        # MySQL matches the existing "Garlic Naan" case-insensitively; SQLite adds a new row
+        self.assertEqual(len(rows), 1 + result['inserted'])
+        self.assertEqual(result['inserted'] + result['updated'], 1)
+        if isinstance(self.db.backend, SQLiteBackend):
+            self.assertEqual(result['inserted'], 1)
+
+    def test_import_rejects_unusable_files(self):
+        self.assertFalse(self.db.import_menu_from_csv(self.path('missing.csv'))['success'])
+        filename = self.path('bad.csv')
+        with open(filename, 'w') as file:
+            file.write("Name,Price\nSamosa,20\n")
+        result = self.db.import_menu_from_csv(filename)
+        self.assertFalse(result['success'])
+        self.assertIn("Category", result['message'])
+
+    def test_orders_export_includes_the_archive(self):
+        self.place_orders(3)
+        self.archive_everything()
+        self.place_orders(2)
+        filename = self.path('orders.csv')
+        self.assertIn("(5 rows)", self.db.export_orders_to_csv(filename))
+
+        progress = []
+        count = self.db.stream_query_to_csv(
+            "SELECT order_id FROM orders WHERE user_id = %s", (self.user_id,), ['Order ID'],
+            self.path('hot.csv.gz'), chunk_size=1, progress=progress.append
+        )
+        self.assertEqual((count, progress), (2, [1, 2]))
+
+    def test_incremental_export_writes_each_change_once(self):
+        filename = self.path('incremental.csv')
+        watermark_file = filename + '.watermark'
+        self.assertEqual(self.db.load_export_watermark(watermark_file)['order_id'], 0)
+
+        order_ids = self.place_orders(3)
+        # Orders changed in the current second wait for the next run
+        time.sleep(1.1)
+        self.assertEqual(self.db.export_orders_incremental(filename, include_details=True), 6)
+        self.assertEqual(self.db.load_export_watermark(watermark_file)['order_id'], order_ids[-1])
+        self.assertEqual(self.db.export_orders_incremental(filename, include_details=True), 0)
+
+        # Rows appended after the last saved watermark are dropped on the next run
+        with open(filename, 'a') as file:
+            file.write("half a row")
+        self.place_orders(1)
+        time.sleep(1.1)
+        self.assertEqual(self.db.export_orders_incremental(filename, include_details=True), 2)
+        with open(filename, newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(len(rows), 1 + 8)
+        self.assertEqual(len({tuple(row) for row in rows}), len(rows))
+
+        # Removing the export starts again from the beginning
+        os.remove(filename)
+        self.assertEqual(self.db.export_orders_incremental(filename), 4)
+
+        watermark = {"updated_at": "2000-01-01 00:00:00", "order_id": 7, "file_size": 0}
+        self.db.save_export_watermark(watermark_file, watermark)
+        self.assertEqual(self.db.load_export_watermark(watermark_file), watermark)
+        self.assertFalse(os.path.exists(watermark_file + '.tmp'))
+
+    # ANALYTICS
+
+    def test_date_range_filter(self):
+        self.assertEqual(self.db.date_range_filter("sale_date"), ("TRUE", []))
+        where, params = self.db.date_range_filter("sale_date", date(2024, 1, 1), date(2024, 1, 31))
+        self.assertEqual(where, "sale_date >= %s AND sale_date < %s")
+        self.assertEqual(params, [date(2024, 1, 1), date(2024, 2, 1)])
+
+    def test_sales_timeseries_agrees_with_the_totals(self):
+        self.place_orders(4)
+        self.order(self.other_user_id, Mango_Lassi=2)
+        revenue = self.db.get_total_revenue()
+
+        for bucket in ('hour', 'day', 'week'):
+            series = self.db.get_sales_timeseries(bucket=bucket)
+            self.assertEqual(series['bucket'], bucket)
+            self.assertEqual(sum(series['orders']), 5)
+            self.assertEqual(sum(series['items_sold']), 4 + 7 + 2)
+            self.assertEqual(sum(series['revenue']), revenue)
+
+        drinks = self.db.get_sales_timeseries(bucket='hour', category="Beverages")
+        self.assertEqual((sum(drinks['orders']), sum(drinks['revenue'])), (1, Decimal('159.98')))
+
+        today = date.today()
+        days = self.db.get_sales_timeseries(today - timedelta(days=6), today + timedelta(days=1))
+        self.assertEqual(len(days['start']), 8)
+        self.assertEqual(sum(days['revenue']), revenue)
+        self.assertEqual(self.db.get_sales_timeseries(date(2000, 1, 1), date(2000, 1, 1))['revenue'],
+                         [Decimal('0.00')])
+        with self.assertRaises(ValueError):
+            self.db.get_sales_timeseries(bucket='month')
+
+    def test_analytics_cache_serves_repeated_queries(self):
+        self.order(Garlic_Naan=1)
+        self.db.enable_analytics_cache(ttl=60)
+        first = self.db.get_total_revenue()
+        self.order(Garlic_Naan=1)
+        # Cached until the ttl runs out
+        self.assertEqual(self.db.get_total_revenue(), first)
+
+        calls = []
+        loader = lambda: calls.append(1) or len(calls)
+        self.assertEqual([self.db.cached_analytics(("test",), loader) for _ in range(3)], [1, 1, 1])
+        self.db.analytics_cache = None
+        self.assertEqual(self.db.get_total_revenue(), first * 2)
+        self.assertEqual(self.db.cached_analytics(("test",), loader), 2)
+
+    def test_trending_items(self):
+        self.order(Paneer_Tikka=2)
+        self.order(Mango_Lassi=5)
+        self.db.enable_popular_items()
+        trending = self.db.get_trending_items('1h')
+        self.assertEqual(trending[:2], [
+            {"item_id": self.items["Mango Lassi"], "name": "Mango Lassi", "total_orders": 5},
+            {"item_id": self.items["Paneer Tikka"], "name": "Paneer Tikka", "total_orders": 2},
+        ])
+
+        # Orders placed through this object are counted as they happen
+        self.order(Paneer_Tikka=4)
+        self.db.place_orders_batch([(self.user_id, [{"item_id": self.items["Garlic Naan"], "quantity": 1}])])
+        self.assertEqual([(item['name'], item['total_orders']) for item in self.db.get_trending_items('15m')],
+                         [("Paneer Tikka", 6), ("Mango Lassi", 5), ("Garlic Naan", 1)])
+        self.assertEqual(len(self.db.get_trending_items(limit=1)), 1)
+
+    def test_reprice_orders(self):
+        order_ids = self.place_orders(5)
+        result = self.db.reprice_orders(chunk_size=2)
+        self.assertEqual(result, {"orders": 5, "mismatches": []})
+
+        # A different Starters rate disagrees with every order that has a starter
+        engine = BillingEngine(category_rates={"Starters": Decimal('0.12')})
+        mismatches = self.db.reprice_orders(engine=engine)['mismatches']
+        self.assertEqual([mismatch['order_id'] for mismatch in mismatches], order_ids)
+
+    # CONCURRENCY AND INSTRUMENTATION
+
+    def test_group_commit_writes_every_order(self):
+        db = self.make_db(pool_size=4)
+        db.enable_group_commit(max_batch=8, max_wait_ms=5)
+        results = []
+
+        def customer():
+            for _ in range(5):
+                results.append(db.place_order(self.user_id, [{"item_id": self.items["Garlic Naan"], "quantity": 1}]))
+
+        threads = [threading.Thread(target=customer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        db.disable_group_commit()
+        self.assertIsNone(db.group_commit)
+
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertEqual(len({result['order_id'] for result in results}), 20)
+        self.assertEqual(self.db.check_rollups(), [])
+        self.assertEqual(self.db.get_total_revenue(), 20 * Decimal('47.78'))
+
+    def test_instrumentation_counts_operations_and_statements(self):
+        stats = self.db.enable_instrumentation(slow_query_ms=0, slow_log_file=self.path('slow.log'))
+        self.db.get_menu()
+        self.order(Garlic_Naan=1)
+        self.db.get_menu()
+        data = stats.dump()
+        self.assertEqual(data['operations']['get_menu']['count'], 2)
+        self.assertEqual(data['operations']['get_menu']['round_trips_per_call'], 1)
+        self.assertEqual(data['operations']['get_menu']['rows_per_call'], 4)
+        self.assertEqual(data['operations']['place_order']['count'], 1)
+        self.assertTrue(os.path.getsize(self.path('slow.log')) > 0)
+        self.assertIn("get_menu", stats.report())
+
+        self.db.disable_instrumentation()
+        self.assertIsNone(self.db.stats)
+        self.db.get_menu()
+        self.assertEqual(stats.dump()['operations']['get_menu']['count'], 2)
+
+    def test_every_public_method_is_tested(self):
+        with open(__file__) as file:
+            source = file.read()
+        methods = [name for name in dir(RestaurantDatabase)
+                   if not name.startswith('_') and callable(getattr(RestaurantDatabase, name))]
+        self.assertEqual([name for name in methods if f".{name}(" not in source], [])
+
+
+class SQLiteMigrationTests(unittest.TestCase):
+    """Upgrades from older schemas, starting from a database at an earlier migration"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, True)
+        self.db = RestaurantDatabase(backend=SQLiteBackend(os.path.join(self.temp_dir, 'old.db')))
+        self.assertTrue(self.db.connect())
+        self.addCleanup(self.db.disconnect)
+
+    def test_duplicate_menu_items_are_merged_before_the_unique_index(self):
+        with mock.patch.object(main, 'MIGRATIONS', main.MIGRATIONS[:4]):
+            self.db.initialize_database()
+        user_id = self.db.register_user("Asha", "asha@example.com", "secret", "1")['user_id']
+        # Older setup scripts inserted the sample menu on every run
+        keep = self.db.add_menu_item("Naan", "Breads", Decimal('40.00'))['item_id']
+        duplicate = self.db.add_menu_item("Naan", "Breads", Decimal('40.00'))['item_id']
+        other = self.db.add_menu_item("Lassi", "Beverages", Decimal('60.00'))['item_id']
+        for item_id in (keep, duplicate, duplicate, other):
+            self.assertTrue(self.db.place_order(user_id, [{"item_id": item_id, "quantity": 2}])['success'])
+
+        self.assertEqual(self.db.migrate(), list(range(5, LATEST_SCHEMA_VERSION + 1)))
+        self.assertEqual([item['item_id'] for item in self.db.get_menu("Breads")], [keep])
+        self.assertEqual(self.db.get_popular_items(), [{"name": "Naan", "total_orders": 6},
+                                                       {"name": "Lassi", "total_orders": 2}])
+        self.assertEqual(self.db.check_rollups(), [])
+        self.assertFalse(self.db.add_menu_item("Naan", "Breads", 45)['success'])
+        self.assertFalse(self.db.initialize_database())
+
+
+class SQLiteDatabaseTests(DatabaseTests, unittest.TestCase):
+
+    def make_backend(self):
+        return SQLiteBackend(self.path('restaurant.db'))
+
+
+@unittest.skipUnless(MYSQL_CONFIG and main.mysql, "set RESTAURANT_TEST_MYSQL_DATABASE to test against MySQL")
+class MySQLDatabaseTests(DatabaseTests, unittest.TestCase):
+
+    def make_backend(self):
+        return MySQLBackend(MYSQL_CONFIG)
+
+    def reset_database(self):
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+            for table in TABLES:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+            cursor.close()
+
+
+if __name__ == '__main__':
+    unittest.main()